@@ -0,0 +1,32 @@
+"""Add ingredient name trigram index
+
+Revision ID: 2e9a5c1f7b46
+Revises: 1c6f2b8e5d93
+Create Date: 2026-10-17 14:52:38.201773
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e9a5c1f7b46'
+down_revision = '1c6f2b8e5d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_ingredients_name_trgm',
+        'ingredients',
+        ['name'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+
+
+def downgrade():
+    op.drop_index('ix_ingredients_name_trgm', table_name='ingredients', postgresql_using='gin')
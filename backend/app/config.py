@@ -1,16 +1,34 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DATABASE_REPLICA_URL: Optional[str] = None  # Read replica for read-only routes
+    DATABASE_REPLICA_LAG_SECONDS: float = 5  # A client's reads stay on the primary this long after its own writes
+    
+    # Connection pool (size and overflow derived per worker when unset, see db_pool)
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT_SECONDS: float = 30  # Wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Replace connections older than this (-1 never)
+    DB_POOL_PRE_PING: bool = True  # Test connections on checkout (one extra round trip)
+    DB_MAX_CONNECTIONS: int = 100  # max_connections of the database server
+    DB_RESERVED_CONNECTIONS: int = 10  # Kept free for admin tools and migrations
+    WEB_CONCURRENCY: int = 1  # Worker processes sharing the database
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
     
+    # Passwords (hashes with another cost factor are upgraded on login)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4  # Threads hashing passwords
+    PASSWORD_HASH_QUEUE: int = 32  # Hashes waiting for a thread before answering 429
+    
     # Google OAuth
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
@@ -21,6 +39,12 @@ class Settings(BaseSettings):
     BACKEND_PORT: int = 8000
     ENVIRONMENT: str = "development"
     
+    # Token required in the X-Metrics-Token header of /api/metrics (disabled when unset)
+    METRICS_TOKEN: Optional[str] = None
+    
+    # Raise on any lazy relationship load in queries using load profiles (tests)
+    RAISE_ON_LAZY_LOAD: bool = False
+    
     # Frontend (CORS)
     FRONTEND_URL: str = "http://localhost:3000"
     
@@ -1,19 +1,107 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
+from app.utils.db_pool import InstrumentedQueuePool, pool_limits
+
+pool_size, max_overflow = pool_limits(settings)
+
+
+def _create_engine(url: str):
+    """Engine with the configured, instrumented connection pool"""
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS
+    )
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=10,
-    max_overflow=20
-)
+
+engine = _create_engine(settings.DATABASE_URL)
+
+# Read replica for read-only routes (the primary when not configured)
+replica_engine = _create_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=replica_engine, info={'replica': replica_engine is not engine}
+)
 
 Base = declarative_base()
 
+# Response header with the (Unix) time of the request's write; clients send
+# it back on their next requests so any worker reads their writes
+LAST_WRITE_HEADER = "X-Last-Write"
+
+# Authorization header -> monotonic time of its last write in this process
+_last_writes: "OrderedDict[str, float]" = OrderedDict()
+_writes_lock = threading.Lock()
+
+# Per request: whether a session committed while handling it
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_commit(session):
+    writes = _request_writes.get()
+    if writes is not None:
+        writes['committed'] = True
+
+
+async def track_writes(request: Request, call_next):
+    """
+    HTTP middleware remembering which clients just wrote
+    
+    Responses to requests that committed carry LAST_WRITE_HEADER, and the
+    request's credentials are remembered, so get_read_db() sends that
+    client's reads (and no one else's) to the primary for a while.
+    """
+    writes = {'committed': False}
+    token = _request_writes.set(writes)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_writes.reset(token)
+    
+    if writes['committed']:
+        response.headers[LAST_WRITE_HEADER] = f"{time.time():.3f}"
+        client = request.headers.get("authorization")
+        if client:
+            now = time.monotonic()
+            with _writes_lock:
+                _last_writes[client] = now
+                _last_writes.move_to_end(client)
+                while _last_writes and now - next(iter(_last_writes.values())) >= settings.DATABASE_REPLICA_LAG_SECONDS:
+                    _last_writes.popitem(last=False)
+    return response
+
+
+def _recently_wrote(request: Request) -> bool:
+    """Whether the client behind a request wrote within DATABASE_REPLICA_LAG_SECONDS"""
+    try:
+        last_write = float(request.headers.get(LAST_WRITE_HEADER, ""))
+    except ValueError:
+        last_write = None
+    if last_write is not None and time.time() - last_write < settings.DATABASE_REPLICA_LAG_SECONDS:
+        return True
+    
+    client = request.headers.get("authorization")
+    if not client:
+        return False
+    with _writes_lock:
+        written_at = _last_writes.get(client)
+    return written_at is not None and time.monotonic() - written_at < settings.DATABASE_REPLICA_LAG_SECONDS
+
 
 def get_db():
     """Database dependency for FastAPI routes."""
@@ -22,3 +110,40 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    """
+    Database dependency for read-only routes.
+    
+    Uses the read replica, except for DATABASE_REPLICA_LAG_SECONDS after the
+    same client wrote: its reads go to the primary so they see the write.
+    Clients are recognized by the LAST_WRITE_HEADER they send back (on any
+    worker) or, in the worker that handled the write, by their credentials.
+    Writes by other users don't move a client's reads off the replica.
+    """
+    db = SessionLocal() if _recently_wrote(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """
+    Session for (re)building in-process caches: db itself, or a short-lived
+    primary session when db reads the replica.
+    
+    Caches outlive the request that builds them and are only dropped by
+    writes in this process, so one built from a lagging replica would keep
+    serving the stale rows until it expires.
+    """
+    if not db.info.get('replica'):
+        yield db
+        return
+    primary = SessionLocal()
+    try:
+        yield primary
+    finally:
+        primary.close()
@@ -1,25 +1,31 @@
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from jose import JWTError
+from app.config import settings
 from app.database import get_db
-from app.models.user import User
+from app.services.user_cache import CurrentUser, get_user
 from app.utils.security import decode_access_token
 
 security = HTTPBearer()
 
 
-async def get_current_user(
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> CurrentUser:
     """
     Dependency to get current authenticated user from JWT token.
     
+    Returns a read-only snapshot of the user, cached for a few seconds
+    (see user_cache) so most requests don't query the users table.
+    
     Usage in endpoint:
     ```
     @router.get("/protected")
-    async def protected_route(current_user: User = Depends(get_current_user)):
+    async def protected_route(current_user: CurrentUser = Depends(get_current_user)):
         return {"user_id": current_user.id}
     ```
     """
@@ -38,8 +44,21 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = get_user(db, int(user_id))
     if user is None or not user.is_active:
         raise credentials_exception
     
     return user
+
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)) -> None:
+    """
+    Dependency guarding internal monitoring endpoints.
+    
+    Requires the METRICS_TOKEN setting in the X-Metrics-Token header; the
+    endpoints don't exist (404) while METRICS_TOKEN is unset.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_metrics_token is None or not secrets.compare_digest(x_metrics_token, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid metrics token")
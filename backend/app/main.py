@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
@@ -9,6 +9,10 @@ from app.routers import meal_planner
 from app.routers import supermarkets
 from app.routers import prices
 from app.routers import exclusions
+from app.database import LAST_WRITE_HEADER, engine, replica_engine, track_writes
+from app.dependencies import require_metrics_token
+from app.services import user_cache
+from app.utils.db_pool import pool_stats
 
 # Create tables (in production, use Alembic migrations instead)
 # from app.database import engine, Base
@@ -22,6 +26,9 @@ app = FastAPI(
     redoc_url="/api/redoc"
 )
 
+# Read-your-writes routing between the primary and the read replica
+app.middleware("http")(track_writes)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", LAST_WRITE_HEADER],
 )
 
 # Include routers
@@ -52,3 +60,15 @@ async def root():
         "version": "1.0.0",
         "docs": "/api/docs"
     }
+
+
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_token)], include_in_schema=False)
+async def metrics():
+    """Connection pool and in-process cache statistics of this worker (needs METRICS_TOKEN)"""
+    metrics = {
+        "database_pool": pool_stats(engine),
+        "user_cache": user_cache.stats()
+    }
+    if replica_engine is not engine:
+        metrics["replica_pool"] = pool_stats(replica_engine)
+    return metrics
@@ -4,6 +4,7 @@ from app.models.meal_plan import MealPlanItem
 from app.models.supermarket import Supermarket, UnitType
 from app.models.ingredient_price import IngredientPrice
 from app.models.ingredient_exclusion import IngredientExclusion
+from app.models.ingredient_cheapest_price import IngredientCheapestPrice
 
 __all__ = [
     "User", 
@@ -17,4 +18,5 @@ __all__ = [
     "UnitType",
     "IngredientPrice",
     "IngredientExclusion",
+    "IngredientCheapestPrice",
 ]
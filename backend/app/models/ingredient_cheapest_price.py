@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey, Enum as SQLEnum
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models.supermarket import UnitType
+
+
+class IngredientCheapestPrice(Base):
+    """Denormalized community price aggregates per ingredient per supermarket
+
+    Maintained by price_service on every price upsert/delete and rebuilt with
+    `python -m app.scripts.rebuild_price_aggregates`.
+    """
+    __tablename__ = "ingredient_cheapest_prices"
+
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True, index=True)
+    supermarket_id = Column(Integer, ForeignKey("supermarkets.id", ondelete="CASCADE"), primary_key=True, index=True)
+    min_price = Column(Numeric(10, 2), nullable=False)  # Cheapest community price, converted to `unit`
+    median_price = Column(Numeric(10, 2), nullable=False)
+    price_count = Column(Integer, nullable=False)
+    unit = Column(SQLEnum(UnitType), nullable=False)  # Unit min/median are quoted in
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Relationships
+    ingredient = relationship("Ingredient", back_populates="cheapest_prices")
+    supermarket = relationship("Supermarket", back_populates="cheapest_prices")
+
+    def __repr__(self):
+        return f"<IngredientCheapestPrice(ingredient_id={self.ingredient_id}, supermarket_id={self.supermarket_id}, min={self.min_price}, count={self.price_count})>"
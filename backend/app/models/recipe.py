@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, ForeignKey, Table, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, ForeignKey, Table, TIMESTAMP, Index
 from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -25,6 +26,10 @@ class Ingredient(Base):
     carbs_per_100g = Column(Float, nullable=False)
     fats_per_100g = Column(Float, nullable=False)
     
+    # Unit conversion (NULL = unknown, no conversion across dimensions)
+    density_g_per_ml = Column(Float, nullable=True)  # Converts between g and ml
+    unit_weight_g = Column(Float, nullable=True)  # Weight of one unit/piece
+    
     # Ownership (NULL = public ingredient, otherwise private to user)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     is_public = Column(Boolean, default=True)
@@ -38,6 +43,14 @@ class Ingredient(Base):
     recipe_ingredients = relationship("RecipeIngredient", back_populates="ingredient", cascade="all, delete-orphan")
     prices = relationship("IngredientPrice", back_populates="ingredient", cascade="all, delete-orphan")
     exclusions = relationship("IngredientExclusion", back_populates="ingredient", cascade="all, delete-orphan")
+    cheapest_prices = relationship("IngredientCheapestPrice", back_populates="ingredient", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Keyset pagination of the ingredient catalogue
+        Index('ix_ingredients_name_id', 'name', 'id'),
+        # Typo-tolerant autocomplete (pg_trgm, see autocomplete_service)
+        Index('ix_ingredients_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
 
 
@@ -57,6 +70,23 @@ class Recipe(Base):
     # Image
     image_url = Column(String(500), nullable=True)
     
+    # Nutrition totals for the whole recipe, recomputed on every write
+    # (NULL = not computed yet, calculated from the ingredients on read)
+    total_calories = Column(Float, nullable=True)
+    total_protein = Column(Float, nullable=True)
+    total_carbs = Column(Float, nullable=True)
+    total_fats = Column(Float, nullable=True)
+    
+    # Per serving, kept in step with the totals for indexed range filters
+    calories_per_serving = Column(Float, nullable=True, index=True)
+    protein_per_serving = Column(Float, nullable=True, index=True)
+    carbs_per_serving = Column(Float, nullable=True, index=True)
+    fats_per_serving = Column(Float, nullable=True, index=True)
+    protein_density = Column(Float, nullable=True)  # Grams of protein per 100 kcal
+    
+    # Full-text search document (PostgreSQL only, see search_service)
+    search_vector = Column(TSVECTOR().with_variant(Text(), 'sqlite'), nullable=True)
+    
     # Ownership
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     is_public = Column(Boolean, default=True)
@@ -70,6 +100,14 @@ class Recipe(Base):
     recipe_ingredients = relationship("RecipeIngredient", back_populates="recipe", cascade="all, delete-orphan")
     tags = relationship("Tag", secondary=recipe_tags, back_populates="recipes")
     meal_plans = relationship("MealPlanItem", back_populates="recipe")
+    
+    __table_args__ = (
+        # Keyset pagination of the recipe catalogue (newest first)
+        Index('ix_recipes_created_at_id', 'created_at', 'id'),
+        Index('ix_recipes_search_vector', 'search_vector', postgresql_using='gin'),
+        # Keyset pagination by protein density (best first)
+        Index('ix_recipes_protein_density_id', 'protein_density', 'id'),
+    )
 
 
 class RecipeIngredient(Base):
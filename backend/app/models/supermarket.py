@@ -26,6 +26,7 @@ class Supermarket(Base):
     # Relationships
     prices = relationship("IngredientPrice", back_populates="supermarket", cascade="all, delete-orphan")
     exclusions = relationship("IngredientExclusion", back_populates="supermarket", cascade="all, delete-orphan")
+    cheapest_prices = relationship("IngredientCheapestPrice", back_populates="supermarket", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Supermarket(id={self.id}, name='{self.name}', is_active={self.is_active})>"
@@ -4,8 +4,7 @@ from app.database import get_db
 from app.schemas.user import UserRegister, UserLogin, UserResponse, UserUpdate, UserMe, GoogleAuthCode
 from app.schemas.token import Token
 from app.services.auth_service import AuthService
-from app.dependencies import get_current_user
-from app.models.user import User
+from app.dependencies import CurrentUser, get_current_user
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -16,6 +15,9 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     """
     Register new user with email and password.
     
+    Async so the password hash is awaited instead of holding a threadpool
+    thread; the database work is offloaded to the threadpool.
+    
     Returns JWT token + user data.
     """
     auth_service = AuthService(db)
@@ -27,6 +29,8 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """
     Login with email and password.
     
+    Async for the same reason as register.
+    
     Returns JWT token + user data.
     """
     auth_service = AuthService(db)
@@ -48,7 +52,7 @@ async def google_auth():
 
 
 @router.post("/google/callback", response_model=Token)
-async def google_callback(auth_code: GoogleAuthCode, db: Session = Depends(get_db)):
+def google_callback(auth_code: GoogleAuthCode, db: Session = Depends(get_db)):
     """
     Handle Google OAuth callback.
     
@@ -56,13 +60,13 @@ async def google_callback(auth_code: GoogleAuthCode, db: Session = Depends(get_d
     creates/logs in user, returns JWT token.
     """
     auth_service = AuthService(db)
-    return await auth_service.google_login(auth_code.code)
+    return auth_service.google_login(auth_code.code)
 
 
 # --- User Management ---
 
 @router.get("/me", response_model=UserMe)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """
     Get current authenticated user data.
     
@@ -72,9 +76,9 @@ async def get_me(current_user: User = Depends(get_current_user)):
 
 
 @router.put("/me", response_model=UserResponse)
-async def update_me(
+def update_me(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -83,11 +87,25 @@ async def update_me(
     Can update: full_name, goals (calories, macros, weight).
     """
     auth_service = AuthService(db)
-    return await auth_service.update_user(current_user.id, user_update)
+    return auth_service.update_user(current_user.id, user_update)
+
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+def deactivate_me(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Deactivate current user account.
+    
+    The account can no longer log in and its tokens stop working; its data is kept.
+    """
+    auth_service = AuthService(db)
+    auth_service.deactivate_user(current_user.id)
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(current_user: CurrentUser = Depends(get_current_user)):
     """
     Logout (client-side token deletion, optional server-side tracking).
     """
@@ -4,8 +4,8 @@ from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.exclusion import ExclusionCreate, ExclusionResponse
-from app.models.user import User
 from app.services import exclusion_service
+from app.dependencies import CurrentUser
 from app.routers.auth import get_current_user
 from typing import List
 
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/api/exclusions", tags=["exclusions"])
 
 @router.get("", response_model=List[ExclusionResponse])
 def get_my_exclusions(
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -30,7 +30,7 @@ def get_my_exclusions(
 @router.post("", response_model=ExclusionResponse, status_code=status.HTTP_201_CREATED)
 def add_exclusion(
     exclusion_data: ExclusionCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -64,7 +64,7 @@ def add_exclusion(
 @router.delete("/{exclusion_id}", status_code=status.HTTP_204_NO_CONTENT)
 def remove_exclusion(
     exclusion_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
-from app.database import get_db
-from app.dependencies import get_current_user
-from app.models.user import User
+from app.database import get_db, get_read_db
+from app.dependencies import CurrentUser, get_current_user
 from app.schemas.meal_plan import (
     MealPlanCreate,
     MealPlanUpdate,
     MealPlanResponse,
+    MealPlanBatchRequest,
+    MealPlanBatchResponse,
+    MealPlanCopyRequest,
+    MealPlanGenerateRequest,
+    GeneratedMealPlanResponse,
     ShoppingListResponse,
-    OptimizedShoppingListResponse
+    OptimizedShoppingListResponse,
+    BasketComparisonResponse
 )
 from app.services.meal_service import MealService
 
@@ -18,11 +23,11 @@ router = APIRouter(prefix="/api/planner", tags=["Meal Planner"])
 
 
 @router.get("/", response_model=List[MealPlanResponse])
-async def get_meal_plan(
+def get_meal_plan(
     start_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
     end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get meal plan for a date range.
@@ -42,13 +47,13 @@ async def get_meal_plan(
         )
     
     service = MealService(db)
-    return await service.get_meal_plan(current_user.id, start_date, end_date)
+    return service.get_meal_plan(current_user.id, start_date, end_date)
 
 
 @router.post("/", response_model=MealPlanResponse, status_code=status.HTTP_201_CREATED)
-async def add_meal_to_plan(
+def add_meal_to_plan(
     meal_data: MealPlanCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -63,14 +68,82 @@ async def add_meal_to_plan(
     - **servings**: Number of servings (default: 1)
     """
     service = MealService(db)
-    return await service.add_meal_to_plan(meal_data, current_user.id)
+    return service.add_meal_to_plan(meal_data, current_user.id)
+
+
+@router.post("/batch", response_model=MealPlanBatchResponse)
+def batch_meal_plan(
+    batch: MealPlanBatchRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create, update and delete several meal plan items at once.
+    
+    All operations are applied in a single transaction: if any of them fails
+    (unknown recipe or item, item of another user) nothing is changed.
+    
+    - **create**: Meals to add (same fields as POST /api/planner)
+    - **update**: Changes to existing meals, each with its `id`
+    - **delete**: IDs of meals to remove
+    
+    At most 200 operations per request.
+    """
+    service = MealService(db)
+    return service.batch_meal_plan(batch, current_user.id)
+
+
+@router.post("/copy", response_model=List[MealPlanResponse], status_code=status.HTTP_201_CREATED)
+def copy_meal_plan(
+    copy: MealPlanCopyRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Copy the meals of a date range to another date, e.g. last week to this week.
+    
+    Each meal keeps its recipe, meal type and servings and moves by
+    target_start - source_start days. Copies start out not cooked.
+    
+    - **source_start**, **source_end**: Date range to copy (at most 31 days)
+    - **target_start**: Where the copied range starts
+    - **replace_existing**: Delete meals already planned in the target range first
+    """
+    service = MealService(db)
+    return service.copy_meal_plan(copy, current_user.id)
+
+
+@router.post("/generate", response_model=GeneratedMealPlanResponse, status_code=status.HTTP_201_CREATED)
+def generate_meal_plan(
+    request: MealPlanGenerateRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate a meal plan that hits your daily macro targets.
+    
+    Fills every requested slot between start_date and end_date with a recipe,
+    keeping each day's calories, protein, carbs and fats as close as possible
+    to the targets in your profile. Meals already planned are kept and count
+    towards their day unless replace_existing is set. Recipes tagged with a
+    slot's meal type (e.g. "breakfast") are preferred for that slot.
+    
+    - **start_date**, **end_date**: Date range to fill (at most 31 days)
+    - **slots**: Servings eaten per meal type, e.g. {"breakfast": 1, "dinner": 2}
+    - **replace_existing**: Replace meals already planned in those slots
+    - **include_cost**: Estimate the cost of the generated meals from supermarket prices
+    - **cost_weight**: Also minimize cost; 0.01 trades 1 € for a 10% miss on one macro for a day
+    - **seed**: Make the plan reproducible
+    """
+    service = MealService(db)
+    return service.generate_meal_plan(current_user, request)
 
 
 @router.put("/{meal_id}", response_model=MealPlanResponse)
-async def update_meal_plan_item(
+def update_meal_plan_item(
     meal_id: int,
     meal_update: MealPlanUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -85,13 +158,13 @@ async def update_meal_plan_item(
     - **is_cooked**: Mark meal as cooked/not cooked (optional)
     """
     service = MealService(db)
-    return await service.update_meal_plan_item(meal_id, meal_update, current_user.id)
+    return service.update_meal_plan_item(meal_id, meal_update, current_user.id)
 
 
 @router.delete("/{meal_id}", status_code=status.HTTP_200_OK)
-async def delete_meal_plan_item(
+def delete_meal_plan_item(
     meal_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -100,29 +173,31 @@ async def delete_meal_plan_item(
     Only the owner of the meal plan item can delete it.
     """
     service = MealService(db)
-    return await service.delete_meal_plan_item(meal_id, current_user.id)
+    return service.delete_meal_plan_item(meal_id, current_user.id)
 
 
 @router.get("/shopping-list", response_model=ShoppingListResponse)
-async def generate_shopping_list(
+def generate_shopping_list(
     start_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
     end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
     """
     Generate shopping list for a date range.
     
     Aggregates all ingredients needed for meals scheduled between start_date and end_date.
-    Ingredients are grouped by ingredient ID and unit, with amounts summed.
+    Amounts are converted to g, ml or unit and summed per ingredient.
     
     **Aggregation Rules:**
-    - Same ingredient + same unit = amounts are summed
-    - Same ingredient + different unit = separate items
+    - Same ingredient + convertible units = one item, amounts summed
+    - Mass and volume convert through the ingredient's density, pieces through its unit weight
+    - Same ingredient + units that can't be converted = separate items
     
     Example:
-    - 200g rice + 150g rice = 350g rice
-    - 200g rice + 1 unit rice = two separate items
+    - 200g rice + 1kg rice = 1200g rice
+    - 200g rice + 1 unit rice = 350g rice (unit weight 150g)
+    - 200g rice + 1 unit rice = two separate items (no unit weight)
     
     - **start_date**: Beginning of date range (ISO format: YYYY-MM-DD)
     - **end_date**: End of date range (ISO format: YYYY-MM-DD)
@@ -136,24 +211,27 @@ async def generate_shopping_list(
         )
     
     service = MealService(db)
-    return await service.generate_shopping_list(current_user.id, start_date, end_date)
+    return service.generate_shopping_list(current_user.id, start_date, end_date)
 
 
 @router.get("/shopping-list/optimized", response_model=OptimizedShoppingListResponse)
-async def get_optimized_shopping_list(
+def get_optimized_shopping_list(
     start_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
     end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    store_penalty: float = Query(0, ge=0, description="Extra cost (€) counted per supermarket visited"),
+    max_stores: Optional[int] = Query(None, ge=1, description="Maximum number of supermarkets to visit"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get optimized shopping list with price recommendations.
     
     This endpoint:
     1. Generates shopping list for the date range
-    2. Finds cheapest price for each ingredient (respecting your exclusions)
-    3. Calculates total cost per supermarket
-    4. Provides recommendations for where to shop
+    2. Chooses which supermarkets to visit, trading prices against the number of trips
+    3. Buys each ingredient at its cheapest chosen supermarket (respecting your exclusions)
+    4. Calculates total cost per supermarket
+    5. Provides recommendations for where to shop
     
     **Benefits:**
     - Save money by comparing prices across supermarkets
@@ -166,6 +244,8 @@ async def get_optimized_shopping_list(
     
     - **start_date**: Beginning of date range (ISO format: YYYY-MM-DD)
     - **end_date**: End of date range (ISO format: YYYY-MM-DD)
+    - **store_penalty**: Extra cost (€) per supermarket visited; higher values consolidate trips (default: 0)
+    - **max_stores**: Never recommend more than this many supermarkets (optional)
     """
     
     # Validate date range
@@ -177,14 +257,16 @@ async def get_optimized_shopping_list(
     
     # Get regular shopping list
     service = MealService(db)
-    shopping_list_response = await service.generate_shopping_list(current_user.id, start_date, end_date)
+    shopping_list_response = service.generate_shopping_list(current_user.id, start_date, end_date)
     
     # Optimize using optimization service
     from app.services import optimization_service
     optimized = optimization_service.optimize_shopping_list(
         db,
         shopping_list_response.items,
-        current_user.id
+        current_user.id,
+        store_penalty=store_penalty,
+        max_stores=max_stores
     )
     
     # Convert to response schema
@@ -202,6 +284,7 @@ async def get_optimized_shopping_list(
                 "cheapest_price": float(item.cheapest_price) if item.cheapest_price else None,
                 "cheapest_supermarket": item.cheapest_supermarket,
                 "cheapest_supermarket_id": item.cheapest_supermarket_id,
+                "price_unit": item.price_unit,
                 "total_cost": float(item.total_cost) if item.total_cost else None,
             }
             for item in optimized.items
@@ -219,3 +302,58 @@ async def get_optimized_shopping_list(
         recommended_distribution=optimized.recommended_distribution,
         potential_savings=optimized.potential_savings
     )
+
+
+@router.get("/shopping-list/compare", response_model=BasketComparisonResponse)
+def compare_supermarket_baskets(
+    start_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Compare what the whole shopping list would cost at each supermarket.
+    
+    For every active supermarket returns the basket total, how many items it
+    has no price for, and the difference against the optimized split
+    (buying every item at its cheapest supermarket). Respects your exclusions.
+    
+    - **start_date**: Beginning of date range (ISO format: YYYY-MM-DD)
+    - **end_date**: End of date range (ISO format: YYYY-MM-DD)
+    """
+    
+    # Validate date range
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be greater than or equal to start_date"
+        )
+    
+    service = MealService(db)
+    shopping_list_response = service.generate_shopping_list(current_user.id, start_date, end_date)
+    
+    from app.services import optimization_service
+    comparison = optimization_service.compare_supermarkets(
+        db,
+        shopping_list_response.items,
+        current_user.id
+    )
+    
+    return BasketComparisonResponse(
+        start_date=start_date,
+        end_date=end_date,
+        total_items=comparison.total_items,
+        items_with_prices=comparison.items_with_prices,
+        total_optimized=float(comparison.total_optimized),
+        supermarkets=[
+            {
+                "supermarket_id": cost.supermarket_id,
+                "supermarket_name": cost.supermarket_name,
+                "total_price": float(cost.total_price),
+                "available_items": cost.available_items,
+                "missing_items": cost.missing_items,
+                "delta_vs_optimized": float(cost.delta_vs_optimized),
+            }
+            for cost in comparison.supermarkets
+        ]
+    )
@@ -2,10 +2,10 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.schemas.price import IngredientPriceCreate, IngredientPriceResponse, PriceComparisonResponse
-from app.models.user import User
+from app.database import get_db, get_read_db
+from app.schemas.price import IngredientPriceCreate, IngredientPriceResponse, IngredientPriceSummary, PriceComparisonResponse
 from app.services import price_service
+from app.dependencies import CurrentUser
 from app.routers.auth import get_current_user
 from typing import List
 
@@ -15,8 +15,8 @@ router = APIRouter(prefix="/api/prices", tags=["prices"])
 @router.get("/ingredient/{ingredient_id}", response_model=List[IngredientPriceResponse])
 def get_prices_for_ingredient(
     ingredient_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all prices for an ingredient across all supermarkets
@@ -27,10 +27,25 @@ def get_prices_for_ingredient(
     return prices
 
 
+@router.get("/ingredient/{ingredient_id}/summary", response_model=List[IngredientPriceSummary])
+def get_price_summary_for_ingredient(
+    ingredient_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get min/median/count of community prices per supermarket for an ingredient
+    
+    Served from precomputed aggregates, cheapest supermarket first.
+    Automatically excludes supermarkets from user's exclusion list
+    """
+    return price_service.get_price_summaries_for_ingredient(db, ingredient_id, current_user.id)
+
+
 @router.post("", response_model=IngredientPriceResponse, status_code=status.HTTP_201_CREATED)
 def add_or_update_price(
     price_data: IngredientPriceCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -63,7 +78,7 @@ def add_or_update_price(
 @router.delete("/{price_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_price(
     price_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import uuid
 import shutil
-from app.database import get_db
-from app.dependencies import get_current_user
-from app.models.user import User
+from app.database import get_db, get_read_db
+from app.dependencies import CurrentUser, get_current_user
 from app.schemas.recipe import (
     IngredientCreate,
+    IngredientUpdate,
     IngredientResponse,
+    IngredientSuggestion,
+    PantryDiscoveryRequest,
+    RecipeDiscoveryResponse,
     RecipeCreate,
     RecipeUpdate,
     RecipeResponse,
     RecipeListResponse,
+    RecipeFacetsResponse,
     ImageUploadResponse
 )
+from app.services import autocomplete_service, discovery_service
 from app.services.recipe_service import RecipeService
+from app.utils import pagination
 
 router = APIRouter(prefix="/api/recipes", tags=["Recipes"])
 
@@ -31,27 +37,35 @@ MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 # ==================== INGREDIENT ENDPOINTS ====================
 
 @router.get("/ingredients", response_model=List[IngredientResponse])
-async def list_ingredients(
+def list_ingredients(
+    response: Response,
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
-    List all ingredients with optional search.
+    List all ingredients with optional search, sorted by name.
     
     - **search**: Filter ingredients by name (case-insensitive)
-    - **skip**: Number of records to skip (pagination)
+    - **skip**: Number of records to skip (pagination; ignored with a cursor)
     - **limit**: Maximum number of records to return
+    - **cursor**: Continue after the page whose `X-Next-Cursor` header this is
+    
+    The `X-Next-Cursor` response header is set when there are more results.
     """
     service = RecipeService(db)
-    return await service.get_ingredients(search=search, skip=skip, limit=limit)
+    ingredients, next_cursor = service.get_ingredients(search=search, skip=skip, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return ingredients
 
 
 @router.post("/ingredients", response_model=IngredientResponse, status_code=status.HTTP_201_CREATED)
-async def create_ingredient(
+def create_ingredient(
     ingredient: IngredientCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -60,56 +74,132 @@ async def create_ingredient(
     Requires authentication. Created ingredient will be associated with the user.
     """
     service = RecipeService(db)
-    return await service.create_ingredient(ingredient, user_id=current_user.id)
+    return service.create_ingredient(ingredient, user_id=current_user.id)
+
+
+@router.get("/ingredients/autocomplete", response_model=List[IngredientSuggestion])
+def autocomplete_ingredients(
+    q: str = Query(..., min_length=1, max_length=100, description="Text typed so far"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Suggest ingredients for the text typed so far.
+    
+    Tolerates typos ("tomatoe" finds "Tomato") and ranks names starting with
+    the text and ingredients used in many recipes first.
+    """
+    suggestions = autocomplete_service.suggest_ingredients(db, q, limit)
+    return [IngredientSuggestion.model_validate(suggestion) for suggestion in suggestions]
 
 
 @router.get("/ingredients/{ingredient_id}", response_model=IngredientResponse)
-async def get_ingredient(
+def get_ingredient(
     ingredient_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get ingredient details by ID."""
     service = RecipeService(db)
-    return await service.get_ingredient_by_id(ingredient_id)
+    return service.get_ingredient_by_id(ingredient_id)
+
+
+@router.put("/ingredients/{ingredient_id}", response_model=IngredientResponse)
+def update_ingredient(
+    ingredient_id: int,
+    ingredient_update: IngredientUpdate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Update an ingredient.
+    
+    Only the user who created the ingredient can update it. Nutrition of every
+    recipe using the ingredient is recalculated.
+    """
+    service = RecipeService(db)
+    return service.update_ingredient(ingredient_id, ingredient_update, current_user.id)
 
 
 # ==================== RECIPE ENDPOINTS ====================
 
+def macro_ranges(
+    min_calories: Optional[float] = Query(None, ge=0),
+    max_calories: Optional[float] = Query(None, ge=0),
+    min_protein: Optional[float] = Query(None, ge=0),
+    max_protein: Optional[float] = Query(None, ge=0),
+    min_carbs: Optional[float] = Query(None, ge=0),
+    max_carbs: Optional[float] = Query(None, ge=0),
+    min_fats: Optional[float] = Query(None, ge=0),
+    max_fats: Optional[float] = Query(None, ge=0)
+) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """Per-serving (min, max) query parameters of the macros that have one"""
+    ranges = {
+        'calories': (min_calories, max_calories),
+        'protein': (min_protein, max_protein),
+        'carbs': (min_carbs, max_carbs),
+        'fats': (min_fats, max_fats)
+    }
+    return {macro: bounds for macro, bounds in ranges.items() if bounds != (None, None)}
+
+
 @router.get("/", response_model=List[RecipeListResponse])
-async def list_recipes(
+def list_recipes(
+    response: Response,
     search: Optional[str] = None,
     tag: Optional[str] = None,
+    tags: Optional[str] = None,
+    mode: str = Query("all", pattern="^(all|any)$"),
     author_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    sort: Optional[str] = Query(None, pattern="^protein_density$"),
+    ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = Depends(macro_ranges),
+    db: Session = Depends(get_read_db)
 ):
     """
     List recipes with filters and pagination.
     
     - **search**: Filter by recipe title (case-insensitive)
     - **tag**: Filter by tag name
+    - **tags**: Comma-separated tag names, e.g. `vegan,quick`
+    - **mode**: `all` keeps recipes with every tag, `any` with at least one
     - **author_id**: Filter by author user ID
-    - **skip**: Number of records to skip (pagination)
+    - **min_calories**, **max_calories**, **min_protein**, ...: Per-serving
+      nutrition ranges (inclusive) for calories, protein, carbs and fats
+    - **sort**: `protein_density` for most protein per 100 kcal first
+      (default: newest first, most relevant first when searching)
+    - **skip**: Number of records to skip (pagination; ignored with a cursor)
     - **limit**: Maximum number of records to return (max 100)
+    - **cursor**: Continue after the page whose `X-Next-Cursor` header this is
+    
+    The `X-Next-Cursor` response header is set when there are more results.
     """
     if limit > 100:
         limit = 100
     
     service = RecipeService(db)
-    return await service.get_recipes(
+    recipes, next_cursor = service.get_recipes(
         search=search,
         tag=tag,
         author_id=author_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        tags=tags.split(",") if tags else None,
+        mode=mode,
+        macro_ranges=ranges,
+        sort=sort
     )
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return recipes
 
 
 @router.post("/", response_model=RecipeResponse, status_code=status.HTTP_201_CREATED)
-async def create_recipe(
+def create_recipe(
     recipe: RecipeCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -121,13 +211,67 @@ async def create_recipe(
     - Tags will be created if they don't exist
     """
     service = RecipeService(db)
-    return await service.create_recipe(recipe, user_id=current_user.id)
+    return service.create_recipe(recipe, user_id=current_user.id)
+
+
+@router.get("/facets", response_model=RecipeFacetsResponse)
+def recipe_facets(
+    search: Optional[str] = None,
+    tag: Optional[str] = None,
+    tags: Optional[str] = None,
+    mode: str = Query("all", pattern="^(all|any)$"),
+    author_id: Optional[int] = None,
+    ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = Depends(macro_ranges),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Count recipes per tag for the filter sidebar.
+    
+    Takes the same filters as the recipe list and returns the size of the
+    whole result set and how many of its recipes carry each tag.
+    """
+    service = RecipeService(db)
+    return service.get_tag_facets(
+        search=search,
+        tag=tag,
+        author_id=author_id,
+        tags=tags.split(",") if tags else None,
+        mode=mode,
+        macro_ranges=ranges
+    )
+
+
+@router.post("/discover", response_model=List[RecipeDiscoveryResponse])
+def discover_recipes(
+    pantry: PantryDiscoveryRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Find public recipes you can (almost) cook with the ingredients you have.
+    
+    Recipes are ranked by coverage, the fraction of their ingredients in the
+    pantry. Each result lists the missing ingredients with their cheapest price
+    for the recipe's amount (respecting your exclusions).
+    
+    - **ingredient_ids**: Ingredients on hand
+    - **min_coverage**: Only return recipes with at least this coverage (0-1)
+    - **limit**: Maximum number of recipes to return
+    """
+    matches = discovery_service.discover_recipes(
+        db,
+        pantry.ingredient_ids,
+        current_user.id,
+        min_coverage=pantry.min_coverage,
+        limit=pantry.limit
+    )
+    return [RecipeDiscoveryResponse.model_validate(match) for match in matches]
 
 
 @router.get("/{recipe_id}", response_model=RecipeResponse)
-async def get_recipe(
+def get_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get detailed recipe information.
@@ -140,14 +284,14 @@ async def get_recipe(
     - Author information
     """
     service = RecipeService(db)
-    return await service.get_recipe_by_id(recipe_id)
+    return service.get_recipe_by_id(recipe_id)
 
 
 @router.put("/{recipe_id}", response_model=RecipeResponse)
-async def update_recipe(
+def update_recipe(
     recipe_id: int,
     recipe_update: RecipeUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -156,13 +300,13 @@ async def update_recipe(
     Requires authentication. Only the recipe author can update their recipe.
     """
     service = RecipeService(db)
-    return await service.update_recipe(recipe_id, recipe_update, user_id=current_user.id)
+    return service.update_recipe(recipe_id, recipe_update, user_id=current_user.id)
 
 
 @router.delete("/{recipe_id}", status_code=status.HTTP_200_OK)
-async def delete_recipe(
+def delete_recipe(
     recipe_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -171,15 +315,15 @@ async def delete_recipe(
     Requires authentication. Only the recipe author can delete their recipe.
     """
     service = RecipeService(db)
-    return await service.delete_recipe(recipe_id, user_id=current_user.id)
+    return service.delete_recipe(recipe_id, user_id=current_user.id)
 
 
 # ==================== IMAGE UPLOAD ENDPOINT ====================
 
 @router.post("/upload-image", response_model=ImageUploadResponse)
-async def upload_recipe_image(
+def upload_recipe_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Upload a recipe image.
@@ -201,7 +345,7 @@ async def upload_recipe_image(
         )
     
     # Read file and check size
-    file_content = await file.read()
+    file_content = file.file.read()
     if len(file_content) > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1,8 +1,11 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, Optional, List
 from datetime import date, datetime
 from enum import Enum
 
+# Alias for fields named "date": inside those classes the name no longer refers to the type
+DateType = date
+
 
 # Meal type enum
 class MealType(str, Enum):
@@ -22,10 +25,18 @@ class MealPlanCreate(BaseModel):
 
 
 class MealPlanUpdate(BaseModel):
-    date: Optional[date] = None
+    date: Optional[DateType] = None
     meal_type: Optional[MealType] = None
     servings: Optional[int] = Field(None, ge=1)
     is_cooked: Optional[bool] = None
+    
+    @field_validator('date', 'meal_type', 'servings', 'is_cooked')
+    @classmethod
+    def reject_null(cls, value):
+        # Omit a field to keep it; every one of them is a required column
+        if value is None:
+            raise ValueError('cannot be null')
+        return value
 
 
 class MealPlanResponse(BaseModel):
@@ -53,6 +64,43 @@ class MealPlanResponse(BaseModel):
         from_attributes = True
 
 
+# ==================== BATCH SCHEMAS ====================
+
+# Most operations accepted in one batch request
+MAX_BATCH_OPERATIONS = 200
+
+
+class MealPlanBatchUpdate(MealPlanUpdate):
+    id: int = Field(..., gt=0)
+
+
+class MealPlanBatchRequest(BaseModel):
+    """Create, update and delete meal plan items in one transaction"""
+    create: List[MealPlanCreate] = Field(default_factory=list)
+    update: List[MealPlanBatchUpdate] = Field(default_factory=list)
+    delete: List[int] = Field(default_factory=list)  # Meal plan item IDs
+    
+    @model_validator(mode='after')
+    def validate_size(self) -> 'MealPlanBatchRequest':
+        if len(self.create) + len(self.update) + len(self.delete) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f'at most {MAX_BATCH_OPERATIONS} operations per batch')
+        return self
+
+
+class MealPlanBatchResponse(BaseModel):
+    created: List[MealPlanResponse]  # In request order
+    updated: List[MealPlanResponse]  # In request order
+    deleted: List[int]
+
+
+class MealPlanCopyRequest(BaseModel):
+    """Copy the meals of a date range to another start date"""
+    source_start: date
+    source_end: date
+    target_start: date
+    replace_existing: bool = False  # Delete meals already planned in the target range first
+
+
 # ==================== SHOPPING LIST SCHEMA ====================
 
 class ShoppingListItem(BaseModel):
@@ -80,10 +128,11 @@ class OptimizedShoppingListItem(BaseModel):
     ingredient_name: str
     total_amount: float
     unit: str
-    cheapest_price: Optional[float] = None  # €/unit
+    cheapest_price: Optional[float] = None  # € per price_unit
     cheapest_supermarket: Optional[str] = None
     cheapest_supermarket_id: Optional[int] = None
-    total_cost: Optional[float] = None  # total_amount * cheapest_price
+    price_unit: Optional[str] = None  # kg, L or unit; total_amount is converted to it
+    total_cost: Optional[float] = None  # converted total_amount * cheapest_price
 
 
 class SupermarketTotal(BaseModel):
@@ -106,3 +155,82 @@ class OptimizedShoppingListResponse(BaseModel):
     recommended_distribution: str  # Human-readable recommendation
     potential_savings: Optional[str] = None  # e.g., "optimized 10/12 items"
 
+
+
+class SupermarketBasketCost(BaseModel):
+    """Cost of the whole shopping list at a single supermarket"""
+    supermarket_id: int
+    supermarket_name: str
+    total_price: float  # Total € for the items this supermarket sells
+    available_items: int
+    missing_items: int  # Items this supermarket has no price for
+    delta_vs_optimized: float  # total_price - optimized cost of the same (available) items
+
+
+class BasketComparisonResponse(BaseModel):
+    """Whole-basket cost per supermarket compared with the optimized split"""
+    start_date: date
+    end_date: date
+    total_items: int
+    items_with_prices: int
+    total_optimized: float  # Cheapest per-item split across all supermarkets
+    supermarkets: List[SupermarketBasketCost]  # Most complete, then cheapest, first
+
+
+# ==================== MEAL PLAN GENERATOR SCHEMAS ====================
+
+class PlanGoal(str, Enum):
+    macros = "macros"  # Closest fit to the daily macro targets
+    variety = "variety"  # As few repeated recipes as possible, then macro fit
+
+
+class MealPlanGenerateRequest(BaseModel):
+    """Fill a date range with recipes matching the user's daily macro targets"""
+    start_date: date
+    end_date: date
+    # Servings eaten in each slot to fill; omitted slots (or 0) are left alone
+    slots: Dict[MealType, int] = Field(
+        default_factory=lambda: {MealType.breakfast: 1, MealType.lunch: 1, MealType.dinner: 1}
+    )
+    replace_existing: bool = False  # Replace meals already planned in these slots
+    include_cost: bool = False  # Estimate the cost of the generated meals
+    cost_weight: float = Field(default=0, ge=0)  # 0.01 trades 1 € for a 10% miss on one macro for a day
+    budget: Optional[float] = Field(default=None, gt=0)  # Max € for the generated meals; only priced recipes are used
+    goal: PlanGoal = PlanGoal.macros
+    seed: Optional[int] = None  # Same seed and catalogue give the same plan
+
+    @field_validator('slots')
+    @classmethod
+    def validate_slots(cls, slots: Dict[MealType, int]) -> Dict[MealType, int]:
+        if any(servings < 0 or servings > 20 for servings in slots.values()):
+            raise ValueError('slot servings must be between 0 and 20')
+        if not any(slots.values()):
+            raise ValueError('at least one slot needs servings')
+        return slots
+
+
+class MacroTargets(BaseModel):
+    calories: Optional[float] = None
+    protein: Optional[float] = None
+    carbs: Optional[float] = None
+    fats: Optional[float] = None
+
+
+class DailyNutrition(BaseModel):
+    """Planned nutrition of one day"""
+    date: date
+    calories: float
+    protein: float
+    carbs: float
+    fats: float
+
+
+class GeneratedMealPlanResponse(BaseModel):
+    start_date: date
+    end_date: date
+    targets: MacroTargets  # Daily targets from the user's profile
+    created_items: int
+    items: List[MealPlanResponse]  # Every meal now planned in the range
+    days: List[DailyNutrition]
+    estimated_cost: Optional[float] = None  # € for the generated meals (include_cost or budget)
+    unpriced_items: int = 0  # Generated meals left out of estimated_cost
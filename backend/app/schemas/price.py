@@ -55,6 +55,21 @@ class IngredientPriceResponse(IngredientPriceBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class IngredientPriceSummary(BaseModel):
+    """Schema for precomputed community price aggregates at one supermarket"""
+    ingredient_id: int
+    ingredient_name: str
+    supermarket_id: int
+    supermarket_name: str
+    min_price: Decimal
+    median_price: Decimal
+    price_count: int
+    unit: UnitType
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class PriceComparisonResponse(BaseModel):
     """Schema for price comparison response"""
     ingredient_id: int
@@ -11,6 +11,8 @@ class IngredientCreate(BaseModel):
     protein_per_100g: float = Field(..., ge=0, description="Protein in grams per 100g")
     carbs_per_100g: float = Field(..., ge=0, description="Carbs in grams per 100g")
     fats_per_100g: float = Field(..., ge=0, description="Fats in grams per 100g")
+    density_g_per_ml: Optional[float] = Field(None, gt=0, description="Grams per ml, converts weights to volumes")
+    unit_weight_g: Optional[float] = Field(None, gt=0, description="Grams per unit/piece")
     is_public: Optional[bool] = True
 
 
@@ -20,6 +22,8 @@ class IngredientUpdate(BaseModel):
     protein_per_100g: Optional[float] = Field(None, ge=0)
     carbs_per_100g: Optional[float] = Field(None, ge=0)
     fats_per_100g: Optional[float] = Field(None, ge=0)
+    density_g_per_ml: Optional[float] = Field(None, gt=0)
+    unit_weight_g: Optional[float] = Field(None, gt=0)
     is_public: Optional[bool] = None
 
 
@@ -30,6 +34,8 @@ class IngredientResponse(BaseModel):
     protein_per_100g: float
     carbs_per_100g: float
     fats_per_100g: float
+    density_g_per_ml: Optional[float] = None
+    unit_weight_g: Optional[float] = None
     is_public: bool
     created_by: Optional[int]
     created_at: datetime
@@ -52,8 +58,28 @@ class TagResponse(BaseModel):
         from_attributes = True
 
 
+class TagFacet(BaseModel):
+    name: str
+    count: int  # Recipes in the result set with this tag
+
+
+class RecipeFacetsResponse(BaseModel):
+    total: int  # Recipes in the result set
+    tags: List[TagFacet]
+
+
 # ==================== RECIPE INGREDIENT SCHEMAS ====================
 
+class IngredientSuggestion(BaseModel):
+    id: int
+    name: str
+    usage_count: int  # Number of recipes using the ingredient
+    score: float  # Similarity + prefix and popularity bonus, higher is better
+    
+    class Config:
+        from_attributes = True
+
+
 class RecipeIngredientCreate(BaseModel):
     ingredient_id: int = Field(..., gt=0)
     amount: float = Field(..., gt=0, description="Amount of ingredient")
@@ -169,6 +195,41 @@ class RecipeListResponse(BaseModel):
         from_attributes = True
 
 
+# ==================== PANTRY DISCOVERY SCHEMAS ====================
+
+class PantryDiscoveryRequest(BaseModel):
+    ingredient_ids: List[int] = Field(..., min_items=1, max_items=500, description="Ingredients on hand")
+    min_coverage: float = Field(0.0, ge=0, le=1, description="Minimum fraction of a recipe's ingredients on hand")
+    limit: int = Field(20, ge=1, le=100)
+
+
+class MissingIngredientResponse(BaseModel):
+    ingredient_id: int
+    ingredient_name: str
+    amount: float
+    unit: str
+    cheapest_cost: Optional[float] = None  # € for the recipe's amount
+    cheapest_supermarket: Optional[str] = None
+    cheapest_supermarket_id: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class RecipeDiscoveryResponse(BaseModel):
+    recipe_id: int
+    title: str
+    image_url: Optional[str]
+    coverage: float  # Fraction of the recipe's ingredients on hand
+    matched_count: int
+    total_ingredients: int
+    missing_ingredients: List[MissingIngredientResponse]
+    missing_cost: Optional[float] = None  # None when a missing ingredient has no price
+    
+    class Config:
+        from_attributes = True
+
+
 # ==================== IMAGE UPLOAD SCHEMA ====================
 
 class ImageUploadResponse(BaseModel):
@@ -0,0 +1,32 @@
+"""Backfill script for stored recipe nutrition totals
+
+Recomputes total_calories, total_protein, total_carbs and total_fats on every
+recipe from its ingredients. Run it after applying the migration that adds the
+columns; until then recipes without totals are calculated on every read.
+
+Usage:
+    python -m app.scripts.backfill_recipe_nutrition
+"""
+
+from app.database import SessionLocal
+from app.services import nutrition_service
+
+
+def main():
+    """Main function"""
+    print("🔄 Backfilling recipe nutrition totals...")
+    db = SessionLocal()
+    try:
+        updated_count = nutrition_service.refresh_recipe_totals(db)
+        db.commit()
+        print(f"✅ Successfully updated {updated_count} recipes")
+    except Exception as e:
+        print(f"❌ Error backfilling recipe nutrition: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
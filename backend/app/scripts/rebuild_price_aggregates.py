@@ -0,0 +1,32 @@
+"""Rebuild script for precomputed ingredient price aggregates
+
+Recomputes the ingredient_cheapest_prices table (min, median and count of
+community prices per ingredient per supermarket) from ingredient_prices.
+Run it after applying the migration that creates the table, or whenever the
+aggregates need a backfill.
+
+Usage:
+    python -m app.scripts.rebuild_price_aggregates
+"""
+
+from app.database import SessionLocal
+from app.services import price_service
+
+
+def main():
+    """Main function"""
+    print("🔄 Rebuilding ingredient price aggregates...")
+    db = SessionLocal()
+    try:
+        created_count = price_service.rebuild_price_aggregates(db)
+        print(f"✅ Successfully rebuilt {created_count} price aggregates")
+    except Exception as e:
+        print(f"❌ Error rebuilding price aggregates: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
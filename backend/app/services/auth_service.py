@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 from app.models.user import User
 from app.schemas.user import UserRegister, UserLogin, UserUpdate, UserResponse
 from app.schemas.token import Token
-from app.utils.security import hash_password, verify_password, create_access_token
+from app.services import user_cache
+from app.utils.security import hash_password_async, verify_and_update_password, create_access_token
 from app.utils.google_oauth import get_google_user_info
 from datetime import datetime
 
@@ -14,10 +17,10 @@ class AuthService:
         self.db = db
     
     async def register_user(self, user_data: UserRegister) -> Token:
-        """Register new user with email/password."""
+        """Register new user with email/password (database work on the threadpool)."""
         
         # Check if email exists
-        existing_user = self.db.query(User).filter(User.email == user_data.email).first()
+        existing_user = await run_in_threadpool(self._find_user, user_data.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -25,9 +28,44 @@ class AuthService:
             )
         
         # Hash password
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         
-        # Create user
+        return await run_in_threadpool(self._create_user, user_data, hashed_password)
+    
+    async def login_user(self, credentials: UserLogin) -> Token:
+        """Login with email/password (database work on the threadpool)."""
+        
+        # Find user
+        user = await run_in_threadpool(self._find_user, credentials.email)
+        if not user or not user.password_hash:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect email or password"
+            )
+        
+        # Verify password
+        valid, new_hash = await verify_and_update_password(credentials.password, user.password_hash)
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect email or password"
+            )
+        
+        # Check if active
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Account is disabled"
+            )
+        
+        return await run_in_threadpool(self._complete_login, user, new_hash)
+    
+    def _find_user(self, email: str) -> Optional[User]:
+        """User with an email, if any"""
+        return self.db.query(User).filter(User.email == email).first()
+    
+    def _create_user(self, user_data: UserRegister, hashed_password: str) -> Token:
+        """Store a registered user and issue its token"""
         new_user = User(
             email=user_data.email,
             password_hash=hashed_password,
@@ -58,34 +96,17 @@ class AuthService:
             user=UserResponse.from_orm(new_user)
         )
     
-    async def login_user(self, credentials: UserLogin) -> Token:
-        """Login with email/password."""
+    def _complete_login(self, user: User, new_hash: Optional[str]) -> Token:
+        """Record a successful login and issue the user's token"""
         
-        # Find user
-        user = self.db.query(User).filter(User.email == credentials.email).first()
-        if not user or not user.password_hash:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email or password"
-            )
-        
-        # Verify password
-        if not verify_password(credentials.password, user.password_hash):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email or password"
-            )
-        
-        # Check if active
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Account is disabled"
-            )
+        # Upgrade the hash to the current cost factor
+        if new_hash:
+            user.password_hash = new_hash
         
         # Update last login
         user.last_login = datetime.utcnow()
         self.db.commit()
+        user_cache.invalidate(user.id)
         
         # Generate JWT
         access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
@@ -95,11 +116,11 @@ class AuthService:
             user=UserResponse.from_orm(user)
         )
     
-    async def google_login(self, auth_code: str) -> Token:
+    def google_login(self, auth_code: str) -> Token:
         """Login/Register with Google OAuth."""
         
         # Exchange code for user info
-        google_user = await get_google_user_info(auth_code)
+        google_user = get_google_user_info(auth_code)
         
         if not google_user or "email" not in google_user:
             raise HTTPException(
@@ -118,6 +139,7 @@ class AuthService:
                 user.google_id = google_user["id"]
             user.last_login = datetime.utcnow()
             self.db.commit()
+            user_cache.invalidate(user.id)
         else:
             # Create new user
             user = User(
@@ -139,7 +161,7 @@ class AuthService:
             user=UserResponse.from_orm(user)
         )
     
-    async def update_user(self, user_id: int, user_update: UserUpdate) -> UserResponse:
+    def update_user(self, user_id: int, user_update: UserUpdate) -> UserResponse:
         """Update user profile."""
         
         user = self.db.query(User).filter(User.id == user_id).first()
@@ -156,5 +178,20 @@ class AuthService:
         
         self.db.commit()
         self.db.refresh(user)
+        user_cache.invalidate(user.id)
         
         return UserResponse.from_orm(user)
+    
+    def deactivate_user(self, user_id: int) -> None:
+        """Disable an account (soft delete, its data is kept)"""
+        
+        user = self.db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        user.is_active = False
+        self.db.commit()
+        user_cache.invalidate(user.id)
@@ -0,0 +1,211 @@
+"""Typo-tolerant ingredient autocomplete
+
+Ranks public ingredients by trigram similarity to what was typed, with a bonus
+for names starting with it and for ingredients used in many recipes.
+PostgreSQL uses pg_trgm behind a GIN index on ingredients.name; other databases
+(SQLite in development and tests) use an in-process trigram index.
+"""
+
+import bisect
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Float, case, cast, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.database import primary_session
+from app.models.recipe import Ingredient, RecipeIngredient
+
+# Minimum trigram similarity for a fuzzy match (pg_trgm's default threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+# Added to the similarity of names starting with the typed text
+PREFIX_BONUS = 0.5
+
+# Weight of log(1 + number of recipes using the ingredient)
+POPULARITY_WEIGHT = 0.05
+
+
+class Suggestion:
+    """Autocomplete candidate"""
+    def __init__(self, ingredient_id: int, name: str, usage_count: int, score: float):
+        self.id = ingredient_id
+        self.name = name
+        self.usage_count = usage_count
+        self.score = score
+
+
+def trigrams(value: str) -> Set[str]:
+    """Trigrams of every word, padded like pg_trgm ("  w", " wo", "wor", "or ")"""
+    result = set()
+    for word in value.lower().split():
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class TrigramIndex:
+    """In-process trigram and prefix index over public ingredient names"""
+    def __init__(self):
+        self.names: Dict[int, str] = {}
+        self.trigram_counts: Dict[int, int] = {}
+        self.usage: Counter = Counter()
+        self.postings: Dict[str, Set[int]] = {}
+        self._sorted: Optional[List[Tuple[str, int]]] = None  # (lower-case name, id), rebuilt after changes
+
+    @classmethod
+    def load(cls, db: Session) -> "TrigramIndex":
+        """Index every public ingredient (two queries)"""
+        index = cls()
+        for ingredient_id, name in db.query(Ingredient.id, Ingredient.name).filter(Ingredient.is_public == True):
+            index.add(ingredient_id, name)
+        index.usage.update(dict(
+            db.query(RecipeIngredient.ingredient_id, func.count(RecipeIngredient.id)).group_by(RecipeIngredient.ingredient_id)
+        ))
+        return index
+
+    def add(self, ingredient_id: int, name: str) -> None:
+        """(Re)index an ingredient name"""
+        self.remove(ingredient_id)
+        grams = trigrams(name)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(ingredient_id)
+        self.names[ingredient_id] = name
+        self.trigram_counts[ingredient_id] = len(grams)
+        self._sorted = None
+
+    def remove(self, ingredient_id: int) -> None:
+        """Drop an ingredient from the index"""
+        name = self.names.pop(ingredient_id, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(ingredient_id)
+                if not ids:
+                    del self.postings[gram]
+        del self.trigram_counts[ingredient_id]
+        self._sorted = None
+
+    def suggest(self, text: str, limit: int) -> List[Suggestion]:
+        """Top `limit` ingredients for the typed text"""
+        typed = text.strip().lower()
+        if not typed:
+            return []
+        query_grams = trigrams(typed)
+
+        # Shared trigrams per candidate, then pg_trgm similarity
+        shared: Counter = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+        similarities = {
+            ingredient_id: count / (len(query_grams) + self.trigram_counts[ingredient_id] - count)
+            for ingredient_id, count in shared.items()
+        }
+        candidates = {ingredient_id for ingredient_id, similarity in similarities.items() if similarity >= SIMILARITY_THRESHOLD}
+        prefixed = set(self._prefixed(typed))
+
+        suggestions = [
+            Suggestion(
+                ingredient_id,
+                self.names[ingredient_id],
+                self.usage[ingredient_id],
+                _score(similarities.get(ingredient_id, 0.0), ingredient_id in prefixed, self.usage[ingredient_id])
+            )
+            for ingredient_id in candidates | prefixed
+        ]
+        suggestions.sort(key=lambda s: (-s.score, s.name))
+        return suggestions[:limit]
+
+    def _prefixed(self, typed: str) -> Iterable[int]:
+        """Ingredients whose name starts with the typed text"""
+        if self._sorted is None:
+            self._sorted = sorted((name.lower(), ingredient_id) for ingredient_id, name in self.names.items())
+        start = bisect.bisect_left(self._sorted, (typed,))
+        for name, ingredient_id in self._sorted[start:]:
+            if not name.startswith(typed):
+                break
+            yield ingredient_id
+
+
+def _score(similarity: float, is_prefix: bool, usage_count: int) -> float:
+    """Ranking score of a candidate (higher is better)"""
+    return similarity + (PREFIX_BONUS if is_prefix else 0.0) + POPULARITY_WEIGHT * math.log1p(usage_count)
+
+
+_index: Optional[TrigramIndex] = None
+_lock = threading.Lock()
+
+
+def suggest_ingredients(db: Session, text: str, limit: int = 10) -> List[Suggestion]:
+    """Top `limit` public ingredients matching the typed text"""
+    text = text.strip()
+    if not text:
+        return []
+
+    if db.get_bind().dialect.name == 'postgresql':
+        return _suggest_postgres(db, text, limit)
+
+    global _index
+    with _lock:
+        if _index is None:
+            with primary_session(db) as primary:
+                _index = TrigramIndex.load(primary)
+        return _index.suggest(text, limit)
+
+
+def _suggest_postgres(db: Session, text: str, limit: int) -> List[Suggestion]:
+    """pg_trgm similarity (GIN index) plus prefix and popularity"""
+    usage_count = select(func.count(RecipeIngredient.id)).where(
+        RecipeIngredient.ingredient_id == Ingredient.id
+    ).correlate(Ingredient).scalar_subquery()
+    is_prefix = Ingredient.name.ilike(text.replace('%', r'\%').replace('_', r'\_') + '%')
+    score = (
+        cast(func.similarity(Ingredient.name, text), Float)
+        + case((is_prefix, PREFIX_BONUS), else_=0.0)
+        + POPULARITY_WEIGHT * func.ln(1 + usage_count)
+    )
+
+    rows = db.query(Ingredient.id, Ingredient.name, usage_count.label('usage_count'), score.label('score')).filter(
+        Ingredient.is_public == True,
+        or_(Ingredient.name.op('%')(text), is_prefix)
+    ).order_by(score.desc(), Ingredient.name).limit(limit).all()
+
+    return [Suggestion(row.id, row.name, row.usage_count, row.score) for row in rows]
+
+
+def update_ingredient(ingredient_id: int, name: str, is_public: bool) -> None:
+    """Patch the in-process index after an ingredient was created or changed"""
+    with _lock:
+        if _index is None:
+            return
+        if is_public:
+            _index.add(ingredient_id, name)
+        else:
+            _index.remove(ingredient_id)
+
+
+def refresh_usage(db: Session, ingredient_ids: Iterable[int]) -> None:
+    """Recount recipe usage of some ingredients after a recipe write"""
+    ingredient_ids = set(ingredient_ids)
+    with _lock:
+        if _index is None or not ingredient_ids:
+            return
+        counts = dict(
+            db.query(RecipeIngredient.ingredient_id, func.count(RecipeIngredient.id)).filter(
+                RecipeIngredient.ingredient_id.in_(ingredient_ids)
+            ).group_by(RecipeIngredient.ingredient_id)
+        )
+        for ingredient_id in ingredient_ids:
+            _index.usage[ingredient_id] = counts.get(ingredient_id, 0)
+
+
+def invalidate() -> None:
+    """Drop the in-process index so the next request rebuilds it"""
+    global _index
+
+    with _lock:
+        _index = None
@@ -0,0 +1,169 @@
+"""Basket solver for choosing which supermarkets to visit for a shopping list"""
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Enumerate every store subset when there are at most this many candidate stores
+EXACT_STORE_LIMIT = 8
+
+# Wall-clock budget for the heuristic search on larger instances
+TIME_BUDGET_SECONDS = 0.05
+
+# (items that can't be bought at any chosen store, item cost + visit penalties)
+Score = Tuple[int, float]
+
+
+def solve_basket(
+    costs: np.ndarray,
+    store_penalty: float = 0.0,
+    max_stores: Optional[int] = None,
+    time_budget: float = TIME_BUDGET_SECONDS
+) -> np.ndarray:
+    """
+    Choose the set of supermarkets to shop at
+
+    costs: (items x supermarkets) cost of buying each item at each supermarket,
+    `inf` where the item is not available there
+
+    Minimizes, in order:
+    1. Items that can't be bought at any chosen supermarket
+    2. Total item cost plus store_penalty per visited supermarket
+
+    At most max_stores supermarkets are chosen when given. Instances with up to
+    EXACT_STORE_LIMIT candidate supermarkets are solved exactly; larger ones use
+    greedy construction plus local search within time_budget seconds.
+
+    Returns a boolean mask over the supermarket columns.
+    """
+    chosen = np.zeros(costs.shape[1], dtype=bool)
+
+    # Only supermarkets selling at least one item are worth visiting
+    candidates = np.flatnonzero(np.isfinite(costs).any(axis=0))
+    if candidates.size == 0:
+        return chosen
+
+    limit = candidates.size if max_stores is None else min(max_stores, candidates.size)
+    candidate_costs = costs[:, candidates]
+
+    if candidates.size <= EXACT_STORE_LIMIT:
+        picked = _solve_exact(candidate_costs, store_penalty, limit)
+    else:
+        deadline = time.perf_counter() + time_budget
+        picked = _solve_local_search(candidate_costs, store_penalty, limit, deadline)
+
+    chosen[candidates[picked]] = True
+    return chosen
+
+
+def assign_items(costs: np.ndarray, chosen: np.ndarray) -> np.ndarray:
+    """Column of each item's cheapest chosen supermarket (-1 if unavailable)"""
+    if costs.shape[1] == 0:
+        return np.full(costs.shape[0], -1, dtype=int)
+
+    masked = np.where(chosen[np.newaxis, :], costs, np.inf)
+    assignment = masked.argmin(axis=1)
+    assignment[~np.isfinite(masked.min(axis=1, initial=np.inf))] = -1
+    return assignment
+
+
+def _score(costs: np.ndarray, chosen: np.ndarray, store_penalty: float) -> Score:
+    """Score a set of supermarkets (lower is better)"""
+    best = np.where(chosen[np.newaxis, :], costs, np.inf).min(axis=1, initial=np.inf)
+    available = np.isfinite(best)
+    total = float(best[available].sum()) + store_penalty * int(chosen.sum())
+    return int((~available).sum()), round(total, 6)
+
+
+def _solve_exact(costs: np.ndarray, store_penalty: float, limit: int) -> np.ndarray:
+    """Evaluate every subset of up to `limit` supermarkets at once"""
+    store_count = costs.shape[1]
+
+    # One row per non-empty subset, one column per supermarket
+    subsets = (np.arange(1, 2 ** store_count)[:, np.newaxis] >> np.arange(store_count)) & 1 == 1
+    sizes = subsets.sum(axis=1)
+    subsets, sizes = subsets[sizes <= limit], sizes[sizes <= limit]
+
+    # (items x subsets) cheapest cost of each item within each subset
+    best = np.where(subsets[np.newaxis, :, :], costs[:, np.newaxis, :], np.inf).min(axis=2)
+    available = np.isfinite(best)
+    missing = (~available).sum(axis=0)
+    totals = np.round(np.where(available, best, 0).sum(axis=0) + store_penalty * sizes, 6)
+
+    # Fewest missing items, then lowest total, then fewest supermarkets
+    return subsets[np.lexsort((sizes, totals, missing))[0]]
+
+
+def _solve_local_search(
+    costs: np.ndarray,
+    store_penalty: float,
+    limit: int,
+    deadline: float
+) -> np.ndarray:
+    """Greedy construction followed by add/drop/swap local search"""
+    # Every item's cheapest supermarket is optimal without penalty or limit
+    chosen = np.zeros(costs.shape[1], dtype=bool)
+    available = np.isfinite(costs).any(axis=1)
+    chosen[costs[available].argmin(axis=1)] = True
+    if chosen.sum() > limit:
+        chosen = _greedy(costs, store_penalty, limit, deadline)
+    best_score = _score(costs, chosen, store_penalty)
+
+    # Local search: apply the first improving move until none is left
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for candidate in _neighbours(chosen, limit):
+            score = _score(costs, candidate, store_penalty)
+            if score < best_score:
+                chosen, best_score = candidate, score
+                improved = True
+                break
+            if time.perf_counter() >= deadline:
+                break
+
+    return chosen
+
+
+def _greedy(costs: np.ndarray, store_penalty: float, limit: int, deadline: float) -> np.ndarray:
+    """Keep adding the supermarket that improves the score most"""
+    chosen = np.zeros(costs.shape[1], dtype=bool)
+    best_score = _score(costs, chosen, store_penalty)
+
+    while chosen.sum() < limit and time.perf_counter() < deadline:
+        score, column = min(
+            (_score(costs, _with(chosen, column, True), store_penalty), column)
+            for column in np.flatnonzero(~chosen)
+        )
+        if score >= best_score:
+            break
+        chosen[column] = True
+        best_score = score
+
+    return chosen
+
+
+def _neighbours(chosen: np.ndarray, limit: int):
+    """Yield supermarket masks one drop, add or swap away from `chosen`"""
+    inside = np.flatnonzero(chosen)
+    outside = np.flatnonzero(~chosen)
+
+    for column in inside:
+        yield _with(chosen, column, False)
+
+    if inside.size < limit:
+        for column in outside:
+            yield _with(chosen, column, True)
+
+    for removed in inside:
+        without = _with(chosen, removed, False)
+        for added in outside:
+            yield _with(without, added, True)
+
+
+def _with(chosen: np.ndarray, column: int, value: bool) -> np.ndarray:
+    """Copy of `chosen` with one supermarket toggled"""
+    candidate = chosen.copy()
+    candidate[column] = value
+    return candidate
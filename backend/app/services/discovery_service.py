@@ -0,0 +1,254 @@
+"""Pantry-based recipe discovery ("what can I cook with what I have")"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.database import primary_session
+from app.models.recipe import Ingredient, Recipe, RecipeIngredient
+from app.services import price_matrix
+
+# Rebuild from the database after this long so writes from other workers show up
+MAX_AGE_SECONDS = 300
+
+# (ingredient_id, amount, unit) of one recipe line
+RecipeLine = Tuple[int, float, str]
+
+
+class MissingIngredient:
+    """Recipe ingredient that isn't in the pantry, with its cheapest cost"""
+    def __init__(
+        self,
+        ingredient_id: int,
+        ingredient_name: str,
+        amount: float,
+        unit: str,
+        cheapest_cost: Optional[float] = None,
+        cheapest_supermarket: Optional[str] = None,
+        cheapest_supermarket_id: Optional[int] = None
+    ):
+        self.ingredient_id = ingredient_id
+        self.ingredient_name = ingredient_name
+        self.amount = amount
+        self.unit = unit
+        self.cheapest_cost = cheapest_cost
+        self.cheapest_supermarket = cheapest_supermarket
+        self.cheapest_supermarket_id = cheapest_supermarket_id
+
+
+class RecipeMatch:
+    """Recipe ranked by how much of it the pantry covers"""
+    def __init__(
+        self,
+        recipe_id: int,
+        title: str,
+        image_url: Optional[str],
+        coverage: float,
+        matched_count: int,
+        total_ingredients: int,
+        missing_ingredients: List[MissingIngredient],
+        missing_cost: Optional[float]
+    ):
+        self.recipe_id = recipe_id
+        self.title = title
+        self.image_url = image_url
+        self.coverage = coverage
+        self.matched_count = matched_count
+        self.total_ingredients = total_ingredients
+        self.missing_ingredients = missing_ingredients
+        self.missing_cost = missing_cost
+
+
+class PantryIndex:
+    """
+    Inverted index from ingredient to the public recipes using it
+
+    Matching a pantry only touches the postings of the pantry's ingredients,
+    never the whole catalogue.
+    """
+    def __init__(self):
+        self.postings: Dict[int, Set[int]] = {}
+        self.lines: Dict[int, List[RecipeLine]] = {}
+        self.distinct_counts: Dict[int, int] = {}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session) -> "PantryIndex":
+        """Index every public recipe (one query)"""
+        index = cls()
+        lines: Dict[int, List[RecipeLine]] = {}
+        rows = db.query(
+            RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id, RecipeIngredient.amount, RecipeIngredient.unit
+        ).join(Recipe).filter(Recipe.is_public == True)
+        for recipe_id, ingredient_id, amount, unit in rows:
+            lines.setdefault(recipe_id, []).append((ingredient_id, amount, unit))
+
+        for recipe_id, recipe_lines in lines.items():
+            index.add(recipe_id, recipe_lines)
+        return index
+
+    def is_stale(self) -> bool:
+        """Whether the index is old enough to be rebuilt"""
+        return time.monotonic() - self.built_at > MAX_AGE_SECONDS
+
+    def add(self, recipe_id: int, lines: List[RecipeLine]) -> None:
+        """(Re)index a recipe's ingredient lines"""
+        self.remove(recipe_id)
+        ingredient_ids = {ingredient_id for ingredient_id, _, _ in lines}
+        for ingredient_id in ingredient_ids:
+            self.postings.setdefault(ingredient_id, set()).add(recipe_id)
+        self.lines[recipe_id] = lines
+        self.distinct_counts[recipe_id] = len(ingredient_ids)
+
+    def remove(self, recipe_id: int) -> None:
+        """Drop a recipe from the index"""
+        for ingredient_id, _, _ in self.lines.pop(recipe_id, ()):
+            recipe_ids = self.postings.get(ingredient_id)
+            if recipe_ids is not None:
+                recipe_ids.discard(recipe_id)
+                if not recipe_ids:
+                    del self.postings[ingredient_id]
+        self.distinct_counts.pop(recipe_id, None)
+
+    def match(self, pantry: Set[int], min_coverage: float, limit: int) -> List[Tuple[int, int, float]]:
+        """(recipe_id, matched, coverage) of the best covered recipes"""
+        matched: Counter = Counter()
+        for ingredient_id in pantry:
+            matched.update(self.postings.get(ingredient_id, ()))
+
+        ranked = [
+            (recipe_id, count, count / self.distinct_counts[recipe_id])
+            for recipe_id, count in matched.items()
+        ]
+        ranked = [match for match in ranked if match[2] >= min_coverage]
+
+        # Best coverage first, then the recipes using more of the pantry
+        ranked.sort(key=lambda match: (-match[2], -match[1], -match[0]))
+        return ranked[:limit]
+
+
+_index: Optional[PantryIndex] = None
+_lock = threading.Lock()
+
+
+def discover_recipes(
+    db: Session,
+    pantry_ingredient_ids: Sequence[int],
+    user_id: int,
+    min_coverage: float = 0.0,
+    limit: int = 20
+) -> List[RecipeMatch]:
+    """
+    Public recipes ranked by the fraction of their ingredients in the pantry
+
+    Missing ingredients are costed at their cheapest supermarket for the
+    recipe's amounts, respecting the user's exclusions.
+    """
+    global _index
+
+    pantry = set(pantry_ingredient_ids)
+    with _lock:
+        if _index is None or _index.is_stale():
+            with primary_session(db) as primary:
+                _index = PantryIndex.load(primary)
+        matches = _index.match(pantry, min_coverage, limit)
+        lines = {recipe_id: _index.lines[recipe_id] for recipe_id, _, _ in matches}
+        totals = {recipe_id: _index.distinct_counts[recipe_id] for recipe_id, _, _ in matches}
+
+    if not matches:
+        return []
+
+    recipes = {
+        recipe.id: recipe
+        for recipe in db.query(Recipe.id, Recipe.title, Recipe.image_url).filter(Recipe.id.in_(lines))
+    }
+    missing_lines = [
+        (recipe_id, line)
+        for recipe_id, _, _ in matches
+        for line in lines[recipe_id]
+        if line[0] not in pantry
+    ]
+    names = {}
+    if missing_lines:
+        names = dict(
+            db.query(Ingredient.id, Ingredient.name).filter(Ingredient.id.in_({line[0] for _, line in missing_lines}))
+        )
+
+    # Cost every missing line in one pass over the price matrix
+    basket = price_matrix.get_basket_prices(db, [line[0] for _, line in missing_lines], user_id)
+    costs, _ = basket.costs([line[1] for _, line in missing_lines], [line[2] for _, line in missing_lines])
+    cheapest = costs.min(axis=1, initial=np.inf)
+    cheapest_columns = costs.argmin(axis=1) if costs.shape[1] else np.zeros(len(missing_lines), dtype=int)
+
+    missing: Dict[int, List[MissingIngredient]] = {recipe_id: [] for recipe_id in lines}
+    for (recipe_id, (ingredient_id, amount, unit)), cost, column in zip(missing_lines, cheapest, cheapest_columns):
+        priced = bool(np.isfinite(cost))
+        missing[recipe_id].append(MissingIngredient(
+            ingredient_id=ingredient_id,
+            ingredient_name=names.get(ingredient_id, ""),
+            amount=amount,
+            unit=unit,
+            cheapest_cost=round(float(cost), 2) if priced else None,
+            cheapest_supermarket=basket.supermarket_names[column] if priced else None,
+            cheapest_supermarket_id=basket.supermarket_ids[column] if priced else None
+        ))
+
+    results = []
+    for recipe_id, matched_count, coverage in matches:
+        recipe = recipes.get(recipe_id)
+        if recipe is None:
+            continue  # Deleted by another worker since the index was built
+
+        recipe_missing = missing[recipe_id]
+        # Only a total when every missing ingredient has a price
+        missing_cost = None
+        if all(item.cheapest_cost is not None for item in recipe_missing):
+            missing_cost = round(sum(item.cheapest_cost for item in recipe_missing), 2)
+
+        results.append(RecipeMatch(
+            recipe_id=recipe_id,
+            title=recipe.title,
+            image_url=recipe.image_url,
+            coverage=round(coverage, 4),
+            matched_count=matched_count,
+            total_ingredients=totals[recipe_id],
+            missing_ingredients=recipe_missing,
+            missing_cost=missing_cost
+        ))
+    return results
+
+
+def update_recipe(db: Session, recipe_id: int) -> None:
+    """Patch the index after a recipe was created or changed"""
+    with _lock:
+        if _index is None:
+            return
+
+        recipe = db.query(Recipe.is_public).filter(Recipe.id == recipe_id).first()
+        if recipe is None or not recipe.is_public:
+            _index.remove(recipe_id)
+            return
+
+        lines = db.query(RecipeIngredient.ingredient_id, RecipeIngredient.amount, RecipeIngredient.unit).filter(
+            RecipeIngredient.recipe_id == recipe_id
+        ).all()
+        _index.add(recipe_id, [tuple(line) for line in lines])
+
+
+def remove_recipe(recipe_id: int) -> None:
+    """Drop a deleted recipe from the index"""
+    with _lock:
+        if _index is not None:
+            _index.remove(recipe_id)
+
+
+def invalidate() -> None:
+    """Drop the index so the next request rebuilds it"""
+    global _index
+
+    with _lock:
+        _index = None
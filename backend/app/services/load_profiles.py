@@ -0,0 +1,67 @@
+"""Named eager-loading profiles, one per response type
+
+Every query whose results feed a response builder loads exactly the
+relationships that builder reads: many-to-one relationships with a JOIN,
+collections with a separate SELECT ... IN (selectinload), which keeps LIMIT
+working and avoids multiplying rows.
+
+With settings.RAISE_ON_LAZY_LOAD (enabled by the test suite) every other
+relationship on the loaded objects raises instead of lazy loading, so an N+1
+query introduced in a response builder fails the tests.
+"""
+
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import defaultload, joinedload, raiseload, selectinload
+
+from app.config import settings
+from app.models.meal_plan import MealPlanItem
+from app.models.recipe import Recipe, RecipeIngredient
+
+RAISE_ON_LAZY_LOAD = settings.RAISE_ON_LAZY_LOAD
+
+# Profile -> relationship paths its response builder reads
+PROFILES: Dict[str, List[Tuple]] = {
+    # RecipeService._build_list_response
+    'recipe_list': [
+        (Recipe.author,),
+        (Recipe.tags,),
+    ],
+    # RecipeService._build_detailed_response
+    'recipe_detail': [
+        (Recipe.author,),
+        (Recipe.tags,),
+        (Recipe.recipe_ingredients, RecipeIngredient.ingredient),
+    ],
+    # MealService._build_meal_plan_response (recipe nutrition totals are stored)
+    'meal_plan': [
+        (MealPlanItem.recipe,),
+    ],
+    # MealService.generate_shopping_list
+    'shopping_list': [
+        (MealPlanItem.recipe, Recipe.recipe_ingredients, RecipeIngredient.ingredient),
+    ],
+}
+
+
+def load_options(profile: str) -> list:
+    """Loader options for a profile, to pass to Query.options()"""
+    options = []
+    for path in PROFILES[profile]:
+        option = None
+        for attribute in path:
+            loader = selectinload if attribute.property.uselist else joinedload
+            option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+        options.append(option)
+
+    if RAISE_ON_LAZY_LOAD:
+        options.append(raiseload('*'))
+        # Also on every object loaded along the way
+        prefixes = {path[:length] for path in PROFILES[profile] for length in range(1, len(path) + 1)}
+        for prefix in prefixes:
+            option = defaultload(prefix[0])
+            for attribute in prefix[1:]:
+                option = option.defaultload(attribute)
+            options.append(option.raiseload('*'))
+
+    return options
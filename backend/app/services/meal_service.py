@@ -1,18 +1,37 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, insert
 from fastapi import HTTPException, status
 from typing import List, Dict
-from datetime import date
+from datetime import date, timedelta
+import numpy as np
 from app.models.meal_plan import MealPlanItem
-from app.models.recipe import Recipe, RecipeIngredient
+from app.models.recipe import Recipe
+from app.services.user_cache import CurrentUser
+from app.services import load_profiles, nutrition_service, optimization_service, plan_solver, tag_index
+from app.utils import units
 from app.schemas.meal_plan import (
     MealPlanCreate,
     MealPlanUpdate,
     MealPlanResponse,
+    MealPlanBatchRequest,
+    MealPlanBatchResponse,
+    MealPlanCopyRequest,
+    MealPlanGenerateRequest,
+    GeneratedMealPlanResponse,
+    MacroTargets,
+    DailyNutrition,
+    MealType,
+    PlanGoal,
     ShoppingListItem,
     ShoppingListResponse
 )
 
+# Longest date range the generator fills in one request
+MAX_GENERATE_DAYS = 31
+
+# Longest source range copied in one request
+MAX_COPY_DAYS = 31
+
 
 class MealService:
     def __init__(self, db: Session):
@@ -20,11 +39,11 @@ class MealService:
     
     # ==================== MEAL PLAN OPERATIONS ====================
     
-    async def add_meal_to_plan(self, meal_data: MealPlanCreate, user_id: int) -> MealPlanResponse:
+    def add_meal_to_plan(self, meal_data: MealPlanCreate, user_id: int) -> MealPlanResponse:
         """Add a meal to the user's meal plan."""
         
         # Verify recipe exists
-        recipe = self.db.query(Recipe).filter(Recipe.id == meal_data.recipe_id).first()
+        recipe = self.db.query(Recipe.id).filter(Recipe.id == meal_data.recipe_id).first()
         if not recipe:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -42,12 +61,11 @@ class MealService:
         
         self.db.add(meal_plan_item)
         self.db.commit()
-        self.db.refresh(meal_plan_item)
         
         # Return with calculated nutrition
-        return self._build_meal_plan_response(meal_plan_item)
+        return self._load_meal_responses([meal_plan_item.id])[meal_plan_item.id]
     
-    async def get_meal_plan(
+    def get_meal_plan(
         self,
         user_id: int,
         start_date: date,
@@ -56,7 +74,7 @@ class MealService:
         """Get user's meal plan for a date range."""
         
         meal_items = self.db.query(MealPlanItem).options(
-            joinedload(MealPlanItem.recipe).joinedload(Recipe.recipe_ingredients)
+            *load_profiles.load_options('meal_plan')
         ).filter(
             and_(
                 MealPlanItem.user_id == user_id,
@@ -67,7 +85,7 @@ class MealService:
         
         return [self._build_meal_plan_response(item) for item in meal_items]
     
-    async def update_meal_plan_item(
+    def update_meal_plan_item(
         self,
         meal_id: int,
         meal_update: MealPlanUpdate,
@@ -99,11 +117,10 @@ class MealService:
                 setattr(meal_item, field, value)
         
         self.db.commit()
-        self.db.refresh(meal_item)
         
-        return self._build_meal_plan_response(meal_item)
+        return self._load_meal_responses([meal_id])[meal_id]
     
-    async def delete_meal_plan_item(self, meal_id: int, user_id: int) -> Dict[str, str]:
+    def delete_meal_plan_item(self, meal_id: int, user_id: int) -> Dict[str, str]:
         """Delete a meal plan item."""
         
         # Get meal plan item
@@ -126,9 +143,295 @@ class MealService:
         
         return {"message": "Meal plan item deleted successfully"}
     
+    # ==================== BATCH OPERATIONS ====================
+    
+    def batch_meal_plan(self, batch: MealPlanBatchRequest, user_id: int) -> MealPlanBatchResponse:
+        """Apply creates, updates and deletes in one transaction (all or nothing)."""
+        
+        # Every referenced recipe in one query
+        recipe_ids = {meal.recipe_id for meal in batch.create}
+        if recipe_ids:
+            found = {recipe_id for recipe_id, in self.db.query(Recipe.id).filter(Recipe.id.in_(recipe_ids))}
+            missing = sorted(recipe_ids - found)
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Recipes not found: {', '.join(map(str, missing))}"
+                )
+        
+        # Every updated or deleted item in one query
+        update_ids = [meal.id for meal in batch.update]
+        delete_ids = set(batch.delete)
+        if len(set(update_ids)) != len(update_ids) or delete_ids.intersection(update_ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Each meal plan item can only be changed once per batch"
+            )
+        items = {}
+        if update_ids or delete_ids:
+            items = {
+                item.id: item
+                for item in self.db.query(MealPlanItem).filter(MealPlanItem.id.in_(delete_ids.union(update_ids)))
+            }
+            missing = sorted(delete_ids.union(update_ids) - set(items))
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Meal plan items not found: {', '.join(map(str, missing))}"
+                )
+            if any(item.user_id != user_id for item in items.values()):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="You don't have permission to change these meal plan items"
+                )
+        
+        for meal_update in batch.update:
+            meal_item = items[meal_update.id]
+            for field, value in meal_update.model_dump(exclude_unset=True, exclude={'id'}).items():
+                setattr(meal_item, field, value.value if field == 'meal_type' and value is not None else value)
+        
+        if delete_ids:
+            self.db.query(MealPlanItem).filter(MealPlanItem.id.in_(delete_ids)).delete(synchronize_session=False)
+        
+        created_ids = self._insert_meals([
+            {
+                'user_id': user_id,
+                'recipe_id': meal.recipe_id,
+                'date': meal.date,
+                'meal_type': meal.meal_type.value,
+                'servings': meal.servings
+            }
+            for meal in batch.create
+        ])
+        
+        self.db.commit()
+        
+        responses = self._load_meal_responses(created_ids + update_ids)
+        return MealPlanBatchResponse(
+            created=[responses[item_id] for item_id in created_ids],
+            updated=[responses[item_id] for item_id in update_ids],
+            deleted=sorted(delete_ids)
+        )
+    
+    def copy_meal_plan(self, copy: MealPlanCopyRequest, user_id: int) -> List[MealPlanResponse]:
+        """Copy the meals of a date range to a range starting at target_start."""
+        
+        if copy.source_end < copy.source_start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="source_end must be greater than or equal to source_start"
+            )
+        if (copy.source_end - copy.source_start).days + 1 > MAX_COPY_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can copy at most {MAX_COPY_DAYS} days at a time"
+            )
+        offset = copy.target_start - copy.source_start
+        target_end = copy.source_end + offset
+        
+        source = self.db.query(
+            MealPlanItem.recipe_id,
+            MealPlanItem.date,
+            MealPlanItem.meal_type,
+            MealPlanItem.servings
+        ).filter(
+            MealPlanItem.user_id == user_id,
+            MealPlanItem.date >= copy.source_start,
+            MealPlanItem.date <= copy.source_end
+        ).order_by(MealPlanItem.date, MealPlanItem.id).all()
+        
+        if copy.replace_existing:
+            self.db.query(MealPlanItem).filter(
+                MealPlanItem.user_id == user_id,
+                MealPlanItem.date >= copy.target_start,
+                MealPlanItem.date <= target_end
+            ).delete(synchronize_session=False)
+        
+        created_ids = self._insert_meals([
+            {
+                'user_id': user_id,
+                'recipe_id': meal.recipe_id,
+                'date': meal.date + offset,
+                'meal_type': meal.meal_type,
+                'servings': meal.servings
+            }
+            for meal in source
+        ])
+        
+        self.db.commit()
+        
+        responses = self._load_meal_responses(created_ids)
+        return [responses[item_id] for item_id in created_ids]
+    
+    # ==================== MEAL PLAN GENERATION ====================
+    
+    def generate_meal_plan(self, user: CurrentUser, request: MealPlanGenerateRequest) -> GeneratedMealPlanResponse:
+        """Fill the requested slots of a date range with recipes matching the user's daily targets."""
+        
+        if request.end_date < request.start_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end_date must be greater than or equal to start_date"
+            )
+        day_count = (request.end_date - request.start_date).days + 1
+        if day_count > MAX_GENERATE_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can generate at most {MAX_GENERATE_DAYS} days at a time"
+            )
+        
+        dates = [request.start_date + timedelta(days=offset) for offset in range(day_count)]
+        slots = [(meal_type.value, request.slots[meal_type]) for meal_type in MealType if request.slots.get(meal_type)]
+        slot_types = [meal_type for meal_type, _ in slots]
+        
+        # Recipe catalogue: public recipes and the user's own, per-serving macros as a matrix
+        catalogue = self.db.query(
+            Recipe.id,
+            Recipe.calories_per_serving,
+            Recipe.protein_per_serving,
+            Recipe.carbs_per_serving,
+            Recipe.fats_per_serving
+        ).filter(
+            or_(Recipe.is_public == True, Recipe.author_id == user.id),
+            Recipe.calories_per_serving.isnot(None)
+        ).order_by(Recipe.id).all()
+        if not catalogue:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No recipes with nutrition information to plan from"
+            )
+        recipe_ids = np.array([row[0] for row in catalogue])
+        macros = np.array([row[1:] for row in catalogue], dtype=float)
+        
+        # Recipes tagged with a slot's meal type are preferred for that slot (private
+        # ones too: the catalogue only holds public recipes and the user's own)
+        allowed = np.ones((len(slots), recipe_ids.size), dtype=bool)
+        for position, meal_type in enumerate(slot_types):
+            tagged = np.isin(recipe_ids, tag_index.match_recipes(self.db, [meal_type], public_only=False))
+            if tagged.any():
+                allowed[position] = tagged
+        
+        # Meals already planned stay (unless replaced) and count towards their day
+        existing_query = self.db.query(MealPlanItem).filter(
+            MealPlanItem.user_id == user.id,
+            MealPlanItem.date >= request.start_date,
+            MealPlanItem.date <= request.end_date
+        )
+        if request.replace_existing:
+            existing_query.filter(MealPlanItem.meal_type.in_(slot_types)).delete(synchronize_session=False)
+        
+        fixed = np.zeros((day_count, 4))
+        open_positions = np.ones((day_count, len(slots)), dtype=bool)
+        for item in existing_query.options(*load_profiles.load_options('meal_plan')).all():
+            day = (item.date - request.start_date).days
+            planned = self._build_meal_plan_response(item)
+            fixed[day] += [planned.calories, planned.protein, planned.carbs, planned.fats]
+            if item.meal_type in slot_types:
+                open_positions[day, slot_types.index(item.meal_type)] = False
+        
+        targets = MacroTargets(
+            calories=user.daily_calories,
+            protein=user.daily_protein,
+            carbs=user.daily_carbs,
+            fats=user.daily_fats
+        )
+        target_values = np.array(
+            [targets.calories, targets.protein, targets.carbs, targets.fats],
+            dtype=float
+        )
+        
+        slot_servings = np.array([servings for _, servings in slots], dtype=float)
+        costs = None
+        if request.include_cost or request.cost_weight > 0 or request.budget is not None:
+            # Cached per exclusion profile; never touches the price tables while solving
+            costs = optimization_service.recipe_serving_costs(self.db, [int(recipe_id) for recipe_id in recipe_ids], user.id)
+        
+        if request.budget is not None:
+            # Only priced recipes fit a budget: slots whose preferred recipes have no
+            # price fall back to every priced recipe
+            priced = np.isfinite(costs)
+            allowed[~(allowed & priced).any(axis=1)] = True
+            
+            # Cheapest priced recipe in every slot to fill
+            slot_minimum = np.where(allowed & np.isfinite(costs), costs, np.inf).min(axis=1)
+            cheapest_plan = float((open_positions.sum(axis=0) * slot_minimum * slot_servings).sum())
+            if not np.isfinite(cheapest_plan) or cheapest_plan > request.budget:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=(
+                        "No plan fits the budget; not enough priced recipes"
+                        if not np.isfinite(cheapest_plan)
+                        else f"No plan fits the budget; the cheapest costs €{cheapest_plan:.2f}"
+                    )
+                )
+        
+        plan = plan_solver.solve_plan(
+            macros,
+            target_values,
+            slot_servings,
+            allowed,
+            fixed,
+            open_positions=open_positions,
+            costs=costs,
+            cost_weight=request.cost_weight,
+            budget=request.budget,
+            repeat_penalty=(
+                plan_solver.VARIETY_REPEAT_PENALTY if request.goal == PlanGoal.variety else plan_solver.REPEAT_PENALTY
+            ),
+            seed=request.seed
+        )
+        
+        estimated_cost, unpriced_items = 0.0, 0
+        new_items = []
+        for day, slot in zip(*np.nonzero(plan >= 0)):
+            meal_type, servings = slots[slot]
+            new_items.append(MealPlanItem(
+                user_id=user.id,
+                recipe_id=int(recipe_ids[plan[day, slot]]),
+                date=dates[day],
+                meal_type=meal_type,
+                servings=servings
+            ))
+            if costs is not None:
+                cost = costs[plan[day, slot]]
+                if np.isfinite(cost):
+                    estimated_cost += float(cost) * servings
+                else:
+                    unpriced_items += 1
+        
+        if request.budget is not None and estimated_cost > request.budget + 1e-6:
+            self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Couldn't find a plan within the budget"
+            )
+        
+        self.db.add_all(new_items)
+        self.db.commit()
+        
+        items = self.get_meal_plan(user.id, request.start_date, request.end_date)
+        days = {day: DailyNutrition(date=day, calories=0, protein=0, carbs=0, fats=0) for day in dates}
+        for item in items:
+            summary = days[item.date]
+            summary.calories = round(summary.calories + item.calories, 2)
+            summary.protein = round(summary.protein + item.protein, 2)
+            summary.carbs = round(summary.carbs + item.carbs, 2)
+            summary.fats = round(summary.fats + item.fats, 2)
+        
+        return GeneratedMealPlanResponse(
+            start_date=request.start_date,
+            end_date=request.end_date,
+            targets=targets,
+            created_items=len(new_items),
+            items=items,
+            days=list(days.values()),
+            estimated_cost=round(estimated_cost, 2) if costs is not None else None,
+            unpriced_items=unpriced_items
+        )
+    
     # ==================== SHOPPING LIST GENERATION ====================
     
-    async def generate_shopping_list(
+    def generate_shopping_list(
         self,
         user_id: int,
         start_date: date,
@@ -138,38 +441,54 @@ class MealService:
         
         # Get all meal plan items in the date range with recipes and ingredients
         meal_items = self.db.query(MealPlanItem).options(
-            joinedload(MealPlanItem.recipe).joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngredient.ingredient)
+            *load_profiles.load_options('shopping_list')
         ).filter(
             and_(
                 MealPlanItem.user_id == user_id,
                 MealPlanItem.date >= start_date,
                 MealPlanItem.date <= end_date
             )
-        ).all()
+        ).order_by(MealPlanItem.date, MealPlanItem.id).all()
         
         # Aggregate ingredients
-        # Key: (ingredient_id, unit)
+        # Key: (ingredient_id, canonical unit)
         # Value: {ingredient_id, ingredient_name, total_amount, unit}
+        # Amounts are normalized to g, ml or unit first, so "200 g" and "1 kg" merge
         aggregated: Dict[tuple, Dict] = {}
+        units_by_ingredient: Dict[int, List[str]] = {}
         
         for meal_item in meal_items:
             for recipe_ing in meal_item.recipe.recipe_ingredients:
+                ingredient = recipe_ing.ingredient
+                
                 # Scale amount by servings
-                scaled_amount = recipe_ing.amount * meal_item.servings
+                scaled_amount, unit = units.normalize(recipe_ing.amount * meal_item.servings, recipe_ing.unit)
+                
+                # Merge into the unit already used for this ingredient when convertible
+                known_units = units_by_ingredient.setdefault(ingredient.id, [])
+                for existing_unit in known_units:
+                    converted = units.convert(
+                        scaled_amount, unit, existing_unit,
+                        ingredient.density_g_per_ml, ingredient.unit_weight_g
+                    )
+                    if converted is not None:
+                        scaled_amount, unit = converted, existing_unit
+                        break
                 
                 # Create aggregation key
-                key = (recipe_ing.ingredient_id, recipe_ing.unit)
+                key = (ingredient.id, unit)
                 
                 if key in aggregated:
                     # Add to existing amount
                     aggregated[key]['total_amount'] += scaled_amount
                 else:
                     # Create new entry
+                    known_units.append(unit)
                     aggregated[key] = {
-                        'ingredient_id': recipe_ing.ingredient_id,
-                        'ingredient_name': recipe_ing.ingredient.name,
+                        'ingredient_id': ingredient.id,
+                        'ingredient_name': ingredient.name,
                         'total_amount': scaled_amount,
-                        'unit': recipe_ing.unit
+                        'unit': unit
                     }
         
         # Convert to list and round amounts
@@ -195,6 +514,25 @@ class MealService:
     
     # ==================== HELPER METHODS ====================
     
+    def _insert_meals(self, rows: List[Dict]) -> List[int]:
+        """Insert meal plan items in one multi-row INSERT; returns their IDs in row order."""
+        
+        if not rows:
+            return []
+        # Autoincrement assigns IDs in row order within a single INSERT; asking
+        # SQLAlchemy to guarantee the RETURNING order makes SQLite insert row by row
+        return sorted(self.db.scalars(insert(MealPlanItem).returning(MealPlanItem.id), rows))
+    
+    def _load_meal_responses(self, item_ids: List[int]) -> Dict[int, MealPlanResponse]:
+        """Responses for meal plan items by ID, loaded with their recipes in one query."""
+        
+        if not item_ids:
+            return {}
+        items = self.db.query(MealPlanItem).options(
+            *load_profiles.load_options('meal_plan')
+        ).filter(MealPlanItem.id.in_(item_ids)).all()
+        return {item.id: self._build_meal_plan_response(item) for item in items}
+    
     def _build_meal_plan_response(self, meal_item: MealPlanItem) -> MealPlanResponse:
         """Build meal plan response with scaled nutrition."""
         
@@ -203,28 +541,11 @@ class MealService:
         recipe = meal_item.recipe
         
         # Calculate total nutrition for the recipe
-        total_calories = 0.0
-        total_protein = 0.0
-        total_carbs = 0.0
-        total_fats = 0.0
-        
-        for recipe_ing in recipe.recipe_ingredients:
-            # Calculate nutrition for this ingredient
-            ingredient = recipe_ing.ingredient
-            amount = recipe_ing.amount
-            
-            # Convert to 100g equivalent
-            if recipe_ing.unit in ['g', 'ml']:
-                multiplier = amount / 100
-            elif recipe_ing.unit == 'unit':
-                multiplier = 1.0
-            else:
-                multiplier = amount / 100
-            
-            total_calories += ingredient.calories_per_100g * multiplier
-            total_protein += ingredient.protein_per_100g * multiplier
-            total_carbs += ingredient.carbs_per_100g * multiplier
-            total_fats += ingredient.fats_per_100g * multiplier
+        totals = nutrition_service.recipe_nutrition(recipe)
+        total_calories = totals['calories']
+        total_protein = totals['protein']
+        total_carbs = totals['carbs']
+        total_fats = totals['fats']
         
         # Calculate per serving
         per_serving_calories = total_calories / recipe.servings
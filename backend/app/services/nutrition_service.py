@@ -0,0 +1,129 @@
+"""Nutrition calculations shared by recipe and meal plan responses"""
+
+import threading
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.recipe import Ingredient, Recipe, RecipeIngredient
+from app.utils import units
+
+# Used when an ingredient has no density / unit weight of its own
+DEFAULT_DENSITY_G_PER_ML = 1.0
+DEFAULT_UNIT_WEIGHT_G = 100.0
+
+# ingredient_id -> {recipe unit -> grams per 1 recipe unit}
+_gram_factors: Dict[int, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+def gram_factor(ingredient: Ingredient, unit: str) -> float:
+    """
+    Grams in one `unit` of an ingredient
+
+    Computed once per (ingredient, unit) and kept until the ingredient changes.
+    Volumes without a density are taken as water, units without a weight as
+    100 g, and units missing from the conversion table as grams.
+    """
+    factors = _gram_factors.get(ingredient.id)
+    if factors is not None and unit in factors:
+        return factors[unit]
+
+    factor = units.convert(
+        1.0, unit, units.GRAM,
+        ingredient.density_g_per_ml or DEFAULT_DENSITY_G_PER_ML,
+        ingredient.unit_weight_g or DEFAULT_UNIT_WEIGHT_G
+    )
+    if factor is None:
+        factor = 1.0
+
+    with _lock:
+        _gram_factors.setdefault(ingredient.id, {})[unit] = factor
+    return factor
+
+
+def ingredient_nutrition(ingredient: Ingredient, amount: float, unit: str) -> Dict[str, float]:
+    """Calories and macros for an amount of an ingredient"""
+    multiplier = amount * gram_factor(ingredient, unit) / 100
+    return {
+        'calories': ingredient.calories_per_100g * multiplier,
+        'protein': ingredient.protein_per_100g * multiplier,
+        'carbs': ingredient.carbs_per_100g * multiplier,
+        'fats': ingredient.fats_per_100g * multiplier
+    }
+
+
+def recipe_totals(recipe: Recipe) -> Dict[str, float]:
+    """Unrounded calories and macros for the whole recipe"""
+    totals = {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fats': 0.0}
+    for recipe_ingredient in recipe.recipe_ingredients:
+        nutrition = ingredient_nutrition(recipe_ingredient.ingredient, recipe_ingredient.amount, recipe_ingredient.unit)
+        for key, value in nutrition.items():
+            totals[key] += value
+    return totals
+
+
+def recipe_nutrition(recipe: Recipe) -> Dict[str, float]:
+    """
+    Calories and macros for the whole recipe
+
+    Reads the totals stored on the recipe, so the ingredients are only loaded
+    for recipes whose totals haven't been computed yet.
+    """
+    if recipe.total_calories is None:
+        return recipe_totals(recipe)
+    return {
+        'calories': recipe.total_calories,
+        'protein': recipe.total_protein,
+        'carbs': recipe.total_carbs,
+        'fats': recipe.total_fats
+    }
+
+
+def store_recipe_totals(recipe: Recipe, totals: Dict[str, float]) -> None:
+    """Persist nutrition totals on the recipe (committed by the caller)"""
+    recipe.total_calories = totals['calories']
+    recipe.total_protein = totals['protein']
+    recipe.total_carbs = totals['carbs']
+    recipe.total_fats = totals['fats']
+    store_serving_nutrition(recipe)
+
+
+def store_serving_nutrition(recipe: Recipe) -> None:
+    """Derive the indexed per-serving columns from the stored totals"""
+    if recipe.total_calories is None or not recipe.servings:
+        return
+
+    recipe.calories_per_serving = recipe.total_calories / recipe.servings
+    recipe.protein_per_serving = recipe.total_protein / recipe.servings
+    recipe.carbs_per_serving = recipe.total_carbs / recipe.servings
+    recipe.fats_per_serving = recipe.total_fats / recipe.servings
+    recipe.protein_density = recipe.total_protein * 100 / recipe.total_calories if recipe.total_calories > 0 else 0.0
+
+
+def refresh_recipe_totals(db: Session, ingredient_id: Optional[int] = None) -> int:
+    """
+    Recompute stored totals for the recipes using an ingredient (all recipes when None)
+
+    Doesn't commit. Returns the number of recipes updated.
+    """
+    query = db.query(Recipe).options(
+        joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngredient.ingredient)
+    )
+    if ingredient_id is not None:
+        query = query.filter(Recipe.recipe_ingredients.any(RecipeIngredient.ingredient_id == ingredient_id))
+
+    recipes = query.all()
+    for recipe in recipes:
+        store_recipe_totals(recipe, recipe_totals(recipe))
+    return len(recipes)
+
+
+def invalidate(ingredient_ids: Optional[Iterable[int]] = None) -> None:
+    """Forget cached gram factors for some ingredients (all when None)"""
+    with _lock:
+        if ingredient_ids is None:
+            _gram_factors.clear()
+        else:
+            for ingredient_id in ingredient_ids:
+                _gram_factors.pop(ingredient_id, None)
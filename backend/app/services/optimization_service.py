@@ -1,11 +1,26 @@
 """Optimization service for calculating cheapest shopping list distribution"""
 
 from sqlalchemy.orm import Session
-from app.services import price_service
+from app.database import primary_session
+from app.models.ingredient_exclusion import IngredientExclusion
+from app.models.recipe import Recipe, RecipeIngredient
+from app.services import basket_solver, price_matrix
+from app.utils import units
 from app.schemas.meal_plan import ShoppingListItem
-from typing import List, Dict, Optional
-from decimal import Decimal
-from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+import threading
+import numpy as np
+
+# Money is rounded to cents once per line item and summed exactly
+CENT = Decimal("0.01")
+
+# Distinct exclusion profiles whose recipe costs are kept at once (least recently used dropped)
+MAX_COST_PROFILES = 64
+
+# (ingredient_id, supermarket_id) pairs a user excludes
+ExclusionProfile = FrozenSet[Tuple[int, int]]
 
 
 class OptimizedShoppingListItem:
@@ -19,6 +34,7 @@ class OptimizedShoppingListItem:
         cheapest_price: Optional[Decimal] = None,
         cheapest_supermarket: Optional[str] = None,
         cheapest_supermarket_id: Optional[int] = None,
+        price_unit: Optional[str] = None,
         total_cost: Optional[Decimal] = None
     ):
         self.ingredient_id = ingredient_id
@@ -28,6 +44,7 @@ class OptimizedShoppingListItem:
         self.cheapest_price = cheapest_price
         self.cheapest_supermarket = cheapest_supermarket
         self.cheapest_supermarket_id = cheapest_supermarket_id
+        self.price_unit = price_unit
         self.total_cost = total_cost
 
 
@@ -67,56 +84,104 @@ class OptimizedShoppingListResponse:
         self.potential_savings = potential_savings
 
 
+class SupermarketBasketCost:
+    """Cost of buying a whole shopping list at a single supermarket"""
+    def __init__(
+        self,
+        supermarket_id: int,
+        supermarket_name: str,
+        total_price: Decimal,
+        available_items: int,
+        missing_items: int,
+        delta_vs_optimized: Decimal
+    ):
+        self.supermarket_id = supermarket_id
+        self.supermarket_name = supermarket_name
+        self.total_price = total_price
+        self.available_items = available_items
+        self.missing_items = missing_items
+        self.delta_vs_optimized = delta_vs_optimized
+
+
+class BasketComparison:
+    """Single-supermarket basket costs compared with the optimized split"""
+    def __init__(
+        self,
+        supermarkets: List[SupermarketBasketCost],
+        total_optimized: Decimal,
+        total_items: int,
+        items_with_prices: int
+    ):
+        self.supermarkets = supermarkets
+        self.total_optimized = total_optimized
+        self.total_items = total_items
+        self.items_with_prices = items_with_prices
+
+
 def optimize_shopping_list(
     db: Session,
     shopping_list: List[ShoppingListItem],
-    user_id: int
+    user_id: int,
+    store_penalty: float = 0.0,
+    max_stores: Optional[int] = None
 ) -> OptimizedShoppingListResponse:
     """
-    Optimize shopping list by finding cheapest prices for each ingredient
+    Optimize shopping list by choosing where to buy each ingredient
     
     Algorithm:
-    1. For each ingredient in shopping list:
-       - Get all available prices (excluding user's exclusions)
-       - Find cheapest price
-       - Calculate total cost for that ingredient
-    2. Group by supermarket
-    3. Calculate totals per supermarket
-    4. Generate recommendation
+    1. Gather the best price of every ingredient at every supermarket from the
+       in-process price matrix (excluding user's exclusions), converting each
+       amount to the unit the price is quoted in
+    2. Choose the set of supermarkets minimizing total cost plus store_penalty
+       per visited supermarket, visiting at most max_stores (basket solver)
+    3. Buy each ingredient at its cheapest chosen supermarket
+    4. Calculate totals per supermarket
+    5. Generate recommendation
+    
+    Steps 1-4 are vectorized over the (items x supermarkets) cost matrix.
+    With no penalty and no store limit this is the cheapest price per item.
     """
     
+    # Step 1: Gather prices for the whole list at once
+    basket = price_matrix.get_basket_prices(db, [item.ingredient_id for item in shopping_list], user_id)
+    costs, quantities = basket.costs(
+        [item.total_amount for item in shopping_list],
+        [item.unit for item in shopping_list]
+    )
+    
+    # Step 2: Choose supermarkets
+    chosen = basket_solver.solve_basket(costs, store_penalty, max_stores)
+    assignment = basket_solver.assign_items(costs, chosen)
+    
+    # Step 3: Price each ingredient at its assigned supermarket
+    priced = assignment >= 0
+    rows = np.arange(len(shopping_list))
+    unit_prices = np.where(priced, basket.prices[rows, assignment], np.nan)
+    price_quantities = np.where(priced, quantities[rows, assignment], np.nan)
+    price_units = np.where(priced, basket.unit_codes[rows, assignment], price_matrix.NO_UNIT)
+    items_with_prices = int(priced.sum())
+    
+    # Step 4: Totals per supermarket (summed from the rounded line totals below)
+    store_totals = [Decimal(0)] * len(basket.supermarket_ids)
+    store_counts = np.bincount(assignment[priced], minlength=len(basket.supermarket_ids))
+    
     optimized_items: List[OptimizedShoppingListItem] = []
-    supermarket_costs: Dict[int, Dict] = defaultdict(lambda: {"total": Decimal(0), "count": 0, "name": ""})
-    items_with_prices = 0
-    
-    # Step 1: Find cheapest price for each ingredient
-    for item in shopping_list:
-        cheapest = price_service.get_cheapest_price_for_ingredient(
-            db,
-            item.ingredient_id,
-            user_id
-        )
-        
-        if cheapest:
-            # Calculate total cost for this ingredient
-            total_cost = Decimal(str(item.total_amount)) * cheapest.price_per_unit
-            
+    for item, column, unit_price, quantity, unit_code in zip(shopping_list, assignment, unit_prices, price_quantities, price_units):
+        if column >= 0:
+            cheapest_price = Decimal(f"{unit_price:.2f}")
+            total_cost = (Decimal(f"{quantity:.3f}") * cheapest_price).quantize(CENT, ROUND_HALF_UP)
+            store_totals[column] += total_cost
             optimized_items.append(OptimizedShoppingListItem(
                 ingredient_id=item.ingredient_id,
                 ingredient_name=item.ingredient_name,
                 total_amount=item.total_amount,
                 unit=item.unit,
-                cheapest_price=cheapest.price_per_unit,
-                cheapest_supermarket=cheapest.supermarket_name,
-                cheapest_supermarket_id=cheapest.supermarket_id,
+                cheapest_price=cheapest_price,
+                cheapest_supermarket=basket.supermarket_names[column],
+                cheapest_supermarket_id=basket.supermarket_ids[column],
+                price_unit=units.PRICE_UNITS_BY_CODE[unit_code].value,
                 total_cost=total_cost
             ))
-            
-            # Accumulate supermarket costs
-            supermarket_costs[cheapest.supermarket_id]["total"] += total_cost
-            supermarket_costs[cheapest.supermarket_id]["count"] += 1
-            supermarket_costs[cheapest.supermarket_id]["name"] = cheapest.supermarket_name
-            items_with_prices += 1
         else:
             # No price available for this ingredient
             optimized_items.append(OptimizedShoppingListItem(
@@ -130,26 +195,24 @@ def optimize_shopping_list(
                 total_cost=None
             ))
     
-    # Step 2: Create supermarket totals
-    supermarket_totals: List[SupermarketTotal] = []
-    total_optimized = Decimal(0)
-    
-    for supermarket_id, data in supermarket_costs.items():
-        supermarket_totals.append(SupermarketTotal(
-            supermarket_id=supermarket_id,
-            supermarket_name=data["name"],
-            total_price=data["total"],
-            item_count=data["count"]
-        ))
-        total_optimized += data["total"]
+    supermarket_totals: List[SupermarketTotal] = [
+        SupermarketTotal(
+            supermarket_id=basket.supermarket_ids[column],
+            supermarket_name=basket.supermarket_names[column],
+            total_price=store_totals[column],
+            item_count=int(store_counts[column])
+        )
+        for column in np.flatnonzero(store_counts)
+    ]
+    total_optimized = sum((total.total_price for total in supermarket_totals), Decimal(0))
     
     # Sort by total price (descending)
     supermarket_totals.sort(key=lambda x: x.total_price, reverse=True)
     
-    # Step 3: Generate recommendation
+    # Step 5: Generate recommendation
     recommendation = _generate_recommendation(supermarket_totals, len(shopping_list), items_with_prices)
     
-    # Step 4: Calculate potential savings (if applicable)
+    # Step 6: Calculate potential savings (if applicable)
     # For now, we just show optimization benefit
     potential_savings = None
     if items_with_prices > 0:
@@ -166,6 +229,146 @@ def optimize_shopping_list(
     )
 
 
+def compare_supermarkets(
+    db: Session,
+    shopping_list: List[ShoppingListItem],
+    user_id: int
+) -> BasketComparison:
+    """
+    Cost the whole shopping list at every active supermarket
+    
+    Computed in one pass over the (items x supermarkets) cost matrix, with
+    amounts converted to the unit each price is quoted in. Each
+    supermarket total only covers the items it sells; missing_items counts the
+    rest. delta_vs_optimized is the supermarket total minus the cheapest
+    per-item split of those same items across all supermarkets, so an
+    incomplete basket never looks cheaper than the optimum.
+    """
+    basket = price_matrix.get_basket_prices(db, [item.ingredient_id for item in shopping_list], user_id)
+    costs, _ = basket.costs(
+        [item.total_amount for item in shopping_list],
+        [item.unit for item in shopping_list]
+    )
+    
+    available = np.isfinite(costs)
+    store_cents = _to_cents(costs).sum(axis=0)
+    available_counts = available.sum(axis=0)
+    
+    cheapest_cents = _to_cents(costs.min(axis=1, initial=np.inf))
+    total_optimized = _from_cents(cheapest_cents.sum())
+    # Optimized cost of just the items each supermarket sells
+    subset_optimized_cents = cheapest_cents @ available.astype(np.int64)
+    
+    supermarkets = [
+        SupermarketBasketCost(
+            supermarket_id=supermarket_id,
+            supermarket_name=supermarket_name,
+            total_price=_from_cents(store_cents[column]),
+            available_items=int(available_counts[column]),
+            missing_items=len(shopping_list) - int(available_counts[column]),
+            delta_vs_optimized=_from_cents(store_cents[column] - subset_optimized_cents[column])
+        )
+        for column, (supermarket_id, supermarket_name) in enumerate(zip(basket.supermarket_ids, basket.supermarket_names))
+    ]
+    
+    # Most complete baskets first, then cheapest
+    supermarkets.sort(key=lambda s: (s.missing_items, s.total_price))
+    
+    return BasketComparison(
+        supermarkets=supermarkets,
+        total_optimized=total_optimized,
+        total_items=len(shopping_list),
+        items_with_prices=int(available.any(axis=1).sum())
+    )
+
+
+def _to_cents(costs: np.ndarray) -> np.ndarray:
+    """Costs in € rounded to whole cents, 0 where unpriced"""
+    return np.rint(np.where(np.isfinite(costs), costs, 0.0) * 100).astype(np.int64)
+
+
+def _from_cents(cents) -> Decimal:
+    """Exact € amount of a whole number of cents"""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+# exclusion profile -> (price version, {recipe_id: cheapest cost per serving, NaN if unpriced})
+_recipe_costs: "OrderedDict[ExclusionProfile, Tuple[int, Dict[int, float]]]" = OrderedDict()
+_costs_lock = threading.Lock()
+
+
+def recipe_serving_costs(db: Session, recipe_ids: Sequence[int], user_id: int) -> np.ndarray:
+    """
+    Cheapest cost per serving of each recipe for a user (NaN when an ingredient has no price)
+
+    Each ingredient is bought at its cheapest supermarket the user doesn't
+    exclude. Costs are cached per exclusion profile, so users with the same
+    exclusions (usually none) share them, and only recomputed for recipes
+    that changed or after any price change.
+    """
+    profile: ExclusionProfile = frozenset(
+        (ingredient_id, supermarket_id)
+        for ingredient_id, supermarket_id in db.query(
+            IngredientExclusion.ingredient_id, IngredientExclusion.supermarket_id
+        ).filter(IngredientExclusion.user_id == user_id)
+    )
+
+    version = price_matrix.version(db)
+    with _costs_lock:
+        entry = _recipe_costs.get(profile)
+        if entry is None or entry[0] != version:
+            entry = (version, {})
+        _recipe_costs[profile] = entry
+        _recipe_costs.move_to_end(profile)
+        while len(_recipe_costs) > MAX_COST_PROFILES:
+            _recipe_costs.popitem(last=False)
+        costs = entry[1]
+        missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in costs]
+
+    if missing:
+        with primary_session(db) as primary:
+            computed = _compute_serving_costs(primary, missing, profile)
+        with _costs_lock:
+            costs.update(computed)
+
+    return np.array([costs[recipe_id] for recipe_id in recipe_ids], dtype=float)
+
+
+def _compute_serving_costs(db: Session, recipe_ids: Sequence[int], profile: ExclusionProfile) -> Dict[int, float]:
+    """Cost per serving of recipes, every line costed in one pass over the price matrix"""
+    lines = db.query(
+        RecipeIngredient.recipe_id,
+        RecipeIngredient.ingredient_id,
+        RecipeIngredient.amount,
+        RecipeIngredient.unit
+    ).filter(RecipeIngredient.recipe_id.in_(recipe_ids)).all()
+    servings = dict(db.query(Recipe.id, Recipe.servings).filter(Recipe.id.in_(recipe_ids)))
+
+    basket = price_matrix.gather_prices(db, [line.ingredient_id for line in lines], sorted(profile))
+    line_costs, _ = basket.costs([line.amount for line in lines], [line.unit for line in lines])
+    cheapest = line_costs.min(axis=1, initial=np.inf)
+
+    totals = {recipe_id: 0.0 for recipe_id in recipe_ids}
+    for line, cost in zip(lines, cheapest):
+        totals[line.recipe_id] += float(cost) if np.isfinite(cost) else np.nan
+    return {
+        recipe_id: total / servings[recipe_id] if servings.get(recipe_id) else np.nan
+        for recipe_id, total in totals.items()
+    }
+
+
+def invalidate_recipe_costs(recipe_ids: Optional[Iterable[int]] = None) -> None:
+    """Forget cached costs of some recipes after they changed (all when None)"""
+    with _costs_lock:
+        if recipe_ids is None:
+            _recipe_costs.clear()
+            return
+        recipe_ids = list(recipe_ids)
+        for _, costs in _recipe_costs.values():
+            for recipe_id in recipe_ids:
+                costs.pop(recipe_id, None)
+
+
 def _generate_recommendation(
     supermarket_totals: List[SupermarketTotal],
     total_items: int,
@@ -0,0 +1,164 @@
+"""Meal plan solver choosing a recipe for every meal slot of a date range"""
+
+import time
+from typing import List, Optional
+
+import numpy as np
+
+# Wall-clock budget for the local search (restarts stop once it's spent)
+TIME_BUDGET_SECONDS = 0.2
+
+# Random starting plans tried within the budget
+MAX_RESTARTS = 8
+
+# Added once for every meal reusing a recipe already in the plan
+REPEAT_PENALTY = 0.02
+
+# Repeat penalty when planning for variety: one repeat outweighs any macro fit
+VARIETY_REPEAT_PENALTY = 1.0
+
+# Added per unit of cost over the budget, so going over is never worth it
+OVER_BUDGET_PENALTY = 100.0
+
+
+def solve_plan(
+    macros: np.ndarray,
+    targets: np.ndarray,
+    slot_servings: np.ndarray,
+    allowed: np.ndarray,
+    fixed: np.ndarray,
+    open_positions: Optional[np.ndarray] = None,
+    costs: Optional[np.ndarray] = None,
+    cost_weight: float = 0.0,
+    budget: Optional[float] = None,
+    repeat_penalty: float = REPEAT_PENALTY,
+    time_budget: float = TIME_BUDGET_SECONDS,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    Choose a recipe for every (day, slot) of a plan
+
+    macros: (recipes x 4) calories, protein, carbs and fats per serving
+    targets: (4,) daily targets, NaN for macros without one
+    slot_servings: (slots,) servings eaten in each slot
+    allowed: (slots x recipes) recipes suitable for each slot
+    fixed: (days x 4) nutrition already planned for each day
+    open_positions: (days x slots) positions to fill, all when None
+    costs: (recipes,) cost per serving, NaN when unknown
+
+    Minimizes, summed over days, the squared relative deviation of each
+    macro from its target, plus cost_weight per unit of cost and
+    repeat_penalty per reused recipe. With a budget, only recipes with a known
+    cost are used and the filled positions must cost at most `budget` in
+    total. Random starting plans are improved by local search, re-picking one
+    slot at a time with every candidate recipe evaluated at once, until
+    time_budget seconds are spent.
+
+    Returns (days x slots) row indices into macros, -1 for positions not filled.
+    """
+    days, slots = fixed.shape[0], slot_servings.size
+    if open_positions is None:
+        open_positions = np.ones((days, slots), dtype=bool)
+
+    spend = np.zeros(macros.shape[0])
+    if budget is not None:
+        allowed = allowed & np.isfinite(costs)[np.newaxis, :]
+        spend = np.where(np.isfinite(costs), costs, 0.0)
+
+    candidates = [np.flatnonzero(allowed[slot]) for slot in range(slots)]
+    open_positions = open_positions & np.array([candidates[slot].size > 0 for slot in range(slots)])[np.newaxis, :]
+    if not open_positions.any():
+        return np.full((days, slots), -1, dtype=int)
+
+    # Squared relative deviation: weight 1 / target^2 per macro with a target
+    has_target = np.isfinite(targets) & (targets > 0)
+    targets = np.where(has_target, targets, 0.0)
+    weights = np.where(has_target, 1.0 / np.where(has_target, targets, 1.0) ** 2, 0.0)
+
+    unit_costs = np.zeros(macros.shape[0])
+    if costs is not None and cost_weight > 0:
+        known = np.isfinite(costs)
+        # Unpriced recipes are assumed to cost as much as the typical one
+        fallback = float(np.median(costs[known])) if known.any() else 0.0
+        unit_costs = cost_weight * np.where(known, costs, fallback)
+
+    rng = np.random.default_rng(seed)
+    deadline = time.perf_counter() + time_budget
+    best_plan, best_score = None, np.inf
+
+    for _ in range(MAX_RESTARTS):
+        plan = np.full((days, slots), -1, dtype=int)
+        for slot in range(slots):
+            rows = open_positions[:, slot]
+            plan[rows, slot] = rng.choice(candidates[slot], size=int(rows.sum()))
+
+        score = _improve(
+            plan, macros, targets, weights, slot_servings, candidates, fixed,
+            unit_costs, repeat_penalty, spend, budget, deadline
+        )
+        if score < best_score:
+            best_plan, best_score = plan, score
+        if time.perf_counter() >= deadline:
+            break
+
+    return best_plan
+
+
+def _improve(
+    plan: np.ndarray,
+    macros: np.ndarray,
+    targets: np.ndarray,
+    weights: np.ndarray,
+    slot_servings: np.ndarray,
+    candidates: List[np.ndarray],
+    fixed: np.ndarray,
+    unit_costs: np.ndarray,
+    repeat_penalty: float,
+    spend: np.ndarray,
+    budget: Optional[float],
+    deadline: float
+) -> float:
+    """Re-pick slots in place while that improves the plan; returns its score"""
+    filled = plan >= 0
+    totals = fixed.copy()
+    for slot in range(plan.shape[1]):
+        rows = filled[:, slot]
+        totals[rows] += macros[plan[rows, slot]] * slot_servings[slot]
+    counts = np.bincount(plan[filled], minlength=macros.shape[0])
+    servings_grid = np.broadcast_to(slot_servings, plan.shape)
+    spent = float((spend[plan[filled]] * servings_grid[filled]).sum())
+    limit = np.inf if budget is None else budget
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for day, slot in zip(*np.nonzero(filled)):
+            current, servings = plan[day, slot], slot_servings[slot]
+            counts[current] -= 1
+
+            # Day totals with each candidate in the slot, scored all at once
+            rest = totals[day] - macros[current] * servings
+            options = candidates[slot]
+            deviation = ((rest + macros[options] * servings - targets) ** 2 * weights).sum(axis=1)
+            scores = deviation + unit_costs[options] * servings + repeat_penalty * (counts[options] > 0)
+
+            # Plan cost with each candidate, penalized beyond the budget
+            rest_spent = spent - spend[current] * servings
+            scores += OVER_BUDGET_PENALTY * np.maximum(rest_spent + spend[options] * servings - limit, 0.0)
+
+            current_score = ((totals[day] - targets) ** 2 * weights).sum() + unit_costs[current] * servings
+            current_score += repeat_penalty * (counts[current] > 0)
+            current_score += OVER_BUDGET_PENALTY * max(spent - limit, 0.0)
+
+            best = int(scores.argmin())
+            if scores[best] < current_score - 1e-12:
+                plan[day, slot] = options[best]
+                totals[day] = rest + macros[options[best]] * servings
+                spent = rest_spent + spend[options[best]] * servings
+                improved = True
+            counts[plan[day, slot]] += 1
+
+    deviation = ((totals - targets) ** 2 * weights).sum()
+    cost = (unit_costs[plan[filled]] * servings_grid[filled]).sum()
+    repeats = np.maximum(counts - 1, 0).sum()
+    return float(deviation + cost + repeat_penalty * repeats + OVER_BUDGET_PENALTY * max(spent - limit, 0.0))
@@ -0,0 +1,294 @@
+"""In-process ingredient x supermarket price matrix for vectorized basket costing"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.database import primary_session
+from app.models.ingredient_cheapest_price import IngredientCheapestPrice
+from app.models.ingredient_exclusion import IngredientExclusion
+from app.models.recipe import Ingredient
+from app.models.supermarket import Supermarket, UnitType
+from app.utils import units
+
+# Rebuild from the database after this long so writes from other workers show up
+MAX_AGE_SECONDS = 300
+
+
+# Stored in the unit code array where there is no price
+NO_UNIT = -1
+
+
+class BasketPrices:
+    """Prices of a list of ingredients at every active supermarket"""
+    def __init__(
+        self,
+        prices: np.ndarray,
+        unit_codes: np.ndarray,
+        supermarket_ids: List[int],
+        supermarket_names: List[str],
+        densities_g_per_ml: List[Optional[float]],
+        unit_weights_g: List[Optional[float]]
+    ):
+        self.prices = prices  # (items x supermarkets), inf where unavailable
+        self.unit_codes = unit_codes  # (items x supermarkets), units.PRICE_UNIT_CODES of each price
+        self.supermarket_ids = supermarket_ids
+        self.supermarket_names = supermarket_names
+        self.densities_g_per_ml = densities_g_per_ml  # Per item
+        self.unit_weights_g = unit_weights_g  # Per item
+
+    def costs(self, amounts: Sequence[float], amount_units: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cost of buying each amount at each supermarket
+
+        Amounts are converted to the unit every price is quoted in. Returns
+        (costs, quantities), both (items x supermarkets); costs are inf where the
+        item has no price or its amount can't be converted to the price unit.
+        """
+        per_unit = units.price_quantities(amounts, amount_units, self.densities_g_per_ml, self.unit_weights_g)
+        quantities = np.take_along_axis(per_unit, np.maximum(self.unit_codes, 0), axis=1)
+        quantities[self.unit_codes == NO_UNIT] = np.nan
+        costs = self.prices * quantities
+        costs[np.isnan(costs)] = np.inf
+        return costs, quantities
+
+
+class PriceMatrix:
+    """
+    Best community price per ingredient (rows) per supermarket (columns)
+
+    Built once from ingredient_cheapest_prices and patched on every price write.
+    Missing prices are NaN. Each price keeps the unit it is quoted in, and the
+    ingredients' densities and unit weights are kept alongside for conversion.
+    """
+    def __init__(
+        self,
+        ingredient_ids: List[int],
+        supermarket_ids: List[int],
+        supermarket_names: List[str],
+        active: np.ndarray
+    ):
+        self.row_index: Dict[int, int] = {ingredient_id: row for row, ingredient_id in enumerate(ingredient_ids)}
+        self.column_index: Dict[int, int] = {supermarket_id: column for column, supermarket_id in enumerate(supermarket_ids)}
+        self.supermarket_ids = supermarket_ids
+        self.supermarket_names = supermarket_names
+        self.active = active
+        self.prices = np.full((max(len(ingredient_ids), 16), len(supermarket_ids)), np.nan)
+        self.unit_codes = np.full(self.prices.shape, NO_UNIT, dtype=np.int8)
+        self.conversions: Dict[int, Tuple[Optional[float], Optional[float]]] = {}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session) -> "PriceMatrix":
+        """Build the matrix from the precomputed price aggregates"""
+        supermarkets = db.query(
+            Supermarket.id, Supermarket.name, Supermarket.is_active
+        ).order_by(Supermarket.id).all()
+        aggregates = db.query(
+            IngredientCheapestPrice.ingredient_id,
+            IngredientCheapestPrice.supermarket_id,
+            IngredientCheapestPrice.min_price,
+            IngredientCheapestPrice.unit
+        ).all()
+        conversions = db.query(
+            Ingredient.id, Ingredient.density_g_per_ml, Ingredient.unit_weight_g
+        ).filter(
+            or_(Ingredient.density_g_per_ml.isnot(None), Ingredient.unit_weight_g.isnot(None))
+        ).all()
+
+        ingredient_ids = sorted({aggregate.ingredient_id for aggregate in aggregates})
+        matrix = cls(
+            ingredient_ids=ingredient_ids,
+            supermarket_ids=[s.id for s in supermarkets],
+            supermarket_names=[s.name for s in supermarkets],
+            active=np.array([bool(s.is_active) for s in supermarkets], dtype=bool)
+        )
+
+        if aggregates:
+            rows = np.array([matrix.row_index[a.ingredient_id] for a in aggregates])
+            columns = np.array([matrix.column_index[a.supermarket_id] for a in aggregates])
+            matrix.prices[rows, columns] = [float(a.min_price) for a in aggregates]
+            matrix.unit_codes[rows, columns] = [units.PRICE_UNIT_CODES[UnitType(a.unit)] for a in aggregates]
+        matrix.conversions = {c.id: (c.density_g_per_ml, c.unit_weight_g) for c in conversions}
+
+        return matrix
+
+    def is_stale(self) -> bool:
+        """Whether the matrix is old enough to be rebuilt"""
+        return time.monotonic() - self.built_at > MAX_AGE_SECONDS
+
+    def set_price(
+        self,
+        ingredient_id: int,
+        supermarket_id: int,
+        price: Optional[float],
+        unit: Optional[UnitType] = None
+    ) -> bool:
+        """
+        Patch one cell (None removes the price)
+        Returns False when the supermarket is unknown and the matrix must be rebuilt
+        """
+        column = self.column_index.get(supermarket_id)
+        if column is None:
+            return False
+
+        row = self.row_index.get(ingredient_id)
+        if row is None:
+            if price is None:
+                return True
+            row = self._add_row(ingredient_id)
+
+        self.prices[row, column] = np.nan if price is None else price
+        self.unit_codes[row, column] = NO_UNIT if price is None else units.PRICE_UNIT_CODES[UnitType(unit)]
+        return True
+
+    def set_conversion(self, ingredient_id: int, density_g_per_ml: Optional[float], unit_weight_g: Optional[float]) -> None:
+        """Patch an ingredient's density and unit weight"""
+        if density_g_per_ml is None and unit_weight_g is None:
+            self.conversions.pop(ingredient_id, None)
+        else:
+            self.conversions[ingredient_id] = (density_g_per_ml, unit_weight_g)
+
+    def gather(self, ingredient_ids: Sequence[int], excluded_pairs: Sequence = ()) -> BasketPrices:
+        """
+        Prices of the given ingredients at every active supermarket
+
+        Prices that are missing or in excluded_pairs ((ingredient_id,
+        supermarket_id) tuples) are set to inf.
+        """
+        rows = np.array([self.row_index.get(ingredient_id, -1) for ingredient_id in ingredient_ids], dtype=int)
+        columns = np.flatnonzero(self.active)
+        prices = np.full((rows.size, columns.size), np.inf)
+        unit_codes = np.full(prices.shape, NO_UNIT, dtype=np.int8)
+
+        known = rows >= 0
+        prices[known] = self.prices[rows[known]][:, columns]
+        unit_codes[known] = self.unit_codes[rows[known]][:, columns]
+        prices[np.isnan(prices)] = np.inf
+
+        supermarket_ids = [self.supermarket_ids[column] for column in columns]
+        supermarket_names = [self.supermarket_names[column] for column in columns]
+
+        if len(excluded_pairs):
+            positions = np.array(ingredient_ids)
+            active_index = {supermarket_id: column for column, supermarket_id in enumerate(supermarket_ids)}
+            for ingredient_id, supermarket_id in excluded_pairs:
+                column = active_index.get(supermarket_id)
+                if column is not None:
+                    prices[positions == ingredient_id, column] = np.inf
+
+        conversions = [self.conversions.get(ingredient_id, (None, None)) for ingredient_id in ingredient_ids]
+        return BasketPrices(
+            prices,
+            unit_codes,
+            supermarket_ids,
+            supermarket_names,
+            [density for density, _ in conversions],
+            [unit_weight for _, unit_weight in conversions]
+        )
+
+    def _add_row(self, ingredient_id: int) -> int:
+        """Append a row for a new ingredient, growing the array geometrically"""
+        row = len(self.row_index)
+        if row == self.prices.shape[0]:
+            grown = np.full((row * 2, self.prices.shape[1]), np.nan)
+            grown[:row] = self.prices
+            self.prices = grown
+            grown_units = np.full(grown.shape, NO_UNIT, dtype=np.int8)
+            grown_units[:row] = self.unit_codes
+            self.unit_codes = grown_units
+        self.row_index[ingredient_id] = row
+        return row
+
+
+_matrix: Optional[PriceMatrix] = None
+_lock = threading.Lock()
+
+# Bumped on every change to the prices, so caches derived from them can tell they are stale
+_version = 0
+
+
+def get_basket_prices(db: Session, ingredient_ids: Sequence[int], user_id: int) -> BasketPrices:
+    """
+    Prices of a list of ingredients at every active supermarket for a user
+
+    Applies the user's exclusions (one query); the matrix itself is only read
+    from the database when it is first needed or has gone stale.
+    """
+    global _matrix
+
+    excluded_pairs = []
+    if ingredient_ids:
+        excluded_pairs = db.query(
+            IngredientExclusion.ingredient_id,
+            IngredientExclusion.supermarket_id
+        ).filter(
+            and_(
+                IngredientExclusion.user_id == user_id,
+                IngredientExclusion.ingredient_id.in_(set(ingredient_ids))
+            )
+        ).all()
+
+    return gather_prices(db, ingredient_ids, excluded_pairs)
+
+
+def gather_prices(db: Session, ingredient_ids: Sequence[int], excluded_pairs: Sequence = ()) -> BasketPrices:
+    """Prices of a list of ingredients at every active supermarket, minus excluded (ingredient, supermarket) pairs"""
+    with _lock:
+        return _current_matrix(db).gather(ingredient_ids, excluded_pairs)
+
+
+def version(db: Session) -> int:
+    """Price version of the current matrix; changes whenever any price or conversion may have changed"""
+    with _lock:
+        _current_matrix(db)
+        return _version
+
+
+def _current_matrix(db: Session) -> PriceMatrix:
+    """The matrix, (re)built when missing or stale; call with _lock held"""
+    global _matrix, _version
+
+    if _matrix is None or _matrix.is_stale():
+        with primary_session(db) as primary:
+            _matrix = PriceMatrix.load(primary)
+        _version += 1
+    return _matrix
+
+
+def update_price(
+    ingredient_id: int,
+    supermarket_id: int,
+    price: Optional[float],
+    unit: Optional[UnitType] = None
+) -> None:
+    """Patch the matrix after a committed price change (None removes the price)"""
+    global _matrix, _version
+
+    with _lock:
+        _version += 1
+        if _matrix is not None and not _matrix.set_price(ingredient_id, supermarket_id, price, unit):
+            _matrix = None
+
+
+def update_conversion(ingredient_id: int, density_g_per_ml: Optional[float], unit_weight_g: Optional[float]) -> None:
+    """Patch the matrix after an ingredient's density or unit weight changed"""
+    global _version
+
+    with _lock:
+        _version += 1
+        if _matrix is not None:
+            _matrix.set_conversion(ingredient_id, density_g_per_ml, unit_weight_g)
+
+
+def invalidate() -> None:
+    """Drop the matrix so the next request rebuilds it from the database"""
+    global _matrix, _version
+
+    with _lock:
+        _matrix = None
+        _version += 1
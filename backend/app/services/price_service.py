@@ -1,15 +1,21 @@
 """Price service for managing ingredient prices across supermarkets"""
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import Float, and_, case, cast, exists, func, literal, or_
 from app.models.ingredient_price import IngredientPrice
 from app.models.supermarket import Supermarket
 from app.models.recipe import Ingredient
 from app.models.ingredient_exclusion import IngredientExclusion
-from app.schemas.price import IngredientPriceCreate, IngredientPriceUpdate, IngredientPriceResponse
-from typing import List, Optional
+from app.models.ingredient_cheapest_price import IngredientCheapestPrice
+from app.services import price_matrix
+from app.utils import units
+from app.schemas.price import IngredientPriceCreate, IngredientPriceUpdate, IngredientPriceResponse, IngredientPriceSummary
+from typing import Dict, Iterable, List, Optional
 from fastapi import HTTPException, status
 from decimal import Decimal
+from collections import Counter, defaultdict
+from itertools import groupby
+from statistics import median
 
 
 def get_prices_for_ingredient(
@@ -22,49 +28,75 @@ def get_prices_for_ingredient(
     Get all prices for an ingredient, excluding user's excluded supermarkets
     Returns prices from all users (community pricing)
     """
-    # Get user's exclusions
-    exclusions = db.query(IngredientExclusion).filter(
+    prices_by_ingredient = get_prices_for_ingredients(db, [ingredient_id], user_id, exclude_inactive)
+    return prices_by_ingredient.get(ingredient_id, [])
+
+
+def get_prices_for_ingredients(
+    db: Session,
+    ingredient_ids: Iterable[int],
+    user_id: int,
+    exclude_inactive: bool = True
+) -> Dict[int, List[IngredientPriceResponse]]:
+    """
+    Bulk version of get_prices_for_ingredient
+    
+    Loads the user's exclusions and every price (with ingredient and supermarket
+    names) for all requested ingredients in two queries, regardless of how many
+    ingredients are requested. Ingredients without prices are omitted.
+    """
+    ingredient_ids = set(ingredient_ids)
+    if not ingredient_ids:
+        return {}
+    
+    # Get user's exclusions for all requested ingredients
+    exclusions = db.query(
+        IngredientExclusion.ingredient_id,
+        IngredientExclusion.supermarket_id
+    ).filter(
         and_(
             IngredientExclusion.user_id == user_id,
-            IngredientExclusion.ingredient_id == ingredient_id
+            IngredientExclusion.ingredient_id.in_(ingredient_ids)
         )
     ).all()
-    excluded_supermarket_ids = [e.supermarket_id for e in exclusions]
+    excluded_pairs = {(e.ingredient_id, e.supermarket_id) for e in exclusions}
     
-    # Query prices
-    query = db.query(IngredientPrice).filter(
-        IngredientPrice.ingredient_id == ingredient_id
+    # Query prices together with ingredient and supermarket names
+    query = db.query(
+        IngredientPrice,
+        Ingredient.name.label("ingredient_name"),
+        Supermarket.name.label("supermarket_name")
+    ).join(
+        Ingredient, Ingredient.id == IngredientPrice.ingredient_id
+    ).join(
+        Supermarket, Supermarket.id == IngredientPrice.supermarket_id
+    ).filter(
+        IngredientPrice.ingredient_id.in_(ingredient_ids)
     )
     
-    # Exclude user's excluded supermarkets
-    if excluded_supermarket_ids:
-        query = query.filter(IngredientPrice.supermarket_id.notin_(excluded_supermarket_ids))
-    
     # Exclude inactive supermarkets
     if exclude_inactive:
-        query = query.join(Supermarket).filter(Supermarket.is_active == True)
+        query = query.filter(Supermarket.is_active == True)
     
-    prices = query.all()
-    
-    # Convert to response schema with ingredient and supermarket names
-    response_list = []
-    for price in prices:
-        ingredient = db.query(Ingredient).filter(Ingredient.id == price.ingredient_id).first()
-        supermarket = db.query(Supermarket).filter(Supermarket.id == price.supermarket_id).first()
+    prices_by_ingredient: Dict[int, List[IngredientPriceResponse]] = defaultdict(list)
+    for price, ingredient_name, supermarket_name in query.all():
+        # Exclude user's excluded supermarkets
+        if (price.ingredient_id, price.supermarket_id) in excluded_pairs:
+            continue
         
-        response_list.append(IngredientPriceResponse(
+        prices_by_ingredient[price.ingredient_id].append(IngredientPriceResponse(
             id=price.id,
             ingredient_id=price.ingredient_id,
-            ingredient_name=ingredient.name if ingredient else "Unknown",
+            ingredient_name=ingredient_name,
             supermarket_id=price.supermarket_id,
-            supermarket_name=supermarket.name if supermarket else "Unknown",
+            supermarket_name=supermarket_name,
             price_per_unit=price.price_per_unit,
             unit=price.unit,
             user_id=price.user_id,
             updated_at=price.updated_at
         ))
     
-    return response_list
+    return dict(prices_by_ingredient)
 
 
 def get_price_by_id(db: Session, price_id: int) -> Optional[IngredientPrice]:
@@ -110,7 +142,10 @@ def upsert_price(
         # Update existing price
         existing_price.price_per_unit = price_data.price_per_unit
         existing_price.unit = price_data.unit
+        db.flush()
+        aggregate = refresh_price_aggregate(db, existing_price.ingredient_id, existing_price.supermarket_id)
         db.commit()
+        price_matrix.update_price(existing_price.ingredient_id, existing_price.supermarket_id, float(aggregate.min_price), aggregate.unit)
         db.refresh(existing_price)
         return existing_price
     else:
@@ -123,7 +158,10 @@ def upsert_price(
             user_id=user_id
         )
         db.add(db_price)
+        db.flush()
+        aggregate = refresh_price_aggregate(db, db_price.ingredient_id, db_price.supermarket_id)
         db.commit()
+        price_matrix.update_price(db_price.ingredient_id, db_price.supermarket_id, float(aggregate.min_price), aggregate.unit)
         db.refresh(db_price)
         return db_price
 
@@ -147,23 +185,341 @@ def delete_price(db: Session, price_id: int, user_id: int) -> None:
             detail="You can only delete your own price entries"
         )
     
+    ingredient_id, supermarket_id = db_price.ingredient_id, db_price.supermarket_id
     db.delete(db_price)
+    db.flush()
+    aggregate = refresh_price_aggregate(db, ingredient_id, supermarket_id)
+    min_price = float(aggregate.min_price) if aggregate else None
+    unit = aggregate.unit if aggregate else None
     db.commit()
+    price_matrix.update_price(ingredient_id, supermarket_id, min_price, unit)
 
 
 def get_cheapest_price_for_ingredient(
     db: Session,
     ingredient_id: int,
     user_id: int
-) -> Optional[IngredientPriceResponse]:
+) -> Optional[IngredientPriceSummary]:
     """
     Get the cheapest price for an ingredient, respecting user exclusions
     """
-    prices = get_prices_for_ingredient(db, ingredient_id, user_id)
+    return get_cheapest_prices_for_ingredients(db, [ingredient_id], user_id).get(ingredient_id)
+
+
+def get_cheapest_prices_for_ingredients(
+    db: Session,
+    ingredient_ids: Iterable[int],
+    user_id: int,
+    strategy: Optional[str] = None
+) -> Dict[int, IngredientPriceSummary]:
+    """
+    Get the cheapest price for each ingredient, respecting user exclusions
+    
+    Reads the precomputed per-supermarket aggregates and selects the cheapest
+    supermarket in the database, so one row per ingredient is returned however
+    many community prices exist. Ingredients without any available price are
+    omitted from the result.
+    
+    Supermarkets quoting different units are ranked on their price per gram
+    (through the ingredient's density and unit weight); aggregates that can't
+    be converted rank after every one that can, by raw price.
+    
+    strategy: "distinct_on" (PostgreSQL), "window" (ROW_NUMBER) or "aggregate"
+    (portable MIN subquery). Picked from the database dialect when omitted.
+    """
+    ingredient_ids = set(ingredient_ids)
+    if not ingredient_ids:
+        return {}
+    
+    if strategy is None:
+        strategy = _cheapest_price_strategy(db)
+    
+    candidate_filter = and_(
+        IngredientCheapestPrice.ingredient_id.in_(ingredient_ids),
+        Supermarket.is_active == True,
+        ~_is_excluded(user_id)
+    )
+    
+    query = _price_summary_query(db)
+    price_per_gram = _price_per_gram()
+    ranking = (
+        price_per_gram.is_(None),
+        price_per_gram,
+        IngredientCheapestPrice.min_price,
+        IngredientCheapestPrice.supermarket_id
+    )
+    
+    if strategy == "distinct_on":
+        query = query.filter(candidate_filter).distinct(
+            IngredientCheapestPrice.ingredient_id
+        ).order_by(IngredientCheapestPrice.ingredient_id, *ranking)
+    elif strategy == "window":
+        ranked = db.query(
+            IngredientCheapestPrice.ingredient_id.label("ingredient_id"),
+            IngredientCheapestPrice.supermarket_id.label("supermarket_id"),
+            func.row_number().over(
+                partition_by=IngredientCheapestPrice.ingredient_id,
+                order_by=ranking
+            ).label("position")
+        ).join(
+            Supermarket, Supermarket.id == IngredientCheapestPrice.supermarket_id
+        ).join(
+            Ingredient, Ingredient.id == IngredientCheapestPrice.ingredient_id
+        ).filter(candidate_filter).subquery()
+        
+        query = query.join(
+            ranked,
+            and_(
+                ranked.c.ingredient_id == IngredientCheapestPrice.ingredient_id,
+                ranked.c.supermarket_id == IngredientCheapestPrice.supermarket_id
+            )
+        ).filter(ranked.c.position == 1)
+    else:
+        cheapest = db.query(
+            IngredientCheapestPrice.ingredient_id.label("ingredient_id"),
+            func.min(price_per_gram).label("price_per_gram"),
+            func.min(IngredientCheapestPrice.min_price).label("min_price")
+        ).join(
+            Supermarket, Supermarket.id == IngredientCheapestPrice.supermarket_id
+        ).join(
+            Ingredient, Ingredient.id == IngredientCheapestPrice.ingredient_id
+        ).filter(candidate_filter).group_by(IngredientCheapestPrice.ingredient_id).subquery()
+        
+        # Raw prices only decide when no aggregate converts; ties on the minimum
+        # are resolved below by keeping the lowest supermarket ID
+        query = query.join(
+            cheapest,
+            and_(
+                cheapest.c.ingredient_id == IngredientCheapestPrice.ingredient_id,
+                or_(
+                    cheapest.c.price_per_gram == price_per_gram,
+                    and_(cheapest.c.price_per_gram.is_(None), cheapest.c.min_price == IngredientCheapestPrice.min_price)
+                )
+            )
+        ).filter(candidate_filter).order_by(IngredientCheapestPrice.supermarket_id.desc())
+    
+    cheapest_prices: Dict[int, IngredientPriceSummary] = {}
+    for aggregate, ingredient_name, supermarket_name in query.all():
+        cheapest_prices[aggregate.ingredient_id] = _build_price_summary(
+            aggregate, ingredient_name, supermarket_name
+        )
+    
+    return cheapest_prices
+
+
+def get_price_summaries_for_ingredient(
+    db: Session,
+    ingredient_id: int,
+    user_id: int
+) -> List[IngredientPriceSummary]:
+    """
+    Get precomputed price aggregates for an ingredient at every supermarket
+    Excludes user's excluded supermarkets and inactive supermarkets
+    """
+    rows = _price_summary_query(db).filter(
+        and_(
+            IngredientCheapestPrice.ingredient_id == ingredient_id,
+            Supermarket.is_active == True,
+            ~_is_excluded(user_id)
+        )
+    ).order_by(IngredientCheapestPrice.min_price, IngredientCheapestPrice.supermarket_id).all()
+    
+    return [
+        _build_price_summary(aggregate, ingredient_name, supermarket_name)
+        for aggregate, ingredient_name, supermarket_name in rows
+    ]
+
+
+def refresh_price_aggregate(
+    db: Session,
+    ingredient_id: int,
+    supermarket_id: int
+) -> Optional[IngredientCheapestPrice]:
+    """
+    Recompute the aggregate row for one ingredient+supermarket pair
+    
+    Runs inside the caller's transaction (pending changes must be flushed
+    first); the caller is responsible for committing. Returns the aggregate,
+    or None when the pair has no prices left.
+    """
+    prices = db.query(
+        IngredientPrice.price_per_unit,
+        IngredientPrice.unit,
+        Ingredient.density_g_per_ml,
+        Ingredient.unit_weight_g
+    ).join(
+        Ingredient, Ingredient.id == IngredientPrice.ingredient_id
+    ).filter(
+        and_(
+            IngredientPrice.ingredient_id == ingredient_id,
+            IngredientPrice.supermarket_id == supermarket_id
+        )
+    ).order_by(IngredientPrice.price_per_unit, IngredientPrice.id).all()
+    
+    aggregate = db.get(IngredientCheapestPrice, (ingredient_id, supermarket_id))
     
     if not prices:
+        if aggregate:
+            db.delete(aggregate)
         return None
     
-    # Find cheapest price
-    cheapest = min(prices, key=lambda p: float(p.price_per_unit))
-    return cheapest
+    if not aggregate:
+        aggregate = IngredientCheapestPrice(ingredient_id=ingredient_id, supermarket_id=supermarket_id)
+        db.add(aggregate)
+    
+    _apply_aggregate(aggregate, prices)
+    return aggregate
+
+
+def refresh_ingredient_aggregates(db: Session, ingredient_id: int) -> List[IngredientCheapestPrice]:
+    """
+    Recompute an ingredient's aggregates at every supermarket pricing it
+    
+    For when its density or unit weight changed: prices in other units were
+    converted with the old values. Runs inside the caller's transaction
+    (flush the ingredient first); the caller commits.
+    """
+    supermarket_ids = [
+        supermarket_id for supermarket_id, in
+        db.query(IngredientPrice.supermarket_id).filter(IngredientPrice.ingredient_id == ingredient_id).distinct()
+    ]
+    return [refresh_price_aggregate(db, ingredient_id, supermarket_id) for supermarket_id in supermarket_ids]
+
+
+def rebuild_price_aggregates(db: Session) -> int:
+    """
+    Rebuild every aggregate row from ingredient_prices (for backfills)
+    Returns the number of aggregate rows written
+    """
+    db.query(IngredientCheapestPrice).delete(synchronize_session='fetch')
+    
+    prices = db.query(
+        IngredientPrice.ingredient_id,
+        IngredientPrice.supermarket_id,
+        IngredientPrice.price_per_unit,
+        IngredientPrice.unit,
+        Ingredient.density_g_per_ml,
+        Ingredient.unit_weight_g
+    ).join(
+        Ingredient, Ingredient.id == IngredientPrice.ingredient_id
+    ).order_by(
+        IngredientPrice.ingredient_id,
+        IngredientPrice.supermarket_id,
+        IngredientPrice.price_per_unit,
+        IngredientPrice.id
+    ).all()
+    
+    created_count = 0
+    for (ingredient_id, supermarket_id), group in groupby(prices, key=lambda p: (p.ingredient_id, p.supermarket_id)):
+        aggregate = IngredientCheapestPrice(ingredient_id=ingredient_id, supermarket_id=supermarket_id)
+        _apply_aggregate(aggregate, list(group))
+        db.add(aggregate)
+        created_count += 1
+    
+    db.commit()
+    price_matrix.invalidate()
+    return created_count
+
+
+def _apply_aggregate(aggregate: IngredientCheapestPrice, prices: List) -> None:
+    """
+    Set min/median/count/unit on an aggregate from prices sorted by price_per_unit
+
+    Prices are compared in one unit: the one most prices are quoted in (the
+    cheapest price's on a tie). Other prices are converted through the
+    ingredient's density and unit weight, and left out when they can't be.
+    """
+    counts = Counter(price.unit for price in prices)
+    unit = max(counts, key=lambda candidate: (counts[candidate], candidate == prices[0].unit))
+    
+    values = []
+    for price in prices:
+        value = units.convert_price(
+            float(price.price_per_unit), price.unit.value, unit.value, price.density_g_per_ml, price.unit_weight_g
+        )
+        if value is not None:
+            values.append(Decimal(price.price_per_unit) if price.unit == unit else Decimal(f"{value:.2f}"))
+    values.sort()
+    
+    aggregate.min_price = values[0]
+    aggregate.median_price = Decimal(median(values)).quantize(Decimal("0.01"))
+    aggregate.price_count = len(values)
+    aggregate.unit = unit
+
+
+def _price_per_gram():
+    """
+    SQL expression converting an aggregate's min_price to a price per gram
+    
+    Needs Ingredient joined; NULL when the ingredient lacks the density or
+    unit weight its unit needs.
+    """
+    grams_per = {
+        units.GRAM: literal(1.0),
+        units.MILLILITER: Ingredient.density_g_per_ml,
+        units.UNIT: Ingredient.unit_weight_g
+    }
+    return case(*[
+        (
+            IngredientCheapestPrice.unit == unit,
+            cast(IngredientCheapestPrice.min_price, Float) / func.nullif(grams_per[canonical_unit] * factor, 0)
+        )
+        for unit, (canonical_unit, factor) in units.PRICE_UNITS.items()
+    ])
+
+
+def _is_excluded(user_id: int):
+    """Correlated EXISTS clause matching the user's exclusion for an aggregate row"""
+    return exists().where(
+        and_(
+            IngredientExclusion.user_id == user_id,
+            IngredientExclusion.ingredient_id == IngredientCheapestPrice.ingredient_id,
+            IngredientExclusion.supermarket_id == IngredientCheapestPrice.supermarket_id
+        )
+    )
+
+
+def _price_summary_query(db: Session):
+    """Aggregate rows joined with ingredient and supermarket names"""
+    return db.query(
+        IngredientCheapestPrice,
+        Ingredient.name.label("ingredient_name"),
+        Supermarket.name.label("supermarket_name")
+    ).join(
+        Ingredient, Ingredient.id == IngredientCheapestPrice.ingredient_id
+    ).join(
+        Supermarket, Supermarket.id == IngredientCheapestPrice.supermarket_id
+    )
+
+
+def _build_price_summary(
+    aggregate: IngredientCheapestPrice,
+    ingredient_name: str,
+    supermarket_name: str
+) -> IngredientPriceSummary:
+    """Convert an aggregate row to its response schema"""
+    return IngredientPriceSummary(
+        ingredient_id=aggregate.ingredient_id,
+        ingredient_name=ingredient_name,
+        supermarket_id=aggregate.supermarket_id,
+        supermarket_name=supermarket_name,
+        min_price=aggregate.min_price,
+        median_price=aggregate.median_price,
+        price_count=aggregate.price_count,
+        unit=aggregate.unit,
+        updated_at=aggregate.updated_at
+    )
+
+
+def _cheapest_price_strategy(db: Session) -> str:
+    """Pick the cheapest-price selection strategy supported by the database"""
+    dialect = db.get_bind().dialect
+    
+    if dialect.name == "postgresql":
+        return "distinct_on"
+    
+    # SQLite only supports window functions from 3.25
+    if dialect.name == "sqlite" and dialect.dbapi.sqlite_version_info < (3, 25):
+        return "aggregate"
+    
+    return "window"
@@ -1,10 +1,23 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
 from fastapi import HTTPException, status
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+from datetime import datetime
 from app.models.recipe import Ingredient, Recipe, RecipeIngredient, Tag
 from app.models.user import User
+from app.services import (
+    autocomplete_service,
+    discovery_service,
+    load_profiles,
+    nutrition_service,
+    optimization_service,
+    price_matrix,
+    price_service,
+    search_service,
+    tag_index
+)
+from app.utils import pagination
 from app.schemas.recipe import (
     IngredientCreate,
     IngredientUpdate,
@@ -13,10 +26,27 @@ from app.schemas.recipe import (
     RecipeUpdate,
     RecipeResponse,
     RecipeListResponse,
+    RecipeFacetsResponse,
     RecipeIngredientResponse,
+    TagFacet,
     TagResponse
 )
 
+# Per-serving columns the recipe list filters on by range
+MACRO_COLUMNS = {
+    'calories': Recipe.calories_per_serving,
+    'protein': Recipe.protein_per_serving,
+    'carbs': Recipe.carbs_per_serving,
+    'fats': Recipe.fats_per_serving
+}
+
+# Tag matches with more recipes than this are filtered with EXISTS in SQL
+# rather than bound as an IN list of ids
+MAX_TAG_MATCH_IDS = 500
+
+# Recipe list orderings besides the default (newest / most relevant first)
+SORT_PROTEIN_DENSITY = 'protein_density'
+
 
 class RecipeService:
     def __init__(self, db: Session):
@@ -24,7 +54,7 @@ class RecipeService:
     
     # ==================== INGREDIENT OPERATIONS ====================
     
-    async def create_ingredient(self, ingredient_data: IngredientCreate, user_id: Optional[int] = None) -> IngredientResponse:
+    def create_ingredient(self, ingredient_data: IngredientCreate, user_id: Optional[int] = None) -> IngredientResponse:
         """Create new ingredient."""
         
         # Check if ingredient exists
@@ -42,6 +72,8 @@ class RecipeService:
             protein_per_100g=ingredient_data.protein_per_100g,
             carbs_per_100g=ingredient_data.carbs_per_100g,
             fats_per_100g=ingredient_data.fats_per_100g,
+            density_g_per_ml=ingredient_data.density_g_per_ml,
+            unit_weight_g=ingredient_data.unit_weight_g,
             is_public=ingredient_data.is_public,
             created_by=user_id
         )
@@ -57,20 +89,50 @@ class RecipeService:
                 detail="Failed to create ingredient"
             )
         
+        nutrition_service.invalidate([new_ingredient.id])
+        price_matrix.update_conversion(new_ingredient.id, new_ingredient.density_g_per_ml, new_ingredient.unit_weight_g)
+        autocomplete_service.update_ingredient(new_ingredient.id, new_ingredient.name, new_ingredient.is_public)
+        
         return IngredientResponse.from_orm(new_ingredient)
     
-    async def get_ingredients(self, search: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[IngredientResponse]:
-        """List ingredients with optional search."""
+    def get_ingredients(
+        self,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[IngredientResponse], Optional[str]]:
+        """
+        List ingredients by name with optional search.
+        
+        Returns the page and the cursor of the next one (None on the last page).
+        `skip` is ignored when a cursor is given.
+        """
+        
+        if cursor:
+            skip = 0  # The cursor already marks where the page starts
         
         query = self.db.query(Ingredient).filter(Ingredient.is_public == True)
         
         if search:
             query = query.filter(Ingredient.name.ilike(f"%{search}%"))
         
-        ingredients = query.offset(skip).limit(limit).all()
-        return [IngredientResponse.from_orm(ing) for ing in ingredients]
+        # Keyset pagination on (name, id)
+        if cursor:
+            name, ingredient_id = pagination.decode_cursor(cursor, str, int)
+            query = query.filter(pagination.after(self.db, [Ingredient.name, Ingredient.id], [name, ingredient_id]))
+        
+        # Fetch one extra row to know whether there is a next page
+        ingredients = query.order_by(Ingredient.name, Ingredient.id).offset(skip).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(ingredients) > limit:
+            ingredients = ingredients[:limit]
+            next_cursor = pagination.encode_cursor(ingredients[-1].name, ingredients[-1].id)
+        
+        return [IngredientResponse.from_orm(ing) for ing in ingredients], next_cursor
     
-    async def get_ingredient_by_id(self, ingredient_id: int) -> IngredientResponse:
+    def get_ingredient_by_id(self, ingredient_id: int) -> IngredientResponse:
         """Get ingredient by ID."""
         
         ingredient = self.db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
@@ -82,9 +144,69 @@ class RecipeService:
         
         return IngredientResponse.from_orm(ingredient)
     
+    def update_ingredient(self, ingredient_id: int, ingredient_update: IngredientUpdate, user_id: int) -> IngredientResponse:
+        """Update ingredient (creator only) and refresh nutrition of recipes using it."""
+        
+        ingredient = self.db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
+        if not ingredient:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ingredient not found"
+            )
+        
+        # Check ownership
+        if ingredient.created_by != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have permission to update this ingredient"
+            )
+        
+        update_data = ingredient_update.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(ingredient, field, value)
+        
+        try:
+            self.db.flush()
+            
+            # Stored recipe totals depend on macros, density and unit weight
+            nutrition_service.invalidate([ingredient_id])
+            if update_data.keys() - {'name', 'is_public'}:
+                nutrition_service.refresh_recipe_totals(self.db, ingredient_id)
+            
+            # Prices in other units were converted with the old density / unit weight
+            aggregates = []
+            if update_data.keys() & {'density_g_per_ml', 'unit_weight_g'}:
+                aggregates = price_service.refresh_ingredient_aggregates(self.db, ingredient_id)
+            
+            # Recipes are searchable by ingredient name
+            if 'name' in update_data:
+                recipe_ids = [
+                    recipe_id for recipe_id, in
+                    self.db.query(RecipeIngredient.recipe_id).filter(RecipeIngredient.ingredient_id == ingredient_id).distinct()
+                ]
+                search_service.update_search_vectors(self.db, recipe_ids)
+            
+            self.db.commit()
+            self.db.refresh(ingredient)
+            if 'name' in update_data:
+                search_service.index_recipes(self.db, recipe_ids)
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to update ingredient"
+            )
+        
+        price_matrix.update_conversion(ingredient.id, ingredient.density_g_per_ml, ingredient.unit_weight_g)
+        for aggregate in aggregates:
+            price_matrix.update_price(aggregate.ingredient_id, aggregate.supermarket_id, float(aggregate.min_price), aggregate.unit)
+        autocomplete_service.update_ingredient(ingredient.id, ingredient.name, ingredient.is_public)
+        
+        return IngredientResponse.from_orm(ingredient)
+    
     # ==================== RECIPE OPERATIONS ====================
     
-    async def create_recipe(self, recipe_data: RecipeCreate, user_id: int) -> RecipeResponse:
+    def create_recipe(self, recipe_data: RecipeCreate, user_id: int) -> RecipeResponse:
         """Create recipe with ingredients and tags."""
         
         try:
@@ -104,7 +226,8 @@ class RecipeService:
             self.db.add(new_recipe)
             self.db.flush()  # Get recipe ID without committing
             
-            # Add ingredients
+            # Add ingredients, accumulating nutrition totals
+            totals = {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fats': 0.0}
             for ing_data in recipe_data.ingredients:
                 # Verify ingredient exists
                 ingredient = self.db.query(Ingredient).filter(Ingredient.id == ing_data.ingredient_id).first()
@@ -121,16 +244,26 @@ class RecipeService:
                     unit=ing_data.unit
                 )
                 self.db.add(recipe_ingredient)
+                self._add_nutrition(totals, ingredient, ing_data.amount, ing_data.unit)
+            
+            nutrition_service.store_recipe_totals(new_recipe, totals)
             
             # Add tags
             if recipe_data.tag_names:
-                tags = await self._get_or_create_tags(recipe_data.tag_names)
+                tags = self._get_or_create_tags(recipe_data.tag_names)
                 new_recipe.tags = tags
             
+            self.db.flush()
+            search_service.update_search_vectors(self.db, [new_recipe.id])
+            
             self.db.commit()
             self.db.refresh(new_recipe)
+            search_service.index_recipes(self.db, [new_recipe.id])
+            autocomplete_service.refresh_usage(self.db, [ing.ingredient_id for ing in recipe_data.ingredients])
+            discovery_service.update_recipe(self.db, new_recipe.id)
+            tag_index.update_recipe(new_recipe.id, [t.name for t in new_recipe.tags], new_recipe.is_public)
             
-            return await self.get_recipe_by_id(new_recipe.id)
+            return self.get_recipe_by_id(new_recipe.id)
             
         except IntegrityError as e:
             self.db.rollback()
@@ -139,47 +272,165 @@ class RecipeService:
                 detail="Failed to create recipe"
             )
     
-    async def get_recipes(
+    def get_recipes(
         self,
         search: Optional[str] = None,
         tag: Optional[str] = None,
         author_id: Optional[int] = None,
         skip: int = 0,
-        limit: int = 20
-    ) -> List[RecipeListResponse]:
-        """List recipes with filters and pagination."""
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        mode: str = tag_index.MATCH_ALL,
+        macro_ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        sort: Optional[str] = None
+    ) -> Tuple[List[RecipeListResponse], Optional[str]]:
+        """
+        List recipes with filters and pagination.
+        
+        `tags` keeps recipes with all of them (mode 'all') or any of them
+        (mode 'any'); `tag` is the single-tag form. `macro_ranges` maps a
+        macro ('calories', 'protein', 'carbs', 'fats') to an inclusive
+        (min, max) per serving, either end None. Newest first, most relevant
+        first when searching, or highest protein per 100 kcal first with
+        sort='protein_density'. Returns the page and the cursor of the next
+        one (None on the last page); `skip` is ignored when a cursor is given.
+        """
+        
+        if cursor:
+            skip = 0  # The cursor already marks where the page starts
         
         query = self.db.query(Recipe).filter(Recipe.is_public == True)
         
         # Apply filters
+        rank = None
+        ranked_matches = None
         if search:
-            query = query.filter(Recipe.title.ilike(f"%{search}%"))
+            if sort is None and not search_service.uses_postgres(self.db):
+                # Ranked on the in-process index, a batch of candidates per statement
+                ranked_matches = search_service.ranked_matches(self.db, search)
+            else:
+                query, rank = search_service.apply_search(self.db, query, search)
         
-        if tag:
-            query = query.join(Recipe.tags).filter(Tag.name == tag)
+        tag_names = self._tag_filter(tag, tags)
+        if tag_names:
+            query = self._apply_tags(query, tag_names, mode)
         
         if author_id:
             query = query.filter(Recipe.author_id == author_id)
         
-        # Load relationships
-        query = query.options(
-            joinedload(Recipe.author),
-            joinedload(Recipe.tags),
-            joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngredient.ingredient)
-        )
+        query = self._apply_macro_ranges(query, macro_ranges)
+        
+        # Load relationships (nutrition totals are stored on the recipe)
+        query = query.options(*load_profiles.load_options('recipe_list'))
+        
+        # Keyset pagination on (protein_density, id), (rank, id) when
+        # searching, (created_at, id) otherwise
+        if ranked_matches is not None:
+            return self._get_ranked_page(query, ranked_matches, skip, limit, cursor)
+        if sort == SORT_PROTEIN_DENSITY:
+            # Recipes whose nutrition was never computed can't be ranked
+            query = query.filter(Recipe.protein_density.isnot(None))
+            sort_columns = [Recipe.protein_density, Recipe.id]
+            query = query.add_columns(Recipe.protein_density)
+            cursor_types = (float, int)
+        elif rank is not None:
+            sort_columns = [rank, Recipe.id]
+            query = query.add_columns(rank)
+            cursor_types = (float, int)
+        else:
+            sort_columns = [Recipe.created_at, Recipe.id]
+            query = query.add_columns(Recipe.created_at)
+            cursor_types = (datetime, int)
         
-        recipes = query.order_by(Recipe.created_at.desc()).offset(skip).limit(limit).all()
+        if cursor:
+            values = pagination.decode_cursor(cursor, *cursor_types)
+            query = query.filter(pagination.after(self.db, sort_columns, values, descending=True))
         
-        # Build response with calculated nutrition
-        return [self._build_list_response(recipe) for recipe in recipes]
+        # Fetch one extra row to know whether there is a next page
+        rows = query.order_by(*[column.desc() for column in sort_columns]).offset(skip).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = pagination.encode_cursor(rows[-1][1], rows[-1][0].id)
+        recipes = [row[0] for row in rows]
+        
+        # Build response with stored nutrition
+        return [self._build_list_response(recipe) for recipe in recipes], next_cursor
     
-    async def get_recipe_by_id(self, recipe_id: int) -> RecipeResponse:
+    def _get_ranked_page(
+        self,
+        query,
+        matches: List[Tuple[float, int]],
+        skip: int,
+        limit: int,
+        cursor: Optional[str]
+    ) -> Tuple[List[RecipeListResponse], Optional[str]]:
+        """
+        Page of search results ranked on the in-process index.
+        
+        `matches` are (score, recipe_id) best first. Candidates are bound a
+        batch at a time, in rank order, until the page is full, so no
+        statement carries more ids than a page needs.
+        """
+        
+        if cursor:
+            position = pagination.decode_cursor(cursor, float, int)
+            matches = [match for match in matches if match < position]
+        
+        # Fetch one extra row to know whether there is a next page
+        wanted = skip + limit + 1
+        batch_size = max(wanted, search_service.CANDIDATE_BATCH)
+        rows = []
+        for start in range(0, len(matches), batch_size):
+            scores = {recipe_id: score for score, recipe_id in matches[start:start + batch_size]}
+            rank = search_service.rank_expression(scores)
+            rows += query.filter(Recipe.id.in_(scores)).add_columns(rank).order_by(
+                rank.desc(), Recipe.id.desc()
+            ).limit(wanted - len(rows)).all()
+            if len(rows) >= wanted:
+                break
+        rows = rows[skip:]
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = pagination.encode_cursor(rows[-1][1], rows[-1][0].id)
+        return [self._build_list_response(row[0]) for row in rows], next_cursor
+    
+    def get_tag_facets(
+        self,
+        search: Optional[str] = None,
+        tag: Optional[str] = None,
+        author_id: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        mode: str = tag_index.MATCH_ALL,
+        macro_ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+    ) -> RecipeFacetsResponse:
+        """Per-tag recipe counts of the get_recipes() result set (all pages)."""
+        
+        recipe_ids = None
+        if search or author_id or macro_ranges:
+            query = self.db.query(Recipe.id).filter(Recipe.is_public == True)
+            if search:
+                query, _ = search_service.apply_search(self.db, query, search)
+            if author_id:
+                query = query.filter(Recipe.author_id == author_id)
+            query = self._apply_macro_ranges(query, macro_ranges)
+            recipe_ids = [recipe_id for recipe_id, in query]
+        
+        total, facets = tag_index.tag_facets(self.db, recipe_ids, self._tag_filter(tag, tags), mode)
+        return RecipeFacetsResponse(
+            total=total,
+            tags=[TagFacet(name=name, count=count) for name, count in facets]
+        )
+    
+    def get_recipe_by_id(self, recipe_id: int) -> RecipeResponse:
         """Get detailed recipe with nutrition calculation."""
         
         recipe = self.db.query(Recipe).options(
-            joinedload(Recipe.author),
-            joinedload(Recipe.tags),
-            joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngredient.ingredient)
+            *load_profiles.load_options('recipe_detail')
         ).filter(Recipe.id == recipe_id).first()
         
         if not recipe:
@@ -190,7 +441,7 @@ class RecipeService:
         
         return self._build_detailed_response(recipe)
     
-    async def update_recipe(self, recipe_id: int, recipe_update: RecipeUpdate, user_id: int) -> RecipeResponse:
+    def update_recipe(self, recipe_id: int, recipe_update: RecipeUpdate, user_id: int) -> RecipeResponse:
         """Update recipe (owner only)."""
         
         recipe = self.db.query(Recipe).filter(Recipe.id == recipe_id).first()
@@ -213,11 +464,16 @@ class RecipeService:
             setattr(recipe, field, value)
         
         # Update ingredients if provided
+        changed_ingredient_ids = set()
         if recipe_update.ingredients is not None:
+            changed_ingredient_ids = {ing.ingredient_id for ing in recipe.recipe_ingredients}
+            changed_ingredient_ids.update(ing.ingredient_id for ing in recipe_update.ingredients)
+            
             # Remove existing ingredients
             self.db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == recipe_id).delete()
             
-            # Add new ingredients
+            # Add new ingredients, accumulating nutrition totals
+            totals = {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fats': 0.0}
             for ing_data in recipe_update.ingredients:
                 ingredient = self.db.query(Ingredient).filter(Ingredient.id == ing_data.ingredient_id).first()
                 if not ingredient:
@@ -233,18 +489,32 @@ class RecipeService:
                     unit=ing_data.unit
                 )
                 self.db.add(recipe_ingredient)
+                self._add_nutrition(totals, ingredient, ing_data.amount, ing_data.unit)
+            
+            nutrition_service.store_recipe_totals(recipe, totals)
+        elif 'servings' in update_data:
+            # Same totals over a different number of servings
+            nutrition_service.store_serving_nutrition(recipe)
         
         # Update tags if provided
         if recipe_update.tag_names is not None:
-            tags = await self._get_or_create_tags(recipe_update.tag_names)
+            tags = self._get_or_create_tags(recipe_update.tag_names)
             recipe.tags = tags
         
+        self.db.flush()
+        search_service.update_search_vectors(self.db, [recipe_id])
+        
         self.db.commit()
         self.db.refresh(recipe)
+        search_service.index_recipes(self.db, [recipe_id])
+        autocomplete_service.refresh_usage(self.db, changed_ingredient_ids)
+        discovery_service.update_recipe(self.db, recipe_id)
+        tag_index.update_recipe(recipe_id, [t.name for t in recipe.tags], recipe.is_public)
+        optimization_service.invalidate_recipe_costs([recipe_id])
         
-        return await self.get_recipe_by_id(recipe_id)
+        return self.get_recipe_by_id(recipe_id)
     
-    async def delete_recipe(self, recipe_id: int, user_id: int) -> Dict[str, str]:
+    def delete_recipe(self, recipe_id: int, user_id: int) -> Dict[str, str]:
         """Delete recipe (owner only)."""
         
         recipe = self.db.query(Recipe).filter(Recipe.id == recipe_id).first()
@@ -261,14 +531,59 @@ class RecipeService:
                 detail="You don't have permission to delete this recipe"
             )
         
+        ingredient_ids = [ing.ingredient_id for ing in recipe.recipe_ingredients]
+        
         self.db.delete(recipe)
         self.db.commit()
+        search_service.remove_recipe(recipe_id)
+        autocomplete_service.refresh_usage(self.db, ingredient_ids)
+        discovery_service.remove_recipe(recipe_id)
+        tag_index.remove_recipe(recipe_id)
+        optimization_service.invalidate_recipe_costs([recipe_id])
         
         return {"message": "Recipe deleted successfully"}
     
     # ==================== HELPER METHODS ====================
     
-    async def _get_or_create_tags(self, tag_names: List[str]) -> List[Tag]:
+    def _add_nutrition(self, totals: Dict[str, float], ingredient: Ingredient, amount: float, unit: str) -> None:
+        """Add an ingredient amount's nutrition to running recipe totals."""
+        
+        for key, value in nutrition_service.ingredient_nutrition(ingredient, amount, unit).items():
+            totals[key] += value
+    
+    def _apply_macro_ranges(self, query, macro_ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]):
+        """Filter a recipe query by per-serving macro ranges (indexed columns)."""
+        
+        for macro, (low, high) in (macro_ranges or {}).items():
+            column = MACRO_COLUMNS[macro]
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        return query
+    
+    def _apply_tags(self, query, tag_names: List[str], mode: str):
+        """Filter a recipe query by tags without joins, so no duplicate rows."""
+        
+        # Resolved on the tag bitmap index while the id list stays small
+        recipe_ids = tag_index.match_recipes(self.db, tag_names, mode)
+        if len(recipe_ids) <= MAX_TAG_MATCH_IDS:
+            return query.filter(Recipe.id.in_(recipe_ids))
+        
+        # Broad tags: one bounded EXISTS instead of thousands of parameters
+        if mode == tag_index.MATCH_ANY:
+            return query.filter(Recipe.tags.any(Tag.name.in_(tag_names)))
+        return query.filter(*[Recipe.tags.any(Tag.name == name) for name in tag_names])
+    
+    def _tag_filter(self, tag: Optional[str], tags: Optional[List[str]]) -> List[str]:
+        """Tag names to filter by, normalized like stored tags."""
+        
+        names = list(tags or [])
+        if tag:
+            names.append(tag)
+        return list(dict.fromkeys(name.strip().lower() for name in names if name.strip()))
+    
+    def _get_or_create_tags(self, tag_names: List[str]) -> List[Tag]:
         """Get existing tags or create new ones."""
         
         tags = []
@@ -282,45 +597,14 @@ class RecipeService:
         
         return tags
     
-    def _calculate_ingredient_nutrition(self, recipe_ingredient: RecipeIngredient) -> Dict[str, float]:
-        """Calculate nutrition for a specific recipe ingredient based on amount."""
-        
-        ingredient = recipe_ingredient.ingredient
-        amount = recipe_ingredient.amount
-        
-        # Convert amount to 100g equivalent
-        # For simplicity, assuming 'g' and 'ml' are equivalent to grams
-        # For 'unit', assume 1 unit = 100g (this should be configurable per ingredient)
-        if recipe_ingredient.unit in ['g', 'ml']:
-            multiplier = amount / 100
-        elif recipe_ingredient.unit == 'unit':
-            multiplier = 1.0  # 1 unit = 100g
-        else:
-            # For other units (cup, tbsp, etc.), use a simple conversion
-            # This should be more sophisticated in production
-            multiplier = amount / 100
-        
-        return {
-            'calories': ingredient.calories_per_100g * multiplier,
-            'protein': ingredient.protein_per_100g * multiplier,
-            'carbs': ingredient.carbs_per_100g * multiplier,
-            'fats': ingredient.fats_per_100g * multiplier
-        }
-    
     def _calculate_recipe_nutrition(self, recipe: Recipe) -> Dict[str, float]:
         """Calculate total nutrition for entire recipe."""
         
-        total_calories = 0.0
-        total_protein = 0.0
-        total_carbs = 0.0
-        total_fats = 0.0
-        
-        for recipe_ingredient in recipe.recipe_ingredients:
-            nutrition = self._calculate_ingredient_nutrition(recipe_ingredient)
-            total_calories += nutrition['calories']
-            total_protein += nutrition['protein']
-            total_carbs += nutrition['carbs']
-            total_fats += nutrition['fats']
+        totals = nutrition_service.recipe_nutrition(recipe)
+        total_calories = totals['calories']
+        total_protein = totals['protein']
+        total_carbs = totals['carbs']
+        total_fats = totals['fats']
         
         return {
             'total_calories': round(total_calories, 2),
@@ -341,7 +625,7 @@ class RecipeService:
         # Build ingredients list with nutrition
         ingredients_response = []
         for recipe_ing in recipe.recipe_ingredients:
-            ing_nutrition = self._calculate_ingredient_nutrition(recipe_ing)
+            ing_nutrition = nutrition_service.ingredient_nutrition(recipe_ing.ingredient, recipe_ing.amount, recipe_ing.unit)
             ingredients_response.append(RecipeIngredientResponse(
                 id=recipe_ing.id,
                 ingredient_id=recipe_ing.ingredient_id,
@@ -0,0 +1,246 @@
+"""Full-text recipe search
+
+PostgreSQL keeps a weighted tsvector per recipe (title, tags and ingredient
+names, description) in recipes.search_vector behind a GIN index. Other
+databases (SQLite in development and tests) use an in-process inverted index
+with the same weights. Recipe writes refresh the tsvector with
+update_search_vectors() inside their transaction and the in-process index
+with index_recipes() once committed.
+"""
+
+import bisect
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Float, bindparam, case, cast, false, func, text
+from sqlalchemy.orm import Query, Session
+
+from app.database import primary_session
+from app.models.recipe import Ingredient, Recipe, RecipeIngredient, Tag, recipe_tags
+
+# Text search configuration; 'simple' doesn't stem, so it works for any language
+TS_CONFIG = 'simple'
+
+# Relevance of a match in each part of the recipe (PostgreSQL weights A, B, C)
+TITLE_WEIGHT = 1.0
+TAG_INGREDIENT_WEIGHT = 0.4
+DESCRIPTION_WEIGHT = 0.2
+
+# Candidate ids bound per statement when ranking on the in-process index
+CANDIDATE_BATCH = 200
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_REFRESH_SEARCH_VECTOR = text(f"""
+    UPDATE recipes SET search_vector =
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(recipes.title, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce((
+            SELECT string_agg(tags.name, ' ') FROM recipe_tags
+            JOIN tags ON tags.id = recipe_tags.tag_id
+            WHERE recipe_tags.recipe_id = recipes.id
+        ), '') || ' ' || coalesce((
+            SELECT string_agg(ingredients.name, ' ') FROM recipe_ingredients
+            JOIN ingredients ON ingredients.id = recipe_ingredients.ingredient_id
+            WHERE recipe_ingredients.recipe_id = recipes.id
+        ), '')), 'B') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(recipes.description, '')), 'C')
+    WHERE recipes.id IN :recipe_ids
+""").bindparams(bindparam('recipe_ids', expanding=True))
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Lower-case words of a text"""
+    return _TOKEN.findall(value.lower()) if value else []
+
+
+class InvertedIndex:
+    """Token -> {recipe_id: weight} postings with prefix lookup"""
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.documents: Dict[int, Set[str]] = {}
+        self._tokens: Optional[List[str]] = None  # Sorted, rebuilt after changes
+
+    @classmethod
+    def load(cls, db: Session) -> "InvertedIndex":
+        """Index every recipe (three queries)"""
+        index = cls()
+        fields: Dict[int, List[Tuple[Optional[str], float]]] = {}
+
+        for recipe in db.query(Recipe.id, Recipe.title, Recipe.description):
+            fields[recipe.id] = [(recipe.title, TITLE_WEIGHT), (recipe.description, DESCRIPTION_WEIGHT)]
+        for recipe_id, name in db.query(recipe_tags.c.recipe_id, Tag.name).join(Tag, Tag.id == recipe_tags.c.tag_id):
+            fields.setdefault(recipe_id, []).append((name, TAG_INGREDIENT_WEIGHT))
+        for recipe_id, name in db.query(RecipeIngredient.recipe_id, Ingredient.name).join(Ingredient):
+            fields.setdefault(recipe_id, []).append((name, TAG_INGREDIENT_WEIGHT))
+
+        for recipe_id, recipe_fields in fields.items():
+            index.add(recipe_id, recipe_fields)
+        return index
+
+    def add(self, recipe_id: int, fields: List[Tuple[Optional[str], float]]) -> None:
+        """(Re)index a recipe from (text, weight) fields"""
+        self.remove(recipe_id)
+        weights: Dict[str, float] = {}
+        for value, weight in fields:
+            for token in tokenize(value):
+                weights[token] = max(weights.get(token, 0.0), weight)
+
+        for token, weight in weights.items():
+            self.postings.setdefault(token, {})[recipe_id] = weight
+        self.documents[recipe_id] = set(weights)
+        self._tokens = None
+
+    def remove(self, recipe_id: int) -> None:
+        """Drop a recipe from the index"""
+        for token in self.documents.pop(recipe_id, ()):
+            postings = self.postings[token]
+            postings.pop(recipe_id, None)
+            if not postings:
+                del self.postings[token]
+        self._tokens = None
+
+    def search(self, terms: List[str]) -> Dict[int, float]:
+        """
+        Score recipes matching every term (as a word prefix)
+
+        A recipe's score adds up the best weight each term matched with.
+        """
+        if self._tokens is None:
+            self._tokens = sorted(self.postings)
+
+        scores: Optional[Dict[int, float]] = None
+        for term in terms:
+            term_scores: Dict[int, float] = {}
+            start = bisect.bisect_left(self._tokens, term)
+            for token in self._tokens[start:]:
+                if not token.startswith(term):
+                    break
+                for recipe_id, weight in self.postings[token].items():
+                    term_scores[recipe_id] = max(term_scores.get(recipe_id, 0.0), weight)
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {recipe_id: score + term_scores[recipe_id] for recipe_id, score in scores.items() if recipe_id in term_scores}
+            if not scores:
+                break
+
+        return scores or {}
+
+
+_index: Optional[InvertedIndex] = None
+_lock = threading.Lock()
+
+
+def uses_postgres(db: Session) -> bool:
+    """Whether search runs on the PostgreSQL tsvector column"""
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+def apply_search(db: Session, query: Query, search: str) -> Tuple[Query, object]:
+    """
+    Restrict a Recipe query to recipes matching `search`
+
+    Returns the filtered query and a SQL expression with each recipe's
+    relevance (higher is better) to order by. On the in-process index every
+    match is bound as a parameter; to rank a page, page through
+    ranked_matches() instead.
+    """
+    terms = tokenize(search)
+    if not terms:
+        return query.filter(false()), cast(0.0, Float)
+
+    if uses_postgres(db):
+        # Every term as a prefix, e.g. "chick rice" -> chick:* & rice:*
+        ts_query = func.to_tsquery(TS_CONFIG, ' & '.join(f"{term}:*" for term in terms))
+        rank = cast(func.ts_rank_cd(Recipe.search_vector, ts_query), Float)
+        return query.filter(Recipe.search_vector.op('@@')(ts_query)), rank
+
+    scores = _search_index(db, terms)
+    if not scores:
+        return query.filter(false()), cast(0.0, Float)
+    return query.filter(Recipe.id.in_(scores)), rank_expression(scores)
+
+
+def ranked_matches(db: Session, search: str) -> List[Tuple[float, int]]:
+    """(score, recipe_id) of every recipe matching `search` on the in-process index, best first"""
+    terms = tokenize(search)
+    if not terms:
+        return []
+    scores = _search_index(db, terms)
+    return sorted(((score, recipe_id) for recipe_id, score in scores.items()), reverse=True)
+
+
+def rank_expression(scores: Dict[int, float]):
+    """SQL relevance of the recipes in `scores` (0 for any other); keep `scores` to a page of candidates"""
+    return cast(case(scores, value=Recipe.id, else_=0.0), Float)
+
+
+def _search_index(db: Session, terms: List[str]) -> Dict[int, float]:
+    """Scores of the recipes matching every term on the in-process index"""
+    global _index
+
+    with _lock:
+        if _index is None:
+            with primary_session(db) as primary:
+                _index = InvertedIndex.load(primary)
+        return _index.search(terms)
+
+
+def update_search_vectors(db: Session, recipe_ids: List[int]) -> None:
+    """
+    Refresh the stored tsvector of recipes after a write (PostgreSQL only)
+
+    Call after flushing the recipes' ingredients and tags; the update joins
+    the caller's transaction.
+    """
+    if recipe_ids and uses_postgres(db):
+        db.execute(_REFRESH_SEARCH_VECTOR, {'recipe_ids': list(recipe_ids)})
+
+
+def index_recipes(db: Session, recipe_ids: List[int]) -> None:
+    """
+    Refresh the in-process index entries of recipes (not PostgreSQL)
+
+    Call once the write is committed, so a rolled back write never shows up
+    in search results.
+    """
+    if not recipe_ids or uses_postgres(db):
+        return
+
+    with _lock:
+        if _index is None:
+            return  # Built from the database on first search
+
+        for recipe_id in recipe_ids:
+            recipe = db.query(Recipe.title, Recipe.description).filter(Recipe.id == recipe_id).first()
+            if recipe is None:
+                _index.remove(recipe_id)
+                continue
+
+            fields = [(recipe.title, TITLE_WEIGHT), (recipe.description, DESCRIPTION_WEIGHT)]
+            fields += [
+                (name, TAG_INGREDIENT_WEIGHT)
+                for name, in db.query(Tag.name).join(recipe_tags, Tag.id == recipe_tags.c.tag_id).filter(recipe_tags.c.recipe_id == recipe_id)
+            ]
+            fields += [
+                (name, TAG_INGREDIENT_WEIGHT)
+                for name, in db.query(Ingredient.name).join(RecipeIngredient).filter(RecipeIngredient.recipe_id == recipe_id)
+            ]
+            _index.add(recipe_id, fields)
+
+
+def remove_recipe(recipe_id: int) -> None:
+    """Drop a deleted recipe from the in-process index"""
+    with _lock:
+        if _index is not None:
+            _index.remove(recipe_id)
+
+
+def invalidate() -> None:
+    """Drop the in-process index so the next search rebuilds it"""
+    global _index
+
+    with _lock:
+        _index = None
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from app.models.supermarket import Supermarket
 from app.schemas.supermarket import SupermarketCreate, SupermarketUpdate
+from app.services import price_matrix
 from typing import List, Optional
 from fastapi import HTTPException, status
 
@@ -45,6 +46,7 @@ def create_supermarket(db: Session, supermarket: SupermarketCreate) -> Supermark
     )
     db.add(db_supermarket)
     db.commit()
+    price_matrix.invalidate()
     db.refresh(db_supermarket)
     return db_supermarket
 
@@ -68,6 +70,7 @@ def update_supermarket(
         setattr(db_supermarket, field, value)
     
     db.commit()
+    price_matrix.invalidate()
     db.refresh(db_supermarket)
     return db_supermarket
 
@@ -84,3 +87,4 @@ def delete_supermarket(db: Session, supermarket_id: int) -> None:
     # Soft delete
     db_supermarket.is_active = False
     db.commit()
+    price_matrix.invalidate()
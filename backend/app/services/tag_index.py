@@ -0,0 +1,167 @@
+"""In-process tag bitmap index for multi-tag recipe filtering and facet counts
+
+Every tag keeps the ids of its recipes as a bitset (a Python int with bit
+`recipe_id` set), so AND/OR filters are single big-int operations and facet
+counts are popcounts.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import primary_session
+from app.models.recipe import Recipe, Tag, recipe_tags
+
+# Rebuild from the database after this long so writes from other workers show up
+MAX_AGE_SECONDS = 300
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+
+
+def to_bitset(ids: Iterable[int]) -> int:
+    """Bitset with the bit of every id set"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for value in ids:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def from_bitset(bits: int) -> List[int]:
+    """Ids set in a bitset, ascending"""
+    ids = []
+    for position, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        while byte:
+            low = byte & -byte
+            ids.append(position * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+class TagIndex:
+    """Recipe bitsets per tag plus the bitset of public recipes"""
+    def __init__(self):
+        self.tags: Dict[str, int] = {}
+        self.public = 0
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session) -> "TagIndex":
+        """Build the bitsets from recipe_tags (two queries)"""
+        index = cls()
+        tag_recipes: Dict[str, List[int]] = {}
+        for name, recipe_id in db.query(Tag.name, recipe_tags.c.recipe_id).join(recipe_tags, Tag.id == recipe_tags.c.tag_id):
+            tag_recipes.setdefault(name, []).append(recipe_id)
+
+        index.tags = {name: to_bitset(ids) for name, ids in tag_recipes.items()}
+        index.public = to_bitset(recipe_id for recipe_id, in db.query(Recipe.id).filter(Recipe.is_public == True))
+        return index
+
+    def is_stale(self) -> bool:
+        """Whether the index is old enough to be rebuilt"""
+        return time.monotonic() - self.built_at > MAX_AGE_SECONDS
+
+    def set_recipe(self, recipe_id: int, tag_names: Iterable[str], is_public: bool) -> None:
+        """Replace a recipe's tags (no tags and not public removes it)"""
+        bit = 1 << recipe_id
+        tag_names = set(tag_names)
+
+        for name in list(self.tags):
+            if name not in tag_names and self.tags[name] & bit:
+                self.tags[name] &= ~bit
+                if not self.tags[name]:
+                    del self.tags[name]
+        for name in tag_names:
+            self.tags[name] = self.tags.get(name, 0) | bit
+
+        self.public = self.public | bit if is_public else self.public & ~bit
+
+    def match(self, tag_names: List[str], mode: str = MATCH_ALL, public_only: bool = True) -> int:
+        """Bitset of public recipes (any recipe unless public_only) with all (or any) of the tags"""
+        bitsets = [self.tags.get(name, 0) for name in tag_names]
+        if mode == MATCH_ANY:
+            bits = 0
+            for bitset in bitsets:
+                bits |= bitset
+        else:
+            bits = self.public if public_only else (bitsets[0] if bitsets else 0)
+            for bitset in bitsets:
+                bits &= bitset
+        return bits & self.public if public_only else bits
+
+    def facets(self, bits: int) -> List[Tuple[str, int]]:
+        """(tag, recipes in `bits` with it) for every tag present, most common first"""
+        counts = [(name, (bitset & bits).bit_count()) for name, bitset in self.tags.items()]
+        counts = [(name, count) for name, count in counts if count]
+        counts.sort(key=lambda facet: (-facet[1], facet[0]))
+        return counts
+
+
+_index: Optional[TagIndex] = None
+_lock = threading.Lock()
+
+
+def _get_index(db: Session) -> TagIndex:
+    """Current index, (re)built when missing or stale; call with _lock held"""
+    global _index
+
+    if _index is None or _index.is_stale():
+        with primary_session(db) as primary:
+            _index = TagIndex.load(primary)
+    return _index
+
+
+def match_recipes(db: Session, tag_names: List[str], mode: str = MATCH_ALL, public_only: bool = True) -> List[int]:
+    """
+    Ids of public recipes with all (or any) of the tags
+
+    With public_only=False private recipes match too; the caller must then
+    filter out the ones the user can't see.
+    """
+    with _lock:
+        return from_bitset(_get_index(db).match(tag_names, mode, public_only))
+
+
+def tag_facets(
+    db: Session,
+    recipe_ids: Optional[Iterable[int]] = None,
+    tag_names: Optional[List[str]] = None,
+    mode: str = MATCH_ALL
+) -> Tuple[int, List[Tuple[str, int]]]:
+    """
+    Size of a result set and its per-tag counts
+
+    The result set is the public recipes matching the tags, further limited to
+    recipe_ids when given. Returns (total, [(tag, count), ...]).
+    """
+    with _lock:
+        index = _get_index(db)
+        bits = index.match(tag_names, mode) if tag_names else index.public
+        if recipe_ids is not None:
+            bits &= to_bitset(recipe_ids)
+        return bits.bit_count(), index.facets(bits)
+
+
+def update_recipe(recipe_id: int, tag_names: Iterable[str], is_public: bool) -> None:
+    """Patch the index after a recipe was created or changed"""
+    with _lock:
+        if _index is not None:
+            _index.set_recipe(recipe_id, tag_names, is_public)
+
+
+def remove_recipe(recipe_id: int) -> None:
+    """Drop a deleted recipe from the index"""
+    update_recipe(recipe_id, (), False)
+
+
+def invalidate() -> None:
+    """Drop the index so the next request rebuilds it"""
+    global _index
+
+    with _lock:
+        _index = None
@@ -0,0 +1,102 @@
+"""In-process cache of authenticated users
+
+get_current_user runs on every authenticated request; caching an immutable
+snapshot of the user per id saves its query. Entries expire after
+TTL_SECONDS so profile changes and deactivations made through another
+worker show up quickly, and are dropped explicitly on writes here.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+# Entries older than this are reloaded from the database
+TTL_SECONDS = 30
+
+# Least recently used entries are evicted beyond this many users
+MAX_USERS = 10000
+
+
+class CurrentUser(NamedTuple):
+    """Read-only snapshot of the user fields endpoints need"""
+    id: int
+    email: str
+    full_name: Optional[str]
+    daily_calories: Optional[int]
+    daily_protein: Optional[int]
+    daily_carbs: Optional[int]
+    daily_fats: Optional[int]
+    weight_goal: Optional[Decimal]
+    google_id: Optional[str]
+    is_active: bool
+    is_verified: bool
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        """Snapshot of a loaded user"""
+        return cls(*(getattr(user, field) for field in cls._fields))
+
+
+# user_id -> (loaded at, snapshot)
+_users: "OrderedDict[int, Tuple[float, CurrentUser]]" = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def get_user(db: Session, user_id: int) -> Optional[CurrentUser]:
+    """Snapshot of a user, from the cache when fresh (None when the user doesn't exist)"""
+    global _hits, _misses
+
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is not None and time.monotonic() - entry[0] <= TTL_SECONDS:
+            _users.move_to_end(user_id)
+            _hits += 1
+            return entry[1]
+        _misses += 1
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        return None
+
+    snapshot = CurrentUser.from_user(user)
+    with _lock:
+        _users[user_id] = (time.monotonic(), snapshot)
+        _users.move_to_end(user_id)
+        while len(_users) > MAX_USERS:
+            _users.popitem(last=False)
+    return snapshot
+
+
+def stats() -> dict:
+    """Hit and miss counts since start-up, hit ratio and number of cached users"""
+    with _lock:
+        lookups = _hits + _misses
+        return {
+            'hits': _hits,
+            'misses': _misses,
+            'hit_ratio': round(_hits / lookups, 4) if lookups else 0.0,
+            'size': len(_users),
+        }
+
+
+def invalidate(user_id: Optional[int] = None) -> None:
+    """Drop a user after it changed (all users and counters when None)"""
+    global _hits, _misses
+
+    with _lock:
+        if user_id is not None:
+            _users.pop(user_id, None)
+            return
+        _users.clear()
+        _hits = _misses = 0
@@ -0,0 +1,99 @@
+"""Connection pool sizing and instrumentation"""
+
+import threading
+import time
+from typing import Tuple
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds for the derived pool size and overflow of one worker
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 20
+
+
+def pool_limits(settings) -> Tuple[int, int]:
+    """
+    (pool_size, max_overflow) for one worker process
+
+    Unless set explicitly, both are derived from the connections the
+    database accepts (DB_MAX_CONNECTIONS minus DB_RESERVED_CONNECTIONS for
+    admin tools and migrations) shared between WEB_CONCURRENCY workers, so
+    all workers at full overflow still fit.
+    """
+    budget = max(1, (settings.DB_MAX_CONNECTIONS - settings.DB_RESERVED_CONNECTIONS) // max(1, settings.WEB_CONCURRENCY))
+    pool_size = settings.DB_POOL_SIZE if settings.DB_POOL_SIZE is not None else min(DEFAULT_POOL_SIZE, budget)
+    if settings.DB_MAX_OVERFLOW is not None:
+        return pool_size, settings.DB_MAX_OVERFLOW
+    return pool_size, max(0, min(DEFAULT_MAX_OVERFLOW, budget - pool_size))
+
+
+class CheckoutStats:
+    """Counts and wait times of connection checkouts"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        """Add one checkout (or one that timed out after `wait` seconds)"""
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def snapshot(self) -> dict:
+        """Current counters, wait times in milliseconds"""
+        with self.lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_seconds * 1000 / attempts, 3) if attempts else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waits for a connection (pre-ping included)"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.checkout_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.checkout_stats.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+
+def pool_stats(engine: Engine) -> dict:
+    """Size, connections in use and checkout statistics of an engine's pool"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+
+    stats = {
+        'size': pool.size(),
+        'max_overflow': pool._max_overflow,
+        'checked_out': pool.checkedout(),
+        'overflow_in_use': max(0, pool.overflow()),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(pool.checkout_stats.snapshot())
+    return stats
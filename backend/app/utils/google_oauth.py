@@ -30,7 +30,7 @@ def get_google_auth_url() -> str:
     return auth_url
 
 
-async def get_google_user_info(auth_code: str) -> dict:
+def get_google_user_info(auth_code: str) -> dict:
     """
     Exchange authorization code for user information.
     
@@ -55,8 +55,8 @@ async def get_google_user_info(auth_code: str) -> dict:
     credentials = flow.credentials
     
     # Get user info
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
+    with httpx.Client() as client:
+        response = client.get(
             'https://www.googleapis.com/oauth2/v1/userinfo',
             headers={'Authorization': f'Bearer {credentials.token}'}
         )
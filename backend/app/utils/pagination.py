@@ -0,0 +1,64 @@
+"""Keyset (cursor) pagination helpers"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.orm import Session
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque cursor for the sort key of the last row of a page"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> Tuple:
+    """Sort key values from a cursor, converted to `types`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("wrong number of values")
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        )
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def after(db: Session, columns: Sequence, values: Sequence, descending: bool = False):
+    """
+    Filter for rows sorting after `values` on `columns`
+
+    Expanded to (a > x) OR (a = x AND b > y) ... so every database can use the
+    composite index on the columns.
+    """
+    values = [_bind_value(db, value) for value in values]
+    clauses = []
+    for position, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(position)]
+        beyond = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def _bind_value(db: Session, value: Any) -> Any:
+    """Compare timestamps the way the database stores them"""
+    if isinstance(value, datetime) and db.get_bind().dialect.name == "sqlite":
+        # SQLite keeps server-side timestamps as text without fractional seconds
+        text = value.strftime("%Y-%m-%d %H:%M:%S")
+        if value.microsecond:
+            text += value.strftime(".%f")
+        return literal(text, String)
+    return value
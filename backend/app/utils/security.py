@@ -1,9 +1,21 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# Dedicated threads for bcrypt (it releases the GIL). Callers await the result on
+# the event loop, so queued hashes hold neither the loop nor a request thread
+_password_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+
+# Hashes running or queued; once all are taken new ones are refused
+_password_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE)
 
 
 def hash_password(password: str) -> str:
@@ -16,6 +28,40 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """Hash password on the password pool (429 when the pool is saturated)."""
+    return await _run_on_password_pool(pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify password against hash on the password pool (429 when the pool is saturated).
+    
+    Returns (valid, new_hash); new_hash is set when the password is valid but
+    its hash uses another cost factor than BCRYPT_ROUNDS and should be replaced.
+    """
+    return await _run_on_password_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def _run_on_password_pool(function: Callable, *args):
+    """Run a password function on the pool, awaiting it without holding a request thread"""
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many sign-ins in progress, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    
+    try:
+        future = _password_pool.submit(function, *args)
+    except BaseException:
+        _password_slots.release()
+        raise
+    # Released when the hash is done, even if the request was cancelled meanwhile
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(future)
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """
     Create JWT access token.
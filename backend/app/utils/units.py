@@ -0,0 +1,165 @@
+"""Unit conversion for recipe amounts and ingredient prices"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.supermarket import UnitType
+
+# Canonical units amounts are aggregated in, one per dimension
+GRAM = 'g'
+MILLILITER = 'ml'
+UNIT = 'unit'
+
+# Recipe unit -> (canonical unit, canonical amount per recipe unit)
+CONVERSIONS: Dict[str, Tuple[str, float]] = {
+    # Mass
+    'g': (GRAM, 1.0),
+    'gr': (GRAM, 1.0),
+    'gram': (GRAM, 1.0),
+    'grams': (GRAM, 1.0),
+    'mg': (GRAM, 0.001),
+    'kg': (GRAM, 1000.0),
+    'kilogram': (GRAM, 1000.0),
+    'kilograms': (GRAM, 1000.0),
+    'oz': (GRAM, 28.349523125),
+    'lb': (GRAM, 453.59237),
+    # Volume
+    'ml': (MILLILITER, 1.0),
+    'cl': (MILLILITER, 10.0),
+    'dl': (MILLILITER, 100.0),
+    'l': (MILLILITER, 1000.0),
+    'liter': (MILLILITER, 1000.0),
+    'liters': (MILLILITER, 1000.0),
+    'litre': (MILLILITER, 1000.0),
+    'litres': (MILLILITER, 1000.0),
+    'tsp': (MILLILITER, 5.0),
+    'teaspoon': (MILLILITER, 5.0),
+    'teaspoons': (MILLILITER, 5.0),
+    'tbsp': (MILLILITER, 15.0),
+    'tablespoon': (MILLILITER, 15.0),
+    'tablespoons': (MILLILITER, 15.0),
+    'cup': (MILLILITER, 240.0),
+    'cups': (MILLILITER, 240.0),
+    # Count
+    'unit': (UNIT, 1.0),
+    'units': (UNIT, 1.0),
+    'u': (UNIT, 1.0),
+    'ud': (UNIT, 1.0),
+    'uds': (UNIT, 1.0),
+    'piece': (UNIT, 1.0),
+    'pieces': (UNIT, 1.0),
+    'pc': (UNIT, 1.0),
+    'pcs': (UNIT, 1.0),
+}
+
+# Price unit -> (canonical unit, canonical amount per price unit)
+PRICE_UNITS: Dict[UnitType, Tuple[str, float]] = {
+    UnitType.KG: (GRAM, 1000.0),
+    UnitType.LITER: (MILLILITER, 1000.0),
+    UnitType.UNIT: (UNIT, 1.0),
+}
+
+# Column order of price_quantities(); price matrices store these codes
+PRICE_UNITS_BY_CODE: List[UnitType] = list(PRICE_UNITS)
+PRICE_UNIT_CODES: Dict[UnitType, int] = {unit: code for code, unit in enumerate(PRICE_UNITS_BY_CODE)}
+
+
+def normalize(amount: float, unit: str) -> Tuple[float, str]:
+    """
+    Convert an amount to its canonical unit (g, ml or unit)
+
+    Units missing from the conversion table are returned unchanged.
+    """
+    conversion = CONVERSIONS.get(unit.strip().lower())
+    if conversion is None:
+        return amount, unit
+    canonical_unit, factor = conversion
+    return amount * factor, canonical_unit
+
+
+def convert(
+    amount: float,
+    from_unit: str,
+    to_unit: str,
+    density_g_per_ml: Optional[float] = None,
+    unit_weight_g: Optional[float] = None
+) -> Optional[float]:
+    """
+    Convert an amount between units, crossing dimensions through the ingredient's
+    density and unit weight
+
+    Returns None when the conversion needs a value the ingredient doesn't have or
+    either unit is unknown.
+    """
+    amount, from_unit = normalize(amount, from_unit)
+    per_unit, to_unit = normalize(1.0, to_unit)
+    if from_unit == to_unit:
+        return amount / per_unit
+
+    grams = _grams_per(density_g_per_ml, unit_weight_g)
+    if grams.get(from_unit) is None or grams.get(to_unit) is None:
+        return None
+    return amount * grams[from_unit] / grams[to_unit] / per_unit
+
+
+def convert_price(
+    price: float,
+    from_unit: str,
+    to_unit: str,
+    density_g_per_ml: Optional[float] = None,
+    unit_weight_g: Optional[float] = None
+) -> Optional[float]:
+    """
+    Price per to_unit of a price quoted per from_unit
+
+    Returns None when the units can't be converted for the ingredient.
+    """
+    quantity = convert(1.0, to_unit, from_unit, density_g_per_ml, unit_weight_g)
+    if quantity is None:
+        return None
+    return price * quantity
+
+
+def price_quantities(
+    amounts: Sequence[float],
+    units: Sequence[str],
+    densities_g_per_ml: Sequence[Optional[float]],
+    unit_weights_g: Sequence[Optional[float]]
+) -> np.ndarray:
+    """
+    Quantity of each amount in every price unit
+
+    Returns an (items x PRICE_UNITS) array, NaN where the conversion is not possible.
+    """
+    normalized = [normalize(amount, unit) for amount, unit in zip(amounts, units)]
+    canonical_amounts = np.array([amount for amount, _ in normalized], dtype=float)
+    canonical_units = np.array([unit for _, unit in normalized], dtype=object)
+    densities = np.array(densities_g_per_ml, dtype=float)
+    unit_weights = np.array(unit_weights_g, dtype=float)
+
+    is_mass = canonical_units == GRAM
+    is_volume = canonical_units == MILLILITER
+    is_count = canonical_units == UNIT
+
+    # Pivot through grams when the dimension has to change
+    grams = np.select(
+        [is_mass, is_volume, is_count],
+        [canonical_amounts, canonical_amounts * densities, canonical_amounts * unit_weights],
+        np.nan
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        milliliters = np.where(is_volume, canonical_amounts, grams / densities)
+        counts = np.where(is_count, canonical_amounts, grams / unit_weights)
+
+    canonical = {GRAM: grams, MILLILITER: milliliters, UNIT: counts}
+    quantities = np.column_stack([
+        canonical[canonical_unit] / factor for canonical_unit, factor in PRICE_UNITS.values()
+    ])
+    quantities[~np.isfinite(quantities)] = np.nan
+    return quantities
+
+
+def _grams_per(density_g_per_ml: Optional[float], unit_weight_g: Optional[float]) -> Dict[str, Optional[float]]:
+    """Grams in one canonical unit of each dimension for an ingredient"""
+    return {GRAM: 1.0, MILLILITER: density_g_per_ml or None, UNIT: unit_weight_g or None}
@@ -0,0 +1,10 @@
+"""Query-count, latency and memory benchmarks for the API hot paths
+
+Seeds synthetic data at a chosen scale, drives the endpoints through
+TestClient and compares the results against a stored baseline.
+
+Usage:
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale medium --output results.json
+    python -m benchmarks.run --update-baseline
+"""
@@ -0,0 +1,102 @@
+"""Concurrency load test: throughput and responsiveness under parallel requests
+
+Fires `requests` calls at an endpoint with 1, 4, 16... in flight at a time
+(in-process through the ASGI interface), while a probe keeps calling the
+health check. Sync handlers run on the threadpool, so throughput should
+grow with concurrency and the probe should stay fast; a handler blocking
+the event loop shows up as flat throughput and probe latency as slow as
+the endpoint itself.
+
+Usage:
+    python -m benchmarks.load --scale small
+    python -m benchmarks.load --endpoint recipes --concurrency 1 8 32
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.main import app
+from benchmarks.run import DEFAULT_DATABASE_URL, auth_headers, endpoints, seeded_database, use_database
+from benchmarks.seed import SCALES
+
+HEALTH_URL = "/api/auth/health"
+
+# Pause between probe requests
+PROBE_INTERVAL_SECONDS = 0.01
+
+
+async def measure_concurrency(url: str, headers: Dict[str, str], concurrency: int, requests: int) -> dict:
+    """Throughput and latency of `requests` calls to url with `concurrency` in flight"""
+    latencies: List[float] = []
+    probe_latencies: List[float] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        async def call():
+            async with slots:
+                started = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} returned {response.status_code}: {response.text}")
+
+        async def probe(done: asyncio.Event):
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get(HEALTH_URL)
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+
+        await client.get(url, headers=headers)  # Warm the caches
+        done = asyncio.Event()
+        probing = asyncio.create_task(probe(done))
+        started = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probing
+
+    return {
+        'concurrency': concurrency,
+        'requests_per_second': round(requests / elapsed, 1),
+        'median_ms': round(statistics.median(latencies), 3),
+        'probe_max_ms': round(max(probe_latencies), 3) if probe_latencies else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Load test the API under concurrent requests")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--endpoint", default="shopping_list_optimized", help="Benchmark name from benchmarks.run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL, help="Scratch database (all tables are dropped)")
+    args = parser.parse_args(argv)
+
+    with seeded_database(args.database_url, args.scale) as (engine, data):
+        url = endpoints(data)[args.endpoint]
+        headers = auth_headers(data)
+        with use_database(engine):
+            results = [
+                asyncio.run(measure_concurrency(url, headers, concurrency, args.requests))
+                for concurrency in args.concurrency
+            ]
+
+    print(f"   {args.endpoint}: {url}")
+    for result in results:
+        print(
+            f"   {result['concurrency']:>3} in flight  {result['requests_per_second']:>8.1f} req/s  "
+            f"median {result['median_ms']:>8.1f} ms  health probe max {result['probe_max_ms']:>8.1f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""Benchmark runner: SQL statements, wall time and peak memory per endpoint
+
+Every endpoint is called once cold (in-process caches empty), then `repeat`
+times warm for timing, then once more under tracemalloc for peak memory.
+The solvers are measured the same way on fixed random instances.
+Results are written as JSON and compared against a baseline; the exit code
+is 1 when any metric regressed beyond its threshold.
+
+Wall times depend on the machine: refresh the baseline with
+--update-baseline when moving the benchmarks to different hardware.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, get_db, get_read_db
+from app.main import app
+from app.services import (
+    autocomplete_service,
+    basket_solver,
+    discovery_service,
+    nutrition_service,
+    optimization_service,
+    plan_solver,
+    price_matrix,
+    search_service,
+    tag_index,
+    user_cache
+)
+from app.utils.security import create_access_token
+from benchmarks.seed import SCALES, SeededData, seed
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+# Regression thresholds: allowed growth over the baseline
+QUERY_TOLERANCE = 0  # Extra SQL statements per request
+TIME_TOLERANCE = 1.5  # Ratio of median wall time
+MEMORY_TOLERANCE = 1.5  # Ratio of peak traced memory
+
+# Ignore timing and memory differences below these (noise on fast endpoints)
+TIME_SLACK_MS = 5.0
+MEMORY_SLACK_KIB = 256
+
+
+def endpoints(data: SeededData) -> Dict[str, str]:
+    """URL requested by each benchmark"""
+    week = f"start_date={data.start_date.isoformat()}&end_date={data.end_date.isoformat()}"
+    return {
+        'planner': f"/api/planner/?{week}",
+        'shopping_list_optimized': f"/api/planner/shopping-list/optimized?{week}",
+        'recipes': "/api/recipes/?limit=20",
+        'recipes_filtered': "/api/recipes/?tags=quick,vegan&mode=any&min_protein=10&sort=protein_density&limit=20",
+        'ingredient_prices': f"/api/prices/ingredient/{data.ingredient_id}",
+        'ingredient_autocomplete': "/api/recipes/ingredients/autocomplete?q=ingredient+001",
+    }
+
+
+def solvers() -> Dict[str, Callable[[], np.ndarray]]:
+    """Solver call measured by each benchmark, on instances seeded for repeatability"""
+    rng = np.random.default_rng(7)
+    basket_costs = rng.uniform(1, 10, size=(100, 20))
+    basket_costs[rng.random(basket_costs.shape) < 0.2] = np.inf
+    exact_stores = basket_solver.EXACT_STORE_LIMIT
+
+    # A week of 4 slots over 2000 recipes
+    rng = np.random.default_rng(3)
+    macros = np.column_stack([
+        rng.uniform(150, 900, 2000),
+        rng.uniform(5, 60, 2000),
+        rng.uniform(10, 120, 2000),
+        rng.uniform(2, 40, 2000),
+    ])
+    targets = np.array([2000, 150, 200, 70], dtype=float)
+    allowed = rng.random((4, 2000)) < 0.5
+
+    return {
+        'basket_solver_exact': lambda: basket_solver.solve_basket(basket_costs[:, :exact_stores], store_penalty=2.0),
+        'basket_solver_search': lambda: basket_solver.solve_basket(basket_costs, store_penalty=2.0),
+        'plan_solver': lambda: plan_solver.solve_plan(macros, targets, np.ones(4), allowed, np.zeros((7, 4)), seed=3),
+    }
+
+
+def invalidate_caches() -> None:
+    """Empty every in-process cache so the next request runs cold"""
+    price_matrix.invalidate()
+    nutrition_service.invalidate()
+    search_service.invalidate()
+    autocomplete_service.invalidate()
+    discovery_service.invalidate()
+    tag_index.invalidate()
+    optimization_service.invalidate_recipe_costs()
+    user_cache.invalidate()
+
+
+@contextmanager
+def seeded_database(database_url: str, scale: str) -> Iterator[Tuple[Engine, SeededData]]:
+    """Fresh tables seeded at a scale, dropped again on exit"""
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    try:
+        print(f"🔄 Seeding '{scale}' benchmark data...")
+        db = sessionmaker(bind=engine)()
+        try:
+            data = seed(db, SCALES[scale])
+        finally:
+            db.close()
+        print("   " + ", ".join(f"{count} {table}" for table, count in data.counts.items()))
+        yield engine, data
+    finally:
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+@contextmanager
+def use_database(engine: Engine) -> Iterator[List[str]]:
+    """Route the app's sessions to an engine; yields the list its SQL statements are appended to"""
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_read_db, None)
+
+
+def auth_headers(data: SeededData) -> Dict[str, str]:
+    """Bearer token of the benchmarked user"""
+    token = create_access_token(data={"sub": str(data.user_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def run_benchmarks(engine: Engine, data: SeededData, repeat: int = 20) -> Dict[str, dict]:
+    """Measure every endpoint against a seeded database, then every solver; returns results by name"""
+    headers = auth_headers(data)
+    with use_database(engine) as statements:
+        client = TestClient(app)
+        invalidate_caches()
+        results = {}
+        for name, url in endpoints(data).items():
+            results[name] = _measure(lambda: _get(client, url, headers), statements, repeat)
+        for name, solve in solvers().items():
+            results[name] = _measure(solve, statements, repeat)
+        return results
+
+
+def _get(client: TestClient, url: str, headers: Dict[str, str]):
+    """GET a benchmarked URL, failing on any error response"""
+    response = client.get(url, headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} returned {response.status_code}: {response.text}")
+    return response
+
+
+def _measure(call: Callable, statements: List[str], repeat: int) -> dict:
+    """Cold query count, warm query count and timings, and peak memory of one call"""
+    statements.clear()
+    call()
+    cold_queries = len(statements)
+
+    timings = []
+    for _ in range(repeat):
+        statements.clear()
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    queries = len(statements)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'queries': queries,
+        'cold_queries': cold_queries,
+        'median_ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    query_tolerance: int = QUERY_TOLERANCE,
+    time_tolerance: float = TIME_TOLERANCE,
+    memory_tolerance: float = MEMORY_TOLERANCE
+) -> List[str]:
+    """Regressions of results against a baseline, one message each (endpoints missing from either are skipped)"""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        for key in ('queries', 'cold_queries'):
+            if result[key] > expected[key] + query_tolerance:
+                regressions.append(f"{name}: {key} {result[key]} > baseline {expected[key]}")
+
+        time_limit = max(expected['median_ms'] * time_tolerance, expected['median_ms'] + TIME_SLACK_MS)
+        if result['median_ms'] > time_limit:
+            regressions.append(f"{name}: median {result['median_ms']:.1f} ms > limit {time_limit:.1f} ms")
+
+        memory_limit = max(expected['peak_memory_kib'] * memory_tolerance, expected['peak_memory_kib'] + MEMORY_SLACK_KIB)
+        if result['peak_memory_kib'] > memory_limit:
+            regressions.append(f"{name}: peak memory {result['peak_memory_kib']:.0f} KiB > limit {memory_limit:.0f} KiB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the API hot paths")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed requests per endpoint")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL, help="Scratch database (all tables are dropped)")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the baseline for this scale")
+    parser.add_argument("--query-tolerance", type=int, default=QUERY_TOLERANCE)
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    with seeded_database(args.database_url, args.scale) as (engine, data):
+        results = run_benchmarks(engine, data, args.repeat)
+
+    for name, result in results.items():
+        print(
+            f"   {name:<26} {result['queries']:>3} queries ({result['cold_queries']} cold)  "
+            f"{result['median_ms']:>8.1f} ms  {result['peak_memory_kib']:>8.0f} KiB"
+        )
+
+    report = {
+        'scale': args.scale,
+        'rows': data.counts,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'results': results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        baselines[args.scale] = report
+        args.baseline.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"✅ Baseline for '{args.scale}' written to {args.baseline}")
+        return 0
+
+    if args.scale not in baselines:
+        print(f"⚠️  No '{args.scale}' baseline in {args.baseline}, nothing to compare")
+        return 0
+
+    regressions = compare(
+        results, baselines[args.scale]['results'], args.query_tolerance, args.time_tolerance, args.memory_tolerance
+    )
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if regressions:
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""Synthetic data for the benchmarks, inserted in bulk through the existing models"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.ingredient_exclusion import IngredientExclusion
+from app.models.ingredient_price import IngredientPrice
+from app.models.meal_plan import MealPlanItem
+from app.models.recipe import Ingredient, Recipe, RecipeIngredient, Tag, recipe_tags
+from app.models.supermarket import Supermarket, UnitType
+from app.models.user import User
+from app.services import nutrition_service, price_service
+from app.utils.security import hash_password
+
+# Row counts per scale
+SCALES: Dict[str, Dict[str, int]] = {
+    'tiny': {
+        'users': 3, 'ingredients': 40, 'recipes': 30, 'supermarkets': 6,
+        'ingredients_per_recipe': 5, 'prices_per_pair': 2, 'plan_days': 7, 'exclusions': 4
+    },
+    'small': {
+        'users': 20, 'ingredients': 300, 'recipes': 500, 'supermarkets': 6,
+        'ingredients_per_recipe': 8, 'prices_per_pair': 3, 'plan_days': 7, 'exclusions': 20
+    },
+    'medium': {
+        'users': 100, 'ingredients': 1500, 'recipes': 5000, 'supermarkets': 8,
+        'ingredients_per_recipe': 10, 'prices_per_pair': 5, 'plan_days': 14, 'exclusions': 50
+    },
+    'large': {
+        'users': 500, 'ingredients': 5000, 'recipes': 25000, 'supermarkets': 10,
+        'ingredients_per_recipe': 12, 'prices_per_pair': 8, 'plan_days': 28, 'exclusions': 100
+    },
+}
+
+SUPERMARKET_NAMES = ["Mercadona", "Carrefour", "Supeco", "Día", "Lidl", "Aldi", "Alcampo", "Eroski", "Consum", "BM"]
+
+TAG_NAMES = ["high-protein", "vegan", "vegetarian", "quick", "breakfast", "lunch", "dinner", "snack", "low-carb", "budget"]
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner"]
+
+# Every seeded user logs in with this password
+PASSWORD = "benchmark-password"
+
+
+class SeededData:
+    """Ids the benchmarks request, plus the row counts written"""
+    def __init__(self, user_id: int, ingredient_id: int, start_date: date, end_date: date, counts: Dict[str, int]):
+        self.user_id = user_id
+        self.ingredient_id = ingredient_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.counts = counts
+
+
+def seed(db: Session, scale: Dict[str, int], random_seed: int = 0) -> SeededData:
+    """
+    Insert a synthetic catalogue, community prices and meal plans
+
+    Every user plans three meals a day for `plan_days` days from today; the
+    first user also excludes some ingredients from some supermarkets. The
+    tables are expected to be empty.
+    """
+    rng = random.Random(random_seed)
+    password_hash = hash_password(PASSWORD)
+
+    user_ids = _insert(db, User, [
+        {
+            'email': f"user{number}@benchmark.local",
+            'password_hash': password_hash,
+            'full_name': f"Benchmark User {number}",
+            'is_verified': True
+        }
+        for number in range(scale['users'])
+    ])
+    supermarket_ids = _insert(db, Supermarket, [
+        {'name': name, 'is_active': True}
+        for name in _names(SUPERMARKET_NAMES, scale['supermarkets'])
+    ])
+    ingredient_ids = _insert(db, Ingredient, [
+        {
+            'name': f"Ingredient {number:05d}",
+            'calories_per_100g': rng.uniform(10, 600),
+            'protein_per_100g': rng.uniform(0, 30),
+            'carbs_per_100g': rng.uniform(0, 80),
+            'fats_per_100g': rng.uniform(0, 40),
+            'is_public': True
+        }
+        for number in range(scale['ingredients'])
+    ])
+    tag_ids = _insert(db, Tag, [{'name': name} for name in TAG_NAMES])
+    recipe_ids = _insert(db, Recipe, [
+        {
+            'title': f"Recipe {number:05d}",
+            'description': "Synthetic benchmark recipe",
+            'instructions': "1. Prepare\n2. Cook\n3. Serve",
+            'prep_time_minutes': rng.randint(5, 30),
+            'cook_time_minutes': rng.randint(0, 60),
+            'servings': rng.randint(1, 4),
+            'author_id': rng.choice(user_ids),
+            'is_public': True
+        }
+        for number in range(scale['recipes'])
+    ])
+
+    recipe_ingredient_rows = []
+    for recipe_id in recipe_ids:
+        for ingredient_id in rng.sample(ingredient_ids, min(scale['ingredients_per_recipe'], len(ingredient_ids))):
+            recipe_ingredient_rows.append(
+                {'recipe_id': recipe_id, 'ingredient_id': ingredient_id, 'amount': rng.randint(10, 300), 'unit': 'g'}
+            )
+    _insert(db, RecipeIngredient, recipe_ingredient_rows)
+    db.execute(insert(recipe_tags), [
+        {'recipe_id': recipe_id, 'tag_id': tag_id}
+        for recipe_id in recipe_ids
+        for tag_id in rng.sample(tag_ids, 2)
+    ])
+
+    price_rows = []
+    for ingredient_id in ingredient_ids:
+        for supermarket_id in supermarket_ids:
+            for user_id in rng.sample(user_ids, min(scale['prices_per_pair'], len(user_ids))):
+                price_rows.append({
+                    'ingredient_id': ingredient_id,
+                    'supermarket_id': supermarket_id,
+                    'user_id': user_id,
+                    'price_per_unit': Decimal(f"{rng.uniform(0.5, 20):.2f}"),
+                    'unit': UnitType.KG
+                })
+    _insert(db, IngredientPrice, price_rows)
+
+    start_date = date.today()
+    meal_rows = [
+        {
+            'user_id': user_id,
+            'recipe_id': rng.choice(recipe_ids),
+            'date': start_date + timedelta(days=day),
+            'meal_type': meal_type,
+            'servings': rng.randint(1, 3)
+        }
+        for user_id in user_ids
+        for day in range(scale['plan_days'])
+        for meal_type in MEAL_TYPES
+    ]
+    _insert(db, MealPlanItem, meal_rows)
+
+    pairs = [(ingredient_id, supermarket_id) for ingredient_id in ingredient_ids for supermarket_id in supermarket_ids]
+    _insert(db, IngredientExclusion, [
+        {'user_id': user_ids[0], 'ingredient_id': ingredient_id, 'supermarket_id': supermarket_id}
+        for ingredient_id, supermarket_id in rng.sample(pairs, min(scale['exclusions'], len(pairs)))
+    ])
+
+    nutrition_service.refresh_recipe_totals(db)
+    db.commit()
+    price_service.rebuild_price_aggregates(db)
+
+    counts = {
+        'users': len(user_ids),
+        'supermarkets': len(supermarket_ids),
+        'ingredients': len(ingredient_ids),
+        'recipes': len(recipe_ids),
+        'recipe_ingredients': len(recipe_ingredient_rows),
+        'prices': len(price_rows),
+        'meal_plan_items': len(meal_rows),
+    }
+    return SeededData(
+        user_ids[0], ingredient_ids[0], start_date, start_date + timedelta(days=scale['plan_days'] - 1), counts
+    )
+
+
+def _insert(db: Session, model, rows: List[dict]) -> List[int]:
+    """Bulk insert rows, returning their ids in insertion order"""
+    if not rows:
+        return []
+    return sorted(db.scalars(insert(model).returning(model.id), rows))
+
+
+def _names(names: List[str], count: int) -> List[str]:
+    """The first `count` names, numbered once the list runs out"""
+    return [names[number] if number < len(names) else f"{names[number % len(names)]} {number // len(names) + 1}" for number in range(count)]
@@ -1,10 +1,29 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+
+# Cheapest bcrypt cost factor: every test user hashes and verifies a password
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
 from app.models.user import User
+from app.services import (
+    autocomplete_service,
+    discovery_service,
+    load_profiles,
+    nutrition_service,
+    optimization_service,
+    price_matrix,
+    search_service,
+    tag_index,
+    user_cache
+)
+
+# Any lazy load in a response builder is an N+1 query: fail instead
+load_profiles.RAISE_ON_LAZY_LOAD = True
 
 # Test database (SQLite in-memory)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -16,6 +35,14 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def db():
     """Create test database."""
     Base.metadata.create_all(bind=engine)
+    price_matrix.invalidate()
+    nutrition_service.invalidate()
+    search_service.invalidate()
+    autocomplete_service.invalidate()
+    discovery_service.invalidate()
+    tag_index.invalidate()
+    optimization_service.invalidate_recipe_costs()
+    user_cache.invalidate()
     db = TestingSessionLocal()
     try:
         yield db
@@ -34,6 +61,7 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -130,3 +158,28 @@ def test_meal_plan_item(client, auth_headers, test_recipe):
     )
     return response.json()
 
+
+
+@pytest.fixture
+def test_supermarkets(db):
+    """Create active test supermarkets."""
+    from app.models.supermarket import Supermarket
+    supermarkets = [Supermarket(name=name, is_active=True) for name in ("Mercadona", "Lidl", "Aldi")]
+    db.add_all(supermarkets)
+    db.commit()
+    for supermarket in supermarkets:
+        db.refresh(supermarket)
+    return supermarkets
+
+
+@pytest.fixture
+def query_counter():
+    """Count SQL statements executed against the test engine."""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -1,5 +1,6 @@
 import pytest
 from fastapi import status
+from app.config import settings
 
 
 def test_register_success(client):
@@ -80,6 +81,41 @@ def test_login_nonexistent_user(client):
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+def test_login_rehashes_password_with_new_cost_factor(client, db, test_user):
+    """Test that logging in upgrades a hash made with another bcrypt cost factor."""
+    from app.utils.security import pwd_context
+    rounds = pwd_context.to_dict()["bcrypt__rounds"]
+    test_user.password_hash = pwd_context.copy(bcrypt__rounds=rounds + 1).hash("testpassword123")
+    db.commit()
+    
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword123"}
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    db.refresh(test_user)
+    assert pwd_context.identify(test_user.password_hash) == "bcrypt"
+    assert not pwd_context.needs_update(test_user.password_hash)
+    assert pwd_context.verify("testpassword123", test_user.password_hash)
+
+
+def test_login_rejected_when_password_pool_saturated(client, test_user, monkeypatch):
+    """Test that sign-ins get 429 instead of queueing when the password pool is full."""
+    import threading
+    from app.utils import security
+    monkeypatch.setattr(security, "_password_slots", threading.BoundedSemaphore(1))
+    security._password_slots.acquire()
+    
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword123"}
+    )
+    
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "1"
+
+
 def test_get_me_authenticated(client, auth_headers, test_user):
     """Test getting current user data."""
     response = client.get("/api/auth/me", headers=auth_headers)
@@ -116,6 +152,49 @@ def test_update_user_profile(client, auth_headers):
     assert data["daily_protein"] == 180
 
 
+def test_current_user_is_cached(client, auth_headers, query_counter, monkeypatch):
+    """Test that repeated requests resolve the user without querying it."""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "metrics-secret")
+    client.get("/api/auth/me", headers=auth_headers)
+    
+    query_counter.clear()
+    response = client.get("/api/auth/me", headers=auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert query_counter == []
+    
+    metrics = client.get("/api/metrics", headers={"X-Metrics-Token": "metrics-secret"}).json()["user_cache"]
+    assert metrics["hits"] >= 1
+    assert 0 < metrics["hit_ratio"] <= 1
+
+
+def test_update_user_profile_refreshes_cached_user(client, auth_headers):
+    """Test that profile changes show up right away despite the user cache."""
+    client.get("/api/auth/me", headers=auth_headers)
+    client.put("/api/auth/me", headers=auth_headers, json={"full_name": "Renamed"})
+    
+    response = client.get("/api/auth/me", headers=auth_headers)
+    
+    assert response.json()["full_name"] == "Renamed"
+
+
+def test_deactivate_user(client, auth_headers):
+    """Test that a deactivated account's token stops working immediately."""
+    client.get("/api/auth/me", headers=auth_headers)
+    
+    response = client.delete("/api/auth/me", headers=auth_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    
+    response = client.get("/api/auth/me", headers=auth_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "testpassword123"}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
 def test_health_check(client):
     """Test health check endpoint."""
     response = client.get("/api/auth/health")
@@ -0,0 +1,33 @@
+from benchmarks.run import compare, endpoints, run_benchmarks
+from benchmarks.seed import SCALES, seed
+
+
+def test_benchmarks_measure_every_endpoint(db):
+    """Test that the benchmark harness runs against a seeded tiny catalogue."""
+    data = seed(db, SCALES['tiny'])
+    
+    results = run_benchmarks(db.get_bind(), data, repeat=1)
+    
+    assert set(results) == {
+        'planner', 'shopping_list_optimized', 'recipes', 'recipes_filtered', 'ingredient_prices', 'ingredient_autocomplete',
+        'basket_solver_exact', 'basket_solver_search', 'plan_solver'
+    }
+    for name, result in results.items():
+        assert (result['cold_queries'] > 0) == (name in endpoints(data))
+        assert result['cold_queries'] >= result['queries']
+        assert result['peak_memory_kib'] > 0
+
+
+def test_benchmark_compare_flags_regressions():
+    """Test that comparison tolerates noise but flags extra queries and slowdowns."""
+    baseline = {'planner': {'queries': 2, 'cold_queries': 3, 'median_ms': 40.0, 'peak_memory_kib': 1000.0}}
+    
+    noisy = {'planner': {'queries': 2, 'cold_queries': 3, 'median_ms': 44.0, 'peak_memory_kib': 1100.0}}
+    assert compare(noisy, baseline) == []
+    
+    slower = {'planner': {'queries': 3, 'cold_queries': 3, 'median_ms': 90.0, 'peak_memory_kib': 1000.0}}
+    regressions = compare(slower, baseline)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("planner: queries 3")
+    
+    assert compare({'new_endpoint': noisy['planner']}, baseline) == []
@@ -0,0 +1,197 @@
+from collections import OrderedDict
+import pytest
+from sqlalchemy import create_engine, exc
+from app.config import Settings, settings
+from app.models.recipe import Ingredient
+from app.utils.db_pool import InstrumentedQueuePool, pool_limits, pool_stats
+
+
+def make_settings(**overrides):
+    """Settings with the required fields filled in."""
+    values = dict(
+        DATABASE_URL="sqlite:///./test.db",
+        SECRET_KEY="x",
+        GOOGLE_CLIENT_ID="x",
+        GOOGLE_CLIENT_SECRET="x",
+        GOOGLE_REDIRECT_URI="x"
+    )
+    values.update(overrides)
+    return Settings(_env_file=None, **values)
+
+
+def test_pool_limits_share_connections_between_workers():
+    """Test that derived pools of all workers fit in the database's connections."""
+    assert pool_limits(make_settings(DB_MAX_CONNECTIONS=100, DB_RESERVED_CONNECTIONS=10, WEB_CONCURRENCY=1)) == (10, 20)
+    
+    size, overflow = pool_limits(make_settings(DB_MAX_CONNECTIONS=100, DB_RESERVED_CONNECTIONS=10, WEB_CONCURRENCY=8))
+    assert (size, overflow) == (10, 1)
+    assert 8 * (size + overflow) <= 90
+    
+    assert pool_limits(make_settings(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=0, WEB_CONCURRENCY=8)) == (3, 0)
+
+
+def test_pool_stats_record_checkouts_and_timeouts():
+    """Test that checkouts, overflow and timeouts show up in the pool statistics."""
+    engine = create_engine(
+        "sqlite:///./test.db",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05
+    )
+    try:
+        connection = engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        
+        stats = pool_stats(engine)
+        assert stats["size"] == 1
+        assert stats["checked_out"] == 1
+        assert stats["checkouts"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["max_wait_ms"] >= 50
+        connection.close()
+        assert pool_stats(engine)["checked_out"] == 0
+    finally:
+        engine.dispose()
+
+
+def test_metrics_report_database_pool(client, monkeypatch):
+    """Test that the metrics endpoint exposes the application pool."""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "metrics-secret")
+    response = client.get("/api/metrics", headers={"X-Metrics-Token": "metrics-secret"})
+    
+    assert response.status_code == 200
+    assert {"size", "checked_out", "overflow_in_use", "avg_wait_ms", "timeouts"} <= set(response.json()["database_pool"])
+
+
+
+def test_metrics_require_token(client, monkeypatch):
+    """Test that the metrics endpoint is hidden without a token and rejects wrong ones."""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert client.get("/api/metrics").status_code == 404
+    
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "metrics-secret")
+    assert client.get("/api/metrics").status_code == 403
+    assert client.get("/api/metrics", headers={"X-Metrics-Token": "wrong"}).status_code == 403
+    assert client.get("/api/metrics", headers={"X-Metrics-Token": "metrics-secret"}).status_code == 200
+
+
+@pytest.fixture
+def replica(db, monkeypatch, tmp_path):
+    """Second database file standing in for a read replica, routed to by get_read_db."""
+    from sqlalchemy.orm import sessionmaker
+    from app import database
+    from app.database import Base
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=replica_engine)
+    monkeypatch.setattr(database, "replica_engine", replica_engine)
+    monkeypatch.setattr(
+        database, "ReadSessionLocal",
+        sessionmaker(autocommit=False, autoflush=False, bind=replica_engine, info={'replica': True})
+    )
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind()))
+    yield replica_engine
+    Base.metadata.drop_all(bind=replica_engine)
+    replica_engine.dispose()
+
+
+def test_reads_follow_only_the_writing_clients_writes(client, db, auth_headers, replica, monkeypatch):
+    """Test that a write sends its author's reads to the primary, not other users' reads."""
+    from app import database
+    from app.database import get_read_db
+    from app.main import app
+    from app.models.user import User
+    from app.utils.security import create_access_token
+    
+    monkeypatch.setattr(database, "_last_writes", OrderedDict())
+    app.dependency_overrides.pop(get_read_db, None)
+    other_user = User(email="other@example.com", password_hash="x", full_name="Other User")
+    db.add(other_user)
+    db.commit()
+    other_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(other_user.id)})}"}
+    
+    # Nothing written yet: everyone reads the (empty) replica
+    assert client.get("/api/recipes/ingredients", headers=auth_headers).json() == []
+    
+    response = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Brown Rice", "calories_per_100g": 111, "protein_per_100g": 2.6, "carbs_per_100g": 23, "fats_per_100g": 0.9}
+    )
+    last_write = response.headers[database.LAST_WRITE_HEADER]
+    
+    # The writer reads the primary, another user still reads the replica
+    assert [ingredient["name"] for ingredient in client.get("/api/recipes/ingredients", headers=auth_headers).json()] == ["Brown Rice"]
+    assert client.get("/api/recipes/ingredients", headers=other_headers).json() == []
+    
+    # On another worker, the echoed header routes the writer to the primary
+    monkeypatch.setattr(database, "_last_writes", OrderedDict())
+    assert client.get("/api/recipes/ingredients", headers=auth_headers).json() == []
+    response = client.get("/api/recipes/ingredients", headers={**auth_headers, database.LAST_WRITE_HEADER: last_write})
+    assert [ingredient["name"] for ingredient in response.json()] == ["Brown Rice"]
+    
+    # Past the lag window the replica is used again
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_LAG_SECONDS", 0)
+    response = client.get("/api/recipes/ingredients", headers={**auth_headers, database.LAST_WRITE_HEADER: last_write})
+    assert response.json() == []
+
+
+def test_read_routes_use_replica_and_writes_use_primary(client, db, auth_headers, test_recipe, replica):
+    """Test that catalogue reads come from the replica while writes land on the primary."""
+    from app import database
+    from app.database import get_read_db
+    from app.main import app
+    
+    def replica_session():
+        db = database.ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_read_db] = replica_session
+    
+    # The recipe was written to the primary; the (unreplicated) replica has none
+    response = client.get("/api/recipes/")
+    assert response.status_code == 200
+    assert response.json() == []
+    
+    response = client.get(f"/api/recipes/{test_recipe['id']}")
+    assert response.status_code == 404
+    
+    # Writes go to the primary, never to the replica
+    response = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Brown Rice", "calories_per_100g": 111, "protein_per_100g": 2.6, "carbs_per_100g": 23, "fats_per_100g": 0.9}
+    )
+    assert response.status_code == 201
+    assert db.get(Ingredient, response.json()["id"]) is not None
+    
+    replica_db = database.ReadSessionLocal()
+    try:
+        assert replica_db.query(Ingredient).count() == 0
+    finally:
+        replica_db.close()
+
+
+def test_caches_are_built_from_the_primary(client, test_ingredient, replica):
+    """Test that in-process caches filled during a replica read load from the primary."""
+    from app import database
+    from app.database import get_read_db
+    from app.main import app
+    
+    def replica_session():
+        db = database.ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_read_db] = replica_session
+    
+    # The ingredient only exists on the primary, which the index is built from
+    response = client.get("/api/recipes/ingredients/autocomplete?q=rice")
+    assert response.status_code == 200
+    assert [suggestion["id"] for suggestion in response.json()] == [test_ingredient["id"]]
@@ -366,3 +366,784 @@ def test_meal_plan_nutrition_scaling(client, auth_headers, test_recipe):
     
     # 3 servings should have 3x the calories
     assert abs(calories_3_servings - (calories_1_serving * 3)) < 0.1
+
+
+@pytest.fixture
+def priced_meal_plan(client, auth_headers, test_supermarkets):
+    """Plan a recipe whose cheapest split spreads over two supermarkets."""
+    # price per unit at (first supermarket, second supermarket)
+    prices = {"Oats": ("1.00", "1.10"), "Milk": ("1.10", "1.00"), "Eggs": ("1.00", "1.10")}
+    ingredient_ids = []
+    for name, (first_price, second_price) in prices.items():
+        ingredient = client.post(
+            "/api/recipes/ingredients",
+            headers=auth_headers,
+            json={"name": name, "calories_per_100g": 100, "protein_per_100g": 5, "carbs_per_100g": 10, "fats_per_100g": 2}
+        ).json()
+        ingredient_ids.append(ingredient["id"])
+        for supermarket, price in zip(test_supermarkets[:2], (first_price, second_price)):
+            client.post(
+                "/api/prices",
+                headers=auth_headers,
+                json={"ingredient_id": ingredient["id"], "supermarket_id": supermarket.id, "price_per_unit": price, "unit": "unit"}
+            )
+    
+    recipe = client.post(
+        "/api/recipes",
+        headers=auth_headers,
+        json={
+            "title": "Breakfast Bowl",
+            "instructions": "Mix everything",
+            "prep_time_minutes": 5,
+            "cook_time_minutes": 0,
+            "servings": 1,
+            "ingredients": [{"ingredient_id": ingredient_id, "amount": 1, "unit": "unit"} for ingredient_id in ingredient_ids]
+        }
+    ).json()
+    client.post(
+        "/api/planner",
+        headers=auth_headers,
+        json={"recipe_id": recipe["id"], "date": date.today().isoformat(), "meal_type": "breakfast", "servings": 1}
+    )
+    return test_supermarkets
+
+
+def test_optimized_shopping_list_cheapest_split(client, auth_headers, priced_meal_plan):
+    """Test that without a store penalty each item is bought at its cheapest supermarket."""
+    today = date.today().isoformat()
+    
+    response = client.get(
+        f"/api/planner/shopping-list/optimized?start_date={today}&end_date={today}",
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["items_with_prices"] == 3
+    assert len(data["supermarket_totals"]) == 2
+    assert abs(data["total_optimized"] - 3.0) < 0.001
+
+
+def test_optimized_shopping_list_totals_add_up_in_cents(client, auth_headers, priced_meal_plan):
+    """Test that line totals are whole cents and add up exactly to the store and basket totals."""
+    today = date.today().isoformat()
+    
+    data = client.get(
+        f"/api/planner/shopping-list/optimized?start_date={today}&end_date={today}",
+        headers=auth_headers
+    ).json()
+    
+    cents = {item["ingredient_id"]: round(item["total_cost"] * 100) for item in data["items"]}
+    assert all(item["total_cost"] == cents[item["ingredient_id"]] / 100 for item in data["items"])
+    for total in data["supermarket_totals"]:
+        store_cents = sum(cents[item["ingredient_id"]] for item in data["items"] if item["cheapest_supermarket_id"] == total["supermarket_id"])
+        assert total["total_price"] == store_cents / 100
+    assert data["total_optimized"] == sum(cents.values()) / 100
+
+
+def test_optimized_shopping_list_store_penalty_consolidates(client, auth_headers, priced_meal_plan):
+    """Test that a per-store penalty consolidates the basket into fewer supermarkets."""
+    today = date.today().isoformat()
+    
+    response = client.get(
+        f"/api/planner/shopping-list/optimized?start_date={today}&end_date={today}&store_penalty=1",
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert len(data["supermarket_totals"]) == 1
+    assert data["supermarket_totals"][0]["supermarket_id"] == priced_meal_plan[0].id
+    assert data["supermarket_totals"][0]["item_count"] == 3
+    assert abs(data["total_optimized"] - 3.1) < 0.001
+
+
+def test_optimized_shopping_list_max_stores(client, auth_headers, priced_meal_plan):
+    """Test that max_stores caps the number of recommended supermarkets."""
+    today = date.today().isoformat()
+    
+    response = client.get(
+        f"/api/planner/shopping-list/optimized?start_date={today}&end_date={today}&max_stores=1",
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["supermarket_totals"]) == 1
+
+
+def test_compare_supermarket_baskets(client, auth_headers, priced_meal_plan):
+    """Test whole-basket cost per supermarket against the optimized split."""
+    today = date.today().isoformat()
+    
+    response = client.get(
+        f"/api/planner/shopping-list/compare?start_date={today}&end_date={today}",
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert abs(data["total_optimized"] - 3.0) < 0.001
+    assert [s["supermarket_id"] for s in data["supermarkets"]] == [s.id for s in priced_meal_plan]
+    
+    first, second, unpriced = data["supermarkets"]
+    assert abs(first["total_price"] - 3.1) < 0.001
+    assert abs(first["delta_vs_optimized"] - 0.1) < 0.001
+    assert first["missing_items"] == 0
+    assert abs(second["total_price"] - 3.2) < 0.001
+    assert unpriced["missing_items"] == 3
+    assert unpriced["total_price"] == 0
+
+
+def test_compare_supermarket_baskets_delta_for_incomplete_store(client, auth_headers, priced_meal_plan):
+    """Test that a store lacking an item is compared on the items it sells only."""
+    today = date.today().isoformat()
+    third = priced_meal_plan[2]
+    ingredient = client.get("/api/recipes/ingredients?search=Oats", headers=auth_headers).json()[0]
+    client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={"ingredient_id": ingredient["id"], "supermarket_id": third.id, "price_per_unit": "1.50", "unit": "unit"}
+    )
+    
+    data = client.get(
+        f"/api/planner/shopping-list/compare?start_date={today}&end_date={today}",
+        headers=auth_headers
+    ).json()
+    
+    incomplete = next(s for s in data["supermarkets"] if s["supermarket_id"] == third.id)
+    assert incomplete["missing_items"] == 2
+    assert abs(incomplete["total_price"] - 1.5) < 0.001
+    # Oats cost 1.00 at best, so this store is 0.50 dearer, not 1.50 cheaper than the optimum
+    assert abs(incomplete["delta_vs_optimized"] - 0.5) < 0.001
+
+
+def test_compare_supermarket_baskets_unauthorized(client):
+    """Test basket comparison without authentication."""
+    today = date.today().isoformat()
+    response = client.get(f"/api/planner/shopping-list/compare?start_date={today}&end_date={today}")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.fixture
+def mixed_unit_meal_plan(client, auth_headers, test_supermarkets):
+    """Plan two recipes using the same ingredients in different units."""
+    rice = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Rice", "calories_per_100g": 130, "protein_per_100g": 3, "carbs_per_100g": 28, "fats_per_100g": 0}
+    ).json()
+    oil = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Olive Oil", "calories_per_100g": 884, "protein_per_100g": 0, "carbs_per_100g": 0, "fats_per_100g": 100, "density_g_per_ml": 0.92}
+    ).json()
+    for ingredient, price, unit in ((rice, "2.00", "kg"), (oil, "8.00", "L")):
+        client.post(
+            "/api/prices",
+            headers=auth_headers,
+            json={"ingredient_id": ingredient["id"], "supermarket_id": test_supermarkets[0].id, "price_per_unit": price, "unit": unit}
+        )
+    
+    recipes = [
+        [{"ingredient_id": rice["id"], "amount": 200, "unit": "g"}, {"ingredient_id": oil["id"], "amount": 2, "unit": "tbsp"}],
+        [{"ingredient_id": rice["id"], "amount": 1, "unit": "kg"}, {"ingredient_id": oil["id"], "amount": 92, "unit": "g"}],
+    ]
+    for offset, ingredients in enumerate(recipes):
+        recipe = client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": f"Rice Dish {offset}",
+                "instructions": "Cook the rice",
+                "prep_time_minutes": 5,
+                "cook_time_minutes": 20,
+                "servings": 1,
+                "ingredients": ingredients
+            }
+        ).json()
+        client.post(
+            "/api/planner",
+            headers=auth_headers,
+            json={"recipe_id": recipe["id"], "date": (date.today() + timedelta(days=offset)).isoformat(), "meal_type": "dinner", "servings": 1}
+        )
+    return {"rice": rice, "oil": oil}
+
+
+def test_generate_shopping_list_merges_units(client, auth_headers, mixed_unit_meal_plan):
+    """Test that amounts in convertible units are merged into one row."""
+    start = date.today().isoformat()
+    end = (date.today() + timedelta(days=1)).isoformat()
+    
+    response = client.get(
+        f"/api/planner/shopping-list?start_date={start}&end_date={end}",
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    items = {item["ingredient_name"]: item for item in response.json()["items"]}
+    assert len(items) == 2
+    # 200 g + 1 kg
+    assert items["Rice"]["unit"] == "g"
+    assert items["Rice"]["total_amount"] == 1200.0
+    # 2 tbsp + 92 g at 0.92 g/ml
+    assert items["Olive Oil"]["unit"] == "ml"
+    assert items["Olive Oil"]["total_amount"] == 130.0
+
+
+def test_optimized_shopping_list_converts_to_price_unit(client, auth_headers, mixed_unit_meal_plan):
+    """Test that amounts are converted to the price unit before costing."""
+    start = date.today().isoformat()
+    end = (date.today() + timedelta(days=1)).isoformat()
+    
+    response = client.get(
+        f"/api/planner/shopping-list/optimized?start_date={start}&end_date={end}",
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    items = {item["ingredient_name"]: item for item in data["items"]}
+    # 1.2 kg at 2.00 €/kg
+    assert items["Rice"]["price_unit"] == "kg"
+    assert abs(items["Rice"]["total_cost"] - 2.4) < 0.001
+    # 0.13 L at 8.00 €/L
+    assert items["Olive Oil"]["price_unit"] == "L"
+    assert abs(items["Olive Oil"]["total_cost"] - 1.04) < 0.001
+    assert abs(data["total_optimized"] - 3.44) < 0.001
+
+
+def test_unit_conversion():
+    """Test unit conversion across dimensions."""
+    import numpy as np
+    from app.utils import units
+    
+    assert units.normalize(1.5, "kg") == (1500.0, "g")
+    assert units.normalize(2, "pinch") == (2, "pinch")
+    assert units.convert(2, "unit", "g", unit_weight_g=60) == 120.0
+    assert units.convert(1, "cup", "g", density_g_per_ml=0.5) == 120.0
+    assert units.convert(1, "cup", "g") is None
+    
+    quantities = units.price_quantities([500, 3], ["g", "unit"], [None, None], [None, 50])
+    # Columns: kg, L, unit
+    assert quantities[0, 0] == 0.5
+    assert np.isnan(quantities[0, 1]) and np.isnan(quantities[0, 2])
+    assert quantities[1, 0] == 0.15
+    assert quantities[1, 2] == 3
+
+
+def test_basket_solver_local_search_matches_exact():
+    """Test that the heuristic finds the exact optimum on a small random instance."""
+    import time
+    import numpy as np
+    from app.services import basket_solver
+    
+    rng = np.random.default_rng(42)
+    costs = rng.uniform(1, 10, size=(100, 6))
+    costs[rng.random(costs.shape) < 0.2] = np.inf
+    
+    for penalty, limit in ((0.0, 6), (3.0, 6), (0.0, 2)):
+        exact = basket_solver._solve_exact(costs, penalty, limit)
+        heuristic = basket_solver._solve_local_search(costs, penalty, limit, time.perf_counter() + 1)
+        assert basket_solver._score(costs, heuristic, penalty) == basket_solver._score(costs, exact, penalty)
+
+
+def test_basket_solver_stops_at_time_budget(monkeypatch):
+    """Test that local search keeps its starting basket once its time budget is spent."""
+    import itertools
+    from types import SimpleNamespace
+    import numpy as np
+    from app.services import basket_solver
+    
+    rng = np.random.default_rng(7)
+    costs = rng.uniform(1, 10, size=(100, 20))
+    costs[rng.random(costs.shape) < 0.2] = np.inf
+    cheapest = np.zeros(20, dtype=bool)
+    cheapest[costs.argmin(axis=1)] = True
+    
+    # Every clock reading is a second after the previous one
+    clock = itertools.count()
+    monkeypatch.setattr(basket_solver, "time", SimpleNamespace(perf_counter=lambda: float(next(clock))))
+    rushed = basket_solver.solve_basket(costs, store_penalty=2.0)
+    assert next(clock) == 2  # deadline set, then checked once
+    assert (rushed == cheapest).all()
+    
+    # A clock that never moves lets the search run until no move improves
+    monkeypatch.setattr(basket_solver, "time", SimpleNamespace(perf_counter=lambda: 0.0))
+    settled = basket_solver.solve_basket(costs, store_penalty=2.0)
+    assert basket_solver._score(costs, settled, 2.0) < basket_solver._score(costs, rushed, 2.0)
+
+
+@pytest.fixture
+def macro_catalogue(client, auth_headers):
+    """Recipes of which exactly one combination hits the test user's daily targets."""
+    # calories, protein, carbs, fats per serving (100 g of a single ingredient)
+    recipes = {
+        "Oat Bowl": (600, 45, 60, 20),
+        "Chicken Rice": (700, 55, 70, 25),
+        "Salmon Pasta": (700, 50, 70, 25),
+        "Cake": (1500, 10, 200, 70),
+        "Salad": (200, 5, 30, 5),
+    }
+    ids = {}
+    for title, (calories, protein, carbs, fats) in recipes.items():
+        ingredient = client.post(
+            "/api/recipes/ingredients",
+            headers=auth_headers,
+            json={"name": title, "calories_per_100g": calories, "protein_per_100g": protein, "carbs_per_100g": carbs, "fats_per_100g": fats}
+        ).json()
+        ids[title] = client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": title,
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": 1,
+                "ingredients": [{"ingredient_id": ingredient["id"], "amount": 100, "unit": "g"}]
+            }
+        ).json()["id"]
+    return ids
+
+
+def test_generate_meal_plan_hits_targets(client, auth_headers, macro_catalogue):
+    """Test that the generator fills every slot and meets the daily targets."""
+    start = date.today()
+    response = client.post(
+        "/api/planner/generate",
+        headers=auth_headers,
+        json={"start_date": start.isoformat(), "end_date": (start + timedelta(days=2)).isoformat(), "seed": 1}
+    )
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert data["created_items"] == 9
+    assert data["targets"] == {"calories": 2000, "protein": 150, "carbs": 200, "fats": 70}
+    assert data["estimated_cost"] is None
+    assert len(data["days"]) == 3
+    for day in data["days"]:
+        assert day["calories"] == 2000
+        assert day["protein"] == 150
+    assert {item["meal_type"] for item in data["items"]} == {"breakfast", "lunch", "dinner"}
+    
+    # The plan is saved
+    saved = client.get(
+        f"/api/planner?start_date={start.isoformat()}&end_date={(start + timedelta(days=2)).isoformat()}",
+        headers=auth_headers
+    ).json()
+    assert len(saved) == 9
+
+
+def test_generate_meal_plan_keeps_existing_meals(client, auth_headers, macro_catalogue):
+    """Test that planned meals stay and count towards their day unless replaced."""
+    today = date.today().isoformat()
+    client.post(
+        "/api/planner",
+        headers=auth_headers,
+        json={"recipe_id": macro_catalogue["Chicken Rice"], "date": today, "meal_type": "dinner", "servings": 1}
+    )
+    
+    request = {"start_date": today, "end_date": today, "seed": 1}
+    data = client.post("/api/planner/generate", headers=auth_headers, json=request).json()
+    assert data["created_items"] == 2
+    assert data["days"][0]["calories"] == 2000
+    dinners = [item for item in data["items"] if item["meal_type"] == "dinner"]
+    assert [item["recipe_id"] for item in dinners] == [macro_catalogue["Chicken Rice"]]
+    
+    data = client.post("/api/planner/generate", headers=auth_headers, json={**request, "replace_existing": True}).json()
+    assert data["created_items"] == 3
+    assert len(data["items"]) == 3
+
+
+def test_generate_meal_plan_estimates_cost(client, auth_headers, test_supermarkets, macro_catalogue):
+    """Test the estimated cost of the generated meals from supermarket prices."""
+    ingredient_id = client.get(f"/api/recipes/{macro_catalogue['Oat Bowl']}").json()["ingredients"][0]["ingredient_id"]
+    client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={"ingredient_id": ingredient_id, "supermarket_id": test_supermarkets[0].id, "price_per_unit": "10.00", "unit": "kg"}
+    )
+    
+    today = date.today().isoformat()
+    data = client.post(
+        "/api/planner/generate",
+        headers=auth_headers,
+        json={"start_date": today, "end_date": today, "include_cost": True, "seed": 1}
+    ).json()
+    
+    assert data["estimated_cost"] == 1.0  # 100 g of oats at 10 €/kg
+    assert data["unpriced_items"] == 2
+
+
+def test_generate_meal_plan_validation(client, auth_headers, macro_catalogue):
+    """Test generator request validation."""
+    start = date.today()
+    too_long = {"start_date": start.isoformat(), "end_date": (start + timedelta(days=40)).isoformat()}
+    assert client.post("/api/planner/generate", headers=auth_headers, json=too_long).status_code == 400
+    
+    no_slots = {"start_date": start.isoformat(), "end_date": start.isoformat(), "slots": {"lunch": 0}}
+    assert client.post("/api/planner/generate", headers=auth_headers, json=no_slots).status_code == 422
+    
+    assert client.post("/api/planner/generate", json=no_slots).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_plan_solver_stops_at_time_budget(monkeypatch):
+    """Test that the plan solver stops restarting once its time budget is spent."""
+    import itertools
+    from types import SimpleNamespace
+    import numpy as np
+    from app.services import plan_solver
+    
+    rng = np.random.default_rng(3)
+    macros = np.column_stack([
+        rng.uniform(150, 900, 2000),
+        rng.uniform(5, 60, 2000),
+        rng.uniform(10, 120, 2000),
+        rng.uniform(2, 40, 2000),
+    ])
+    targets = np.array([2000, 150, 200, 70], dtype=float)
+    servings = np.ones(4)
+    allowed = rng.random((4, 2000)) < 0.5
+    
+    def deviation(plan):
+        return np.abs(macros[plan].sum(axis=1) - targets) / targets
+    
+    # Every clock reading is a second after the previous one
+    clock = itertools.count()
+    monkeypatch.setattr(plan_solver, "time", SimpleNamespace(perf_counter=lambda: float(next(clock))))
+    rushed = plan_solver.solve_plan(macros, targets, servings, allowed, np.zeros((7, 4)), seed=3)
+    assert next(clock) == 3  # deadline set, then checked before improving and before restarting
+    assert all(allowed[slot, rushed[:, slot]].all() for slot in range(4))
+    
+    # A clock that never moves runs every restart until no move improves
+    monkeypatch.setattr(plan_solver, "time", SimpleNamespace(perf_counter=lambda: 0.0))
+    settled = plan_solver.solve_plan(macros, targets, servings, allowed, np.zeros((7, 4)), seed=3)
+    assert all(allowed[slot, settled[:, slot]].all() for slot in range(4))
+    assert (deviation(settled) < 0.05).all()
+    assert not (deviation(rushed) < 0.05).all()
+
+
+@pytest.fixture
+def priced_catalogue(client, auth_headers, test_supermarkets, macro_catalogue):
+    """Price every catalogue recipe (100 g of its ingredient per serving)."""
+    price_per_kg = {"Oat Bowl": "10.00", "Chicken Rice": "50.00", "Salmon Pasta": "80.00", "Cake": "20.00", "Salad": "10.00"}
+    for title, price in price_per_kg.items():
+        ingredient_id = client.get(f"/api/recipes/{macro_catalogue[title]}").json()["ingredients"][0]["ingredient_id"]
+        client.post(
+            "/api/prices",
+            headers=auth_headers,
+            json={"ingredient_id": ingredient_id, "supermarket_id": test_supermarkets[0].id, "price_per_unit": price, "unit": "kg"}
+        )
+    return macro_catalogue
+
+
+def test_generate_meal_plan_within_budget(client, auth_headers, priced_catalogue):
+    """Test that budget mode never spends more than the budget."""
+    today = date.today().isoformat()
+    request = {"start_date": today, "end_date": today, "seed": 1}
+    
+    # The best macro fit costs 1 + 5 + 8 €
+    data = client.post("/api/planner/generate", headers=auth_headers, json={**request, "include_cost": True}).json()
+    assert data["estimated_cost"] == 14.0
+    
+    data = client.post(
+        "/api/planner/generate",
+        headers=auth_headers,
+        json={**request, "budget": 10, "replace_existing": True}
+    ).json()
+    assert data["created_items"] == 3
+    assert data["estimated_cost"] <= 10
+    assert data["unpriced_items"] == 0
+    
+    response = client.post("/api/planner/generate", headers=auth_headers, json={**request, "budget": 2, "replace_existing": True})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "€3.00" in response.json()["detail"]
+
+
+def _create_tagged_recipe(client, auth_headers, title, tag_names, is_public=True):
+    """Single-ingredient recipe (600 kcal per serving, unpriced) with tags."""
+    ingredient = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": title, "calories_per_100g": 600, "protein_per_100g": 45, "carbs_per_100g": 60, "fats_per_100g": 20}
+    ).json()
+    return client.post(
+        "/api/recipes",
+        headers=auth_headers,
+        json={
+            "title": title,
+            "instructions": "Test",
+            "prep_time_minutes": 0,
+            "cook_time_minutes": 0,
+            "servings": 1,
+            "is_public": is_public,
+            "tag_names": tag_names,
+            "ingredients": [{"ingredient_id": ingredient["id"], "amount": 100, "unit": "g"}]
+        }
+    ).json()["id"]
+
+
+def test_generate_meal_plan_budget_falls_back_from_unpriced_tags(client, auth_headers, priced_catalogue):
+    """Test that a slot whose tagged recipes have no price uses any priced recipe under a budget."""
+    pancakes_id = _create_tagged_recipe(client, auth_headers, "Pancakes", ["breakfast"])
+    today = date.today().isoformat()
+    
+    response = client.post(
+        "/api/planner/generate",
+        headers=auth_headers,
+        json={"start_date": today, "end_date": today, "budget": 10, "seed": 1}
+    )
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert data["created_items"] == 3
+    assert data["estimated_cost"] <= 10
+    assert pancakes_id not in {item["recipe_id"] for item in data["items"]}
+
+
+def test_generate_meal_plan_prefers_private_tagged_recipes(client, auth_headers, macro_catalogue):
+    """Test that the user's private recipes tagged with a meal type fill that slot."""
+    porridge_id = _create_tagged_recipe(client, auth_headers, "Private Porridge", ["breakfast"], is_public=False)
+    today = date.today().isoformat()
+    
+    data = client.post(
+        "/api/planner/generate",
+        headers=auth_headers,
+        json={"start_date": today, "end_date": today, "seed": 1}
+    ).json()
+    
+    breakfasts = [item["recipe_id"] for item in data["items"] if item["meal_type"] == "breakfast"]
+    assert breakfasts == [porridge_id]
+
+
+def test_generate_meal_plan_for_variety(client, auth_headers, macro_catalogue):
+    """Test that the variety goal avoids repeating recipes."""
+    start = date.today()
+    request = {"start_date": start.isoformat(), "end_date": (start + timedelta(days=1)).isoformat(), "seed": 1}
+    
+    data = client.post("/api/planner/generate", headers=auth_headers, json=request).json()
+    assert len({item["recipe_id"] for item in data["items"]}) == 3
+    
+    data = client.post(
+        "/api/planner/generate",
+        headers=auth_headers,
+        json={**request, "goal": "variety", "replace_existing": True}
+    ).json()
+    assert len({item["recipe_id"] for item in data["items"]}) == 5
+
+
+def test_recipe_costs_cached_per_exclusion_profile(client, auth_headers, db, test_user, test_supermarkets, priced_catalogue, query_counter):
+    """Test that recipe costs are reused until a price changes."""
+    from app.services import optimization_service
+    
+    recipe_ids = sorted(priced_catalogue.values())
+    costs = optimization_service.recipe_serving_costs(db, recipe_ids, test_user.id)
+    assert costs.tolist() == [1.0, 5.0, 8.0, 2.0, 1.0]
+    
+    query_counter.clear()
+    optimization_service.recipe_serving_costs(db, recipe_ids, test_user.id)
+    assert len(query_counter) == 1  # Only the user's exclusions
+    assert not any("price" in statement for statement in query_counter)
+    
+    ingredient_id = client.get(f"/api/recipes/{priced_catalogue['Oat Bowl']}").json()["ingredients"][0]["ingredient_id"]
+    client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={"ingredient_id": ingredient_id, "supermarket_id": test_supermarkets[1].id, "price_per_unit": "5.00", "unit": "kg"}
+    )
+    assert optimization_service.recipe_serving_costs(db, recipe_ids, test_user.id)[0] == 0.5
+    
+    # Excluding the cheaper supermarket is a different profile
+    client.post(
+        "/api/exclusions",
+        headers=auth_headers,
+        json={"ingredient_id": ingredient_id, "supermarket_id": test_supermarkets[1].id}
+    )
+    assert optimization_service.recipe_serving_costs(db, recipe_ids, test_user.id)[0] == 1.0
+
+
+def test_batch_meal_plan(client, auth_headers, test_recipe, test_meal_plan_item, query_counter):
+    """Test creating, updating and deleting meals in one request."""
+    today = date.today()
+    other = client.post(
+        "/api/planner",
+        headers=auth_headers,
+        json={"recipe_id": test_recipe["id"], "date": today.isoformat(), "meal_type": "dinner", "servings": 1}
+    ).json()
+    
+    query_counter.clear()
+    response = client.post(
+        "/api/planner/batch",
+        headers=auth_headers,
+        json={
+            "create": [
+                {"recipe_id": test_recipe["id"], "date": (today + timedelta(days=day)).isoformat(), "meal_type": "lunch"}
+                for day in range(1, 8)
+            ],
+            "update": [{"id": test_meal_plan_item["id"], "servings": 3, "date": (today + timedelta(days=10)).isoformat()}],
+            "delete": [other["id"]]
+        }
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [meal["date"] for meal in data["created"]] == [(today + timedelta(days=day)).isoformat() for day in range(1, 8)]
+    assert data["updated"][0]["servings"] == 3
+    assert data["updated"][0]["date"] == (today + timedelta(days=10)).isoformat()
+    assert data["deleted"] == [other["id"]]
+    
+    # One INSERT for all created meals, not one per meal
+    inserts = [statement for statement in query_counter if statement.startswith("INSERT INTO meal_plan_items")]
+    assert len(inserts) == 1
+    
+    plan = client.get(
+        f"/api/planner?start_date={today.isoformat()}&end_date={(today + timedelta(days=10)).isoformat()}",
+        headers=auth_headers
+    ).json()
+    assert len(plan) == 8
+
+
+def test_batch_meal_plan_is_atomic(client, auth_headers, test_recipe, test_meal_plan_item):
+    """Test that a failing operation rolls back the whole batch."""
+    today = date.today().isoformat()
+    response = client.post(
+        "/api/planner/batch",
+        headers=auth_headers,
+        json={
+            "create": [
+                {"recipe_id": test_recipe["id"], "date": today, "meal_type": "lunch"},
+                {"recipe_id": 99999, "date": today, "meal_type": "dinner"}
+            ],
+            "delete": [test_meal_plan_item["id"]]
+        }
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "99999" in response.json()["detail"]
+    
+    response = client.post("/api/planner/batch", headers=auth_headers, json={"delete": [99999]})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    plan = client.get(f"/api/planner?start_date={today}&end_date={test_meal_plan_item['date']}", headers=auth_headers).json()
+    assert [meal["id"] for meal in plan] == [test_meal_plan_item["id"]]
+    
+    # Omitting a field keeps it, null can't clear it
+    null_date = {"update": [{"id": test_meal_plan_item["id"], "date": None}]}
+    assert client.post("/api/planner/batch", headers=auth_headers, json=null_date).status_code == 422
+    
+    too_many = {"delete": list(range(1, 202))}
+    assert client.post("/api/planner/batch", headers=auth_headers, json=too_many).status_code == 422
+    assert client.post("/api/planner/batch", json={"delete": [1]}).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_copy_meal_plan_week(client, auth_headers, test_recipe):
+    """Test copying last week's plan to this week."""
+    this_monday = date.today() - timedelta(days=date.today().weekday())
+    last_monday = this_monday - timedelta(days=7)
+    client.post(
+        "/api/planner/batch",
+        headers=auth_headers,
+        json={
+            "create": [
+                {"recipe_id": test_recipe["id"], "date": (last_monday + timedelta(days=day)).isoformat(), "meal_type": "dinner", "servings": 2}
+                for day in range(7)
+            ]
+        }
+    )
+    client.post(
+        "/api/planner",
+        headers=auth_headers,
+        json={"recipe_id": test_recipe["id"], "date": this_monday.isoformat(), "meal_type": "breakfast"}
+    )
+    
+    request = {
+        "source_start": last_monday.isoformat(),
+        "source_end": (last_monday + timedelta(days=6)).isoformat(),
+        "target_start": this_monday.isoformat()
+    }
+    response = client.post("/api/planner/copy", headers=auth_headers, json=request)
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert [meal["date"] for meal in data] == [(this_monday + timedelta(days=day)).isoformat() for day in range(7)]
+    assert all(meal["servings"] == 2 and meal["meal_type"] == "dinner" for meal in data)
+    
+    week = f"start_date={this_monday.isoformat()}&end_date={(this_monday + timedelta(days=6)).isoformat()}"
+    assert len(client.get(f"/api/planner?{week}", headers=auth_headers).json()) == 8
+    
+    # Replacing drops what was planned in the target week
+    client.post("/api/planner/copy", headers=auth_headers, json={**request, "replace_existing": True})
+    assert len(client.get(f"/api/planner?{week}", headers=auth_headers).json()) == 7
+    
+    too_long = {**request, "source_end": (last_monday + timedelta(days=31)).isoformat()}
+    response = client.post("/api/planner/copy", headers=auth_headers, json=too_long)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_load_profiles_raise_on_lazy_load(db, test_meal_plan_item):
+    """Test that relationships outside a load profile raise instead of lazy loading."""
+    from sqlalchemy.exc import InvalidRequestError
+    from app.models.meal_plan import MealPlanItem
+    from app.services import load_profiles
+    
+    item = db.query(MealPlanItem).options(*load_profiles.load_options('meal_plan')).first()
+    assert item.recipe.title == "Grilled Chicken with Rice"
+    with pytest.raises(InvalidRequestError):
+        item.recipe.recipe_ingredients
+    with pytest.raises(InvalidRequestError):
+        item.user
+
+
+def test_meal_plan_queries_do_not_grow_with_meals(client, auth_headers, test_recipe, query_counter):
+    """Test that plan and shopping list reads use a fixed number of queries."""
+    today = date.today()
+    week = f"start_date={today.isoformat()}&end_date={(today + timedelta(days=6)).isoformat()}"
+    
+    counts = []
+    for day in range(2):
+        client.post(
+            "/api/planner/batch",
+            headers=auth_headers,
+            json={
+                "create": [
+                    {"recipe_id": test_recipe["id"], "date": (today + timedelta(days=day)).isoformat(), "meal_type": meal_type}
+                    for meal_type in ("breakfast", "lunch", "dinner")
+                ]
+            }
+        )
+        query_counter.clear()
+        client.get(f"/api/planner?{week}", headers=auth_headers)
+        client.get(f"/api/planner/shopping-list?{week}", headers=auth_headers)
+        counts.append(len(query_counter))
+    
+    assert counts[0] == counts[1]
+
+
+def test_slow_meal_plan_requests_run_concurrently(client, auth_headers, monkeypatch):
+    """Test that blocking handlers run on the threadpool instead of the event loop."""
+    import asyncio
+    import time
+    import httpx
+    from app.main import app
+    from app.services.meal_service import MealService
+    
+    def slow_get_meal_plan(self, user_id, start_date, end_date):
+        time.sleep(0.3)
+        return []
+    
+    monkeypatch.setattr(MealService, "get_meal_plan", slow_get_meal_plan)
+    client.get("/api/auth/me", headers=auth_headers)  # Cache the user
+    today = date.today().isoformat()
+    
+    async def fetch_plans():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                http.get(f"/api/planner/?start_date={today}&end_date={today}", headers=auth_headers)
+                for _ in range(4)
+            ))
+            return time.perf_counter() - started, responses
+    
+    elapsed, responses = asyncio.run(fetch_plans())
+    
+    assert all(response.status_code == 200 for response in responses)
+    assert elapsed < 0.9
@@ -0,0 +1,381 @@
+import warnings
+import pytest
+import numpy as np
+from fastapi import status
+from decimal import Decimal
+from sqlalchemy.exc import SAWarning
+from app.models.ingredient_cheapest_price import IngredientCheapestPrice
+from app.models.ingredient_exclusion import IngredientExclusion
+from app.models.ingredient_price import IngredientPrice
+from app.models.recipe import Ingredient
+from app.models.supermarket import UnitType
+from app.models.user import User
+from app.schemas.meal_plan import ShoppingListItem
+from app.services import optimization_service, price_matrix, price_service
+
+
+def _create_priced_ingredients(db, user, supermarkets, count):
+    """Create ingredients priced at every supermarket (cheapest at the last one)."""
+    ingredients = [
+        Ingredient(
+            name=f"Ingredient {i}",
+            calories_per_100g=100,
+            protein_per_100g=10,
+            carbs_per_100g=10,
+            fats_per_100g=1,
+            created_by=user.id
+        )
+        for i in range(count)
+    ]
+    db.add_all(ingredients)
+    db.flush()
+    
+    for ingredient in ingredients:
+        for position, supermarket in enumerate(supermarkets):
+            db.add(IngredientPrice(
+                ingredient_id=ingredient.id,
+                supermarket_id=supermarket.id,
+                price_per_unit=Decimal("3.00") - Decimal(position),
+                unit=UnitType.KG,
+                user_id=user.id
+            ))
+    db.commit()
+    price_service.rebuild_price_aggregates(db)
+    return ingredients
+
+
+def _shopping_list(ingredients):
+    return [
+        ShoppingListItem(
+            ingredient_id=ingredient.id,
+            ingredient_name=ingredient.name,
+            total_amount=2,
+            unit="kg"
+        )
+        for ingredient in ingredients
+    ]
+
+
+def test_add_price_success(client, auth_headers, test_ingredient, test_supermarkets):
+    """Test adding a price for an ingredient."""
+    response = client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={
+            "ingredient_id": test_ingredient["id"],
+            "supermarket_id": test_supermarkets[0].id,
+            "price_per_unit": "1.25",
+            "unit": "kg"
+        }
+    )
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert data["ingredient_name"] == test_ingredient["name"]
+    assert data["supermarket_name"] == test_supermarkets[0].name
+
+
+def test_get_prices_respects_exclusions(client, db, auth_headers, test_user, test_supermarkets):
+    """Test that excluded supermarkets are left out of the price list."""
+    ingredient = _create_priced_ingredients(db, test_user, test_supermarkets, 1)[0]
+    db.add(IngredientExclusion(
+        user_id=test_user.id,
+        ingredient_id=ingredient.id,
+        supermarket_id=test_supermarkets[0].id
+    ))
+    db.commit()
+    
+    response = client.get(f"/api/prices/ingredient/{ingredient.id}", headers=auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    supermarket_ids = {price["supermarket_id"] for price in response.json()}
+    assert supermarket_ids == {s.id for s in test_supermarkets[1:]}
+
+
+def test_get_cheapest_prices_for_ingredients(db, test_user, test_supermarkets):
+    """Test bulk cheapest price resolution."""
+    ingredients = _create_priced_ingredients(db, test_user, test_supermarkets, 3)
+    
+    cheapest = price_service.get_cheapest_prices_for_ingredients(
+        db, [ingredient.id for ingredient in ingredients] + [99999], test_user.id
+    )
+    
+    assert set(cheapest) == {ingredient.id for ingredient in ingredients}
+    for price in cheapest.values():
+        assert price.supermarket_id == test_supermarkets[-1].id
+        assert price.supermarket_name == test_supermarkets[-1].name
+
+
+def test_optimize_shopping_list_query_count_is_constant(db, test_user, test_supermarkets, query_counter):
+    """Test that price resolution does not issue queries per shopping list item."""
+    ingredients = _create_priced_ingredients(db, test_user, test_supermarkets, 30)
+    small_list = _shopping_list(ingredients[:2])
+    large_list = _shopping_list(ingredients)
+    user_id = test_user.id
+    
+    # Warm the in-process price matrix
+    optimization_service.optimize_shopping_list(db, small_list, user_id)
+    
+    query_counter.clear()
+    small = optimization_service.optimize_shopping_list(db, small_list, user_id)
+    small_count = len(query_counter)
+    
+    query_counter.clear()
+    large = optimization_service.optimize_shopping_list(db, large_list, user_id)
+    large_count = len(query_counter)
+    
+    assert small.items_with_prices == 2
+    assert large.items_with_prices == 30
+    assert large_count == small_count
+    assert large_count <= 1
+
+
+@pytest.mark.parametrize("strategy", ["window", "aggregate"])
+def test_cheapest_price_strategies(db, test_user, test_supermarkets, strategy):
+    """Test that SQL-side cheapest price selection skips excluded and inactive supermarkets."""
+    ingredients = _create_priced_ingredients(db, test_user, test_supermarkets, 2)
+    
+    # Exclude the cheapest supermarket for the first ingredient
+    db.add(IngredientExclusion(
+        user_id=test_user.id,
+        ingredient_id=ingredients[0].id,
+        supermarket_id=test_supermarkets[-1].id
+    ))
+    # Deactivate the middle supermarket for everyone
+    test_supermarkets[1].is_active = False
+    db.commit()
+    
+    cheapest = price_service.get_cheapest_prices_for_ingredients(
+        db, [ingredient.id for ingredient in ingredients], test_user.id, strategy=strategy
+    )
+    
+    assert cheapest[ingredients[0].id].supermarket_id == test_supermarkets[0].id
+    assert cheapest[ingredients[0].id].min_price == Decimal("3.00")
+    assert cheapest[ingredients[1].id].supermarket_id == test_supermarkets[-1].id
+    assert cheapest[ingredients[1].id].min_price == Decimal("1.00")
+
+
+@pytest.mark.parametrize("strategy", ["window", "aggregate"])
+def test_cheapest_price_compares_units(db, test_user, test_supermarkets, strategy):
+    """Test that a per-unit and a per-kg price are ranked on the same unit."""
+    eggs = Ingredient(
+        name="Eggs",
+        calories_per_100g=155,
+        protein_per_100g=13,
+        carbs_per_100g=1,
+        fats_per_100g=11,
+        unit_weight_g=50,
+        created_by=test_user.id
+    )
+    db.add(eggs)
+    db.flush()
+    
+    # 0.20 per 50 g egg is 4.00 per kg, dearer than 3.50 per kg
+    for supermarket, price, unit in ((test_supermarkets[0], "0.20", UnitType.UNIT), (test_supermarkets[1], "3.50", UnitType.KG)):
+        db.add(IngredientPrice(
+            ingredient_id=eggs.id,
+            supermarket_id=supermarket.id,
+            price_per_unit=Decimal(price),
+            unit=unit,
+            user_id=test_user.id
+        ))
+    db.commit()
+    price_service.rebuild_price_aggregates(db)
+    
+    cheapest = price_service.get_cheapest_prices_for_ingredients(db, [eggs.id], test_user.id, strategy=strategy)[eggs.id]
+    assert cheapest.supermarket_id == test_supermarkets[1].id
+    assert cheapest.min_price == Decimal("3.50")
+    
+    # Without a unit weight the per-unit price can't be compared and ranks last
+    eggs.unit_weight_g = None
+    db.commit()
+    cheapest = price_service.get_cheapest_prices_for_ingredients(db, [eggs.id], test_user.id, strategy=strategy)[eggs.id]
+    assert cheapest.supermarket_id == test_supermarkets[1].id
+
+
+def test_price_aggregates_follow_upserts_and_deletes(client, db, auth_headers, test_user, test_ingredient, test_supermarkets):
+    """Test that min/median/count are maintained on every price write."""
+    supermarket_id = test_supermarkets[0].id
+    
+    # Community prices from two other users
+    for email, price in (("a@example.com", "1.00"), ("b@example.com", "4.00")):
+        user = User(email=email, password_hash="x", full_name=email)
+        db.add(user)
+        db.flush()
+        db.add(IngredientPrice(
+            ingredient_id=test_ingredient["id"],
+            supermarket_id=supermarket_id,
+            price_per_unit=Decimal(price),
+            unit=UnitType.KG,
+            user_id=user.id
+        ))
+    db.commit()
+    price_service.rebuild_price_aggregates(db)
+    
+    response = client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={
+            "ingredient_id": test_ingredient["id"],
+            "supermarket_id": supermarket_id,
+            "price_per_unit": "2.00",
+            "unit": "kg"
+        }
+    )
+    price_id = response.json()["id"]
+    
+    summary = client.get(f"/api/prices/ingredient/{test_ingredient['id']}/summary", headers=auth_headers).json()
+    assert len(summary) == 1
+    assert float(summary[0]["min_price"]) == 1.00
+    assert float(summary[0]["median_price"]) == 2.00
+    assert summary[0]["price_count"] == 3
+    
+    client.delete(f"/api/prices/{price_id}", headers=auth_headers)
+    
+    summary = client.get(f"/api/prices/ingredient/{test_ingredient['id']}/summary", headers=auth_headers).json()
+    assert float(summary[0]["median_price"]) == 2.50
+    assert summary[0]["price_count"] == 2
+
+
+def test_price_aggregates_convert_mixed_units(client, db, auth_headers, test_ingredient, test_supermarkets):
+    """Test that per-unit and per-kg prices are compared in the same unit."""
+    supermarket_id = test_supermarkets[0].id
+    ingredient = db.get(Ingredient, test_ingredient["id"])
+    
+    for email, price in (("a@example.com", "5.00"), ("b@example.com", "6.00")):
+        user = User(email=email, password_hash="x", full_name=email)
+        db.add(user)
+        db.flush()
+        db.add(IngredientPrice(
+            ingredient_id=ingredient.id,
+            supermarket_id=supermarket_id,
+            price_per_unit=Decimal(price),
+            unit=UnitType.KG,
+            user_id=user.id
+        ))
+    db.commit()
+    
+    unit_price = {
+        "ingredient_id": ingredient.id,
+        "supermarket_id": supermarket_id,
+        "price_per_unit": "0.50",
+        "unit": "unit"
+    }
+    
+    # Without a unit weight the per-unit price can't be compared
+    client.post("/api/prices", headers=auth_headers, json=unit_price)
+    aggregate = db.get(IngredientCheapestPrice, (ingredient.id, supermarket_id))
+    db.refresh(aggregate)
+    assert aggregate.unit == UnitType.KG
+    assert aggregate.min_price == Decimal("5.00")
+    assert aggregate.price_count == 2
+    
+    # 0.50 per 200 g piece is 2.50 per kg
+    ingredient.unit_weight_g = 200
+    db.commit()
+    client.post("/api/prices", headers=auth_headers, json=unit_price)
+    db.refresh(aggregate)
+    assert aggregate.unit == UnitType.KG
+    assert aggregate.min_price == Decimal("2.50")
+    assert aggregate.median_price == Decimal("5.00")
+    assert aggregate.price_count == 3
+    
+    # Rebuilding replaces the loaded aggregate without identity map conflicts
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", SAWarning)
+        price_service.rebuild_price_aggregates(db)
+    aggregate = db.get(IngredientCheapestPrice, (ingredient.id, supermarket_id))
+    assert aggregate.min_price == Decimal("2.50")
+    assert aggregate.price_count == 3
+
+
+def test_price_aggregates_follow_conversion_changes(client, db, auth_headers, test_user, test_ingredient, test_supermarkets):
+    """Test that changing an ingredient's unit weight re-ranks its mixed-unit prices."""
+    ingredient_id, user_id = test_ingredient["id"], test_user.id
+    supermarket_id = test_supermarkets[0].id
+    column = [s.id for s in test_supermarkets].index(supermarket_id)
+    
+    for email, price in (("a@example.com", "5.00"), ("b@example.com", "6.00")):
+        user = User(email=email, password_hash="x", full_name=email)
+        db.add(user)
+        db.flush()
+        db.add(IngredientPrice(
+            ingredient_id=ingredient_id,
+            supermarket_id=supermarket_id,
+            price_per_unit=Decimal(price),
+            unit=UnitType.KG,
+            user_id=user.id
+        ))
+    db.commit()
+    client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={"ingredient_id": ingredient_id, "supermarket_id": supermarket_id, "price_per_unit": "0.50", "unit": "unit"}
+    )
+    aggregate = db.get(IngredientCheapestPrice, (ingredient_id, supermarket_id))
+    db.refresh(aggregate)
+    assert aggregate.min_price == Decimal("5.00")
+    price_matrix.get_basket_prices(db, [ingredient_id], user_id)
+    
+    # 0.50 per 200 g piece is 2.50 per kg, without waiting for a rebuild
+    response = client.put(f"/api/recipes/ingredients/{ingredient_id}", headers=auth_headers, json={"unit_weight_g": 200})
+    assert response.status_code == status.HTTP_200_OK
+    
+    db.refresh(aggregate)
+    assert aggregate.unit == UnitType.KG
+    assert aggregate.min_price == Decimal("2.50")
+    assert aggregate.price_count == 3
+    basket = price_matrix.get_basket_prices(db, [ingredient_id], user_id)
+    assert basket.prices[0, column] == pytest.approx(2.50)
+
+
+def test_price_aggregate_removed_with_last_price(client, db, auth_headers, test_ingredient, test_supermarkets):
+    """Test that deleting the only price removes its aggregate row."""
+    response = client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={
+            "ingredient_id": test_ingredient["id"],
+            "supermarket_id": test_supermarkets[0].id,
+            "price_per_unit": "1.50",
+            "unit": "kg"
+        }
+    )
+    assert db.query(IngredientCheapestPrice).count() == 1
+    
+    client.delete(f"/api/prices/{response.json()['id']}", headers=auth_headers)
+    
+    assert db.query(IngredientCheapestPrice).count() == 0
+
+
+def test_get_price_summary_unauthorized(client, test_ingredient):
+    """Test price summary without authentication."""
+    response = client.get(f"/api/prices/ingredient/{test_ingredient['id']}/summary")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_price_matrix_patched_on_writes(client, db, auth_headers, test_user, test_ingredient, test_supermarkets, query_counter):
+    """Test that price writes patch the in-process matrix instead of forcing a rebuild."""
+    ingredient_id, user_id = test_ingredient["id"], test_user.id
+    supermarket_id = test_supermarkets[1].id
+    column = [s.id for s in test_supermarkets].index(supermarket_id)
+    
+    # Warm the matrix before any price exists
+    basket = price_matrix.get_basket_prices(db, [ingredient_id], user_id)
+    assert np.isinf(basket.prices).all()
+    
+    response = client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={"ingredient_id": ingredient_id, "supermarket_id": supermarket_id, "price_per_unit": "2.40", "unit": "kg"}
+    )
+    
+    query_counter.clear()
+    basket = price_matrix.get_basket_prices(db, [ingredient_id, ingredient_id], user_id)
+    assert len(query_counter) == 1  # exclusions only
+    assert basket.prices[:, column].tolist() == [2.40, 2.40]
+    
+    client.delete(f"/api/prices/{response.json()['id']}", headers=auth_headers)
+    
+    basket = price_matrix.get_basket_prices(db, [ingredient_id], user_id)
+    assert np.isinf(basket.prices).all()
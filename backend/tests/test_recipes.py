@@ -1,6 +1,7 @@
 import pytest
 from fastapi import status
 from io import BytesIO
+from app.services import recipe_service, search_service
 
 
 def test_create_ingredient_success(client, auth_headers):
@@ -379,3 +380,495 @@ def test_recipe_nutrition_calculation(client, auth_headers, test_ingredient):
     # For 100g of rice (130 cal per 100g) = 130 total calories
     assert data["total_calories"] > 0
     assert data["calories_per_serving"] == data["total_calories"] / 2
+
+
+def test_recipe_nutrition_unit_conversion(client, auth_headers):
+    """Test that nutrition converts units through the ingredient's density and unit weight."""
+    egg = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Egg", "calories_per_100g": 150, "protein_per_100g": 12, "carbs_per_100g": 1, "fats_per_100g": 10, "unit_weight_g": 50}
+    ).json()
+    honey = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Honey", "calories_per_100g": 300, "protein_per_100g": 0, "carbs_per_100g": 80, "fats_per_100g": 0, "density_g_per_ml": 1.4}
+    ).json()
+    
+    response = client.post(
+        "/api/recipes",
+        headers=auth_headers,
+        json={
+            "title": "Honey Eggs",
+            "instructions": "Test",
+            "prep_time_minutes": 0,
+            "cook_time_minutes": 0,
+            "servings": 1,
+            "ingredients": [
+                {"ingredient_id": egg["id"], "amount": 2, "unit": "unit"},  # 100 g
+                {"ingredient_id": honey["id"], "amount": 1, "unit": "tbsp"}  # 15 ml = 21 g
+            ]
+        }
+    )
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    calories = {ingredient["ingredient_name"]: ingredient["calories"] for ingredient in data["ingredients"]}
+    assert calories["Egg"] == 150.0
+    assert calories["Honey"] == 63.0
+    assert data["total_calories"] == 213.0
+
+
+def test_update_ingredient_refreshes_recipe_nutrition(client, auth_headers, test_ingredient, test_recipe):
+    """Test that changing an ingredient's macros updates stored recipe totals."""
+    # 150 g at 130 kcal/100g
+    assert test_recipe["total_calories"] == 195.0
+    
+    response = client.put(
+        f"/api/recipes/ingredients/{test_ingredient['id']}",
+        headers=auth_headers,
+        json={"calories_per_100g": 200}
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["calories_per_100g"] == 200
+    
+    data = client.get(f"/api/recipes/{test_recipe['id']}").json()
+    assert data["total_calories"] == 300.0
+    assert data["calories_per_serving"] == 150.0
+    
+    listed = client.get("/api/recipes/").json()
+    assert listed[0]["calories_per_serving"] == 150.0
+
+
+def test_update_ingredient_unauthorized(client, test_ingredient):
+    """Test updating ingredient without authentication."""
+    response = client.put(
+        f"/api/recipes/ingredients/{test_ingredient['id']}",
+        json={"calories_per_100g": 200}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_update_ingredient_not_found(client, auth_headers):
+    """Test updating non-existent ingredient."""
+    response = client.put(
+        "/api/recipes/ingredients/99999",
+        headers=auth_headers,
+        json={"calories_per_100g": 200}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_list_recipes_skips_ingredients(client, test_recipe, query_counter):
+    """Test that recipe lists read stored nutrition without loading ingredients."""
+    response = client.get("/api/recipes/")
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["calories_per_serving"] == 97.5
+    assert not any("recipe_ingredients" in statement for statement in query_counter)
+
+
+def test_list_recipes_cursor_pagination(client, auth_headers, test_ingredient):
+    """Test walking the recipe list with cursors."""
+    for i in range(5):
+        client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": f"Recipe {i}",
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": 1,
+                "ingredients": [{"ingredient_id": test_ingredient["id"], "amount": 100, "unit": "g"}]
+            }
+        )
+    
+    titles = []
+    cursor = None
+    for _ in range(3):
+        # skip is ignored next to a cursor
+        url = "/api/recipes/?limit=2" + (f"&skip=1&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        titles += [recipe["title"] for recipe in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    
+    # Newest first, every recipe exactly once, no cursor after the last page
+    assert titles == [f"Recipe {i}" for i in reversed(range(5))]
+    assert cursor is None
+
+
+def test_list_ingredients_cursor_pagination(client, auth_headers):
+    """Test walking the ingredient list with cursors."""
+    for name in ("Carrot", "Apple", "Banana"):
+        client.post(
+            "/api/recipes/ingredients",
+            headers=auth_headers,
+            json={"name": name, "calories_per_100g": 50, "protein_per_100g": 1, "carbs_per_100g": 10, "fats_per_100g": 0}
+        )
+    
+    first = client.get("/api/recipes/ingredients?limit=2")
+    assert [ingredient["name"] for ingredient in first.json()] == ["Apple", "Banana"]
+    
+    second = client.get(f"/api/recipes/ingredients?limit=2&skip=5&cursor={first.headers['X-Next-Cursor']}")
+    assert [ingredient["name"] for ingredient in second.json()] == ["Carrot"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_list_recipes_invalid_cursor(client):
+    """Test listing recipes with a malformed cursor."""
+    response = client.get("/api/recipes/?cursor=not-a-cursor")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_search_recipes_ranked(client, auth_headers, test_ingredient):
+    """Test full-text search over title, description, tags and ingredients."""
+    recipes = [
+        ("Rice Pudding", "Sweet dessert", ["dessert"]),
+        ("Stir Fry", "Serve over rice", ["quick"]),
+        ("Chicken Bowl", "Protein packed", ["high-protein"]),
+    ]
+    for title, description, tags in recipes:
+        client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": title,
+                "description": description,
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": 1,
+                "ingredients": [{"ingredient_id": test_ingredient["id"], "amount": 100, "unit": "g"}],
+                "tag_names": tags
+            }
+        )
+    
+    # Title matches rank above description matches
+    titles = [recipe["title"] for recipe in client.get("/api/recipes/?search=rice").json()]
+    assert titles[0] == "Rice Pudding"
+    assert set(titles) == {"Rice Pudding", "Stir Fry", "Chicken Bowl"}  # All use White Rice
+    
+    # Prefix match on a tag, every term must match
+    titles = [recipe["title"] for recipe in client.get("/api/recipes/?search=chick high").json()]
+    assert titles == ["Chicken Bowl"]
+    assert client.get("/api/recipes/?search=pudding chicken").json() == []
+
+
+def test_search_recipes_follows_writes(client, auth_headers, test_recipe):
+    """Test that the search index is refreshed on update and delete."""
+    assert len(client.get("/api/recipes/?search=grilled").json()) == 1
+    
+    client.put(
+        f"/api/recipes/{test_recipe['id']}",
+        headers=auth_headers,
+        json={"title": "Baked Salmon"}
+    )
+    assert client.get("/api/recipes/?search=grilled").json() == []
+    assert len(client.get("/api/recipes/?search=salmon").json()) == 1
+    
+    client.delete(f"/api/recipes/{test_recipe['id']}", headers=auth_headers)
+    assert client.get("/api/recipes/?search=salmon").json() == []
+
+
+def test_search_index_ignores_rolled_back_writes(client, db, test_user, test_recipe, monkeypatch):
+    """Test that the search index only picks up committed recipe writes."""
+    from app.schemas.recipe import RecipeUpdate
+    from app.services.recipe_service import RecipeService
+    
+    assert len(client.get("/api/recipes/?search=grilled").json()) == 1
+    
+    def failing_commit():
+        raise RuntimeError("commit failed")
+    
+    monkeypatch.setattr(db, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        RecipeService(db).update_recipe(test_recipe["id"], RecipeUpdate(title="Baked Salmon"), test_user.id)
+    db.rollback()
+    
+    assert client.get("/api/recipes/?search=salmon").json() == []
+    assert len(client.get("/api/recipes/?search=grilled").json()) == 1
+
+
+def test_search_recipes_paged_in_candidate_batches(client, auth_headers, test_ingredient, monkeypatch):
+    """Test that ranked search pages are the same when candidates are bound one at a time."""
+    for number in range(5):
+        client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": f"Rice Bowl {number}" if number % 2 else f"Bowl {number}",
+                "description": "Bowl with rice",
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": 1,
+                "is_public": number != 3,
+                "ingredients": [{"ingredient_id": test_ingredient["id"], "amount": 100, "unit": "g"}]
+            }
+        )
+    expected = [recipe["id"] for recipe in client.get("/api/recipes/?search=rice").json()]
+    assert len(expected) == 4
+    
+    monkeypatch.setattr(search_service, "CANDIDATE_BATCH", 1)
+    ids, cursor = [], None
+    while True:
+        response = client.get("/api/recipes/?search=rice&limit=1" + (f"&cursor={cursor}" if cursor else ""))
+        ids += [recipe["id"] for recipe in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert ids == expected
+    
+    assert [recipe["id"] for recipe in client.get("/api/recipes/?search=rice&skip=1&limit=2").json()] == expected[1:3]
+
+
+def test_autocomplete_ingredients(client, auth_headers):
+    """Test typo-tolerant, popularity-ranked ingredient autocomplete."""
+    ids = {}
+    for name in ("Tomato", "Tomato Paste", "Tomato Puree", "Potato"):
+        ids[name] = client.post(
+            "/api/recipes/ingredients",
+            headers=auth_headers,
+            json={"name": name, "calories_per_100g": 20, "protein_per_100g": 1, "carbs_per_100g": 4, "fats_per_100g": 0}
+        ).json()["id"]
+    
+    # Typo
+    response = client.get("/api/recipes/ingredients/autocomplete?q=tomatoe")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["name"] == "Tomato"
+    
+    # Popularity breaks the tie between equally similar names
+    client.post(
+        "/api/recipes",
+        headers=auth_headers,
+        json={
+            "title": "Tomato Sauce",
+            "instructions": "Test",
+            "prep_time_minutes": 0,
+            "cook_time_minutes": 0,
+            "servings": 1,
+            "ingredients": [{"ingredient_id": ids["Tomato Puree"], "amount": 100, "unit": "g"}]
+        }
+    )
+    data = client.get("/api/recipes/ingredients/autocomplete?q=tomato p").json()
+    assert [suggestion["name"] for suggestion in data][:2] == ["Tomato Puree", "Tomato Paste"]
+    assert data[0]["usage_count"] == 1
+    
+    # Prefix matches are found from the first keystroke
+    data = client.get("/api/recipes/ingredients/autocomplete?q=po").json()
+    assert [suggestion["name"] for suggestion in data] == ["Potato"]
+
+
+def test_discover_recipes_by_pantry(client, auth_headers, test_supermarkets):
+    """Test ranking recipes by pantry coverage with the cost of what's missing."""
+    ids = {}
+    for name in ("Pasta", "Tomato", "Basil", "Egg"):
+        ids[name] = client.post(
+            "/api/recipes/ingredients",
+            headers=auth_headers,
+            json={"name": name, "calories_per_100g": 100, "protein_per_100g": 5, "carbs_per_100g": 10, "fats_per_100g": 2}
+        ).json()["id"]
+    client.post(
+        "/api/prices",
+        headers=auth_headers,
+        json={"ingredient_id": ids["Basil"], "supermarket_id": test_supermarkets[1].id, "price_per_unit": "20.00", "unit": "kg"}
+    )
+    
+    recipes = {
+        "Pasta Pomodoro": ["Pasta", "Tomato", "Basil"],
+        "Plain Pasta": ["Pasta"],
+        "Omelette": ["Egg"],
+    }
+    for title, names in recipes.items():
+        client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": title,
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": 1,
+                "ingredients": [{"ingredient_id": ids[name], "amount": 50, "unit": "g"} for name in names]
+            }
+        )
+    
+    response = client.post(
+        "/api/recipes/discover",
+        headers=auth_headers,
+        json={"ingredient_ids": [ids["Pasta"], ids["Tomato"]]}
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    # Omelette shares nothing with the pantry
+    assert [match["title"] for match in data] == ["Plain Pasta", "Pasta Pomodoro"]
+    assert data[0]["coverage"] == 1.0
+    assert data[0]["missing_ingredients"] == []
+    
+    pomodoro = data[1]
+    assert abs(pomodoro["coverage"] - 2 / 3) < 0.001
+    assert pomodoro["total_ingredients"] == 3
+    basil = pomodoro["missing_ingredients"][0]
+    assert basil["ingredient_name"] == "Basil"
+    # 50 g at 20.00 €/kg
+    assert basil["cheapest_cost"] == 1.0
+    assert basil["cheapest_supermarket_id"] == test_supermarkets[1].id
+    assert pomodoro["missing_cost"] == 1.0
+    
+    # Coverage threshold
+    data = client.post(
+        "/api/recipes/discover",
+        headers=auth_headers,
+        json={"ingredient_ids": [ids["Pasta"], ids["Tomato"]], "min_coverage": 0.9}
+    ).json()
+    assert [match["title"] for match in data] == ["Plain Pasta"]
+
+
+def test_discover_recipes_unauthorized(client):
+    """Test pantry discovery without authentication."""
+    response = client.post("/api/recipes/discover", json={"ingredient_ids": [1]})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.parametrize("max_ids", [None, 0])
+def test_list_recipes_multi_tag_filter(client, auth_headers, test_ingredient, monkeypatch, max_ids):
+    """Test AND/OR filtering on several tags (as an id list and as EXISTS in SQL)."""
+    if max_ids is not None:
+        monkeypatch.setattr(recipe_service, "MAX_TAG_MATCH_IDS", max_ids)
+    recipes = [
+        ("Tofu Scramble", ["vegan", "quick", "breakfast"]),
+        ("Lentil Stew", ["vegan"]),
+        ("Omelette", ["quick", "breakfast"]),
+    ]
+    for title, tags in recipes:
+        client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": title,
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": 1,
+                "ingredients": [{"ingredient_id": test_ingredient["id"], "amount": 100, "unit": "g"}],
+                "tag_names": tags
+            }
+        )
+    
+    titles = [recipe["title"] for recipe in client.get("/api/recipes/?tags=vegan,quick&mode=all").json()]
+    assert titles == ["Tofu Scramble"]
+    
+    # Recipes matching several tags are listed once
+    titles = [recipe["title"] for recipe in client.get("/api/recipes/?tags=vegan,Quick&mode=any").json()]
+    assert sorted(titles) == ["Lentil Stew", "Omelette", "Tofu Scramble"]
+    
+    assert client.get("/api/recipes/?tags=vegan,dessert").json() == []
+    assert client.get("/api/recipes/?tags=vegan&mode=some").status_code == 422
+    
+    # The index follows updates
+    omelette = next(r for r in client.get("/api/recipes/?tag=breakfast").json() if r["title"] == "Omelette")
+    client.put(f"/api/recipes/{omelette['id']}", headers=auth_headers, json={"tag_names": ["vegan", "quick"]})
+    titles = [recipe["title"] for recipe in client.get("/api/recipes/?tags=vegan,quick").json()]
+    assert sorted(titles) == ["Omelette", "Tofu Scramble"]
+
+
+def test_recipe_tag_facets(client, auth_headers, test_ingredient):
+    """Test per-tag counts of the filtered result set."""
+    recipes = [
+        ("Tofu Scramble", ["vegan", "quick"]),
+        ("Lentil Stew", ["vegan"]),
+        ("Omelette", ["quick"]),
+    ]
+    for title, tags in recipes:
+        client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": title,
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": 1,
+                "ingredients": [{"ingredient_id": test_ingredient["id"], "amount": 100, "unit": "g"}],
+                "tag_names": tags
+            }
+        )
+    
+    response = client.get("/api/recipes/facets")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["total"] == 3
+    assert data["tags"] == [{"name": "quick", "count": 2}, {"name": "vegan", "count": 2}]
+    
+    data = client.get("/api/recipes/facets?tags=vegan").json()
+    assert data["total"] == 2
+    assert {facet["name"]: facet["count"] for facet in data["tags"]} == {"vegan": 2, "quick": 1}
+    
+    data = client.get("/api/recipes/facets?search=stew").json()
+    assert data == {"total": 1, "tags": [{"name": "vegan", "count": 1}]}
+
+
+def test_list_recipes_macro_ranges(client, auth_headers):
+    """Test per-serving nutrition range filters and protein density ordering."""
+    chicken = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Chicken Breast", "calories_per_100g": 165, "protein_per_100g": 31, "carbs_per_100g": 0, "fats_per_100g": 3.6}
+    ).json()
+    pasta = client.post(
+        "/api/recipes/ingredients",
+        headers=auth_headers,
+        json={"name": "Pasta", "calories_per_100g": 350, "protein_per_100g": 12, "carbs_per_100g": 70, "fats_per_100g": 1.5}
+    ).json()
+    
+    recipes = [
+        # title, grams of chicken, grams of pasta, servings
+        ("Chicken Plate", 400, 0, 2),   # 330 kcal, 62 g protein per serving
+        ("Chicken Pasta", 200, 200, 2),  # 515 kcal, 43 g protein per serving
+        ("Pasta Bake", 0, 400, 2),       # 700 kcal, 24 g protein per serving
+    ]
+    ids = {}
+    for title, chicken_g, pasta_g, servings in recipes:
+        ingredients = [
+            {"ingredient_id": ingredient["id"], "amount": amount, "unit": "g"}
+            for ingredient, amount in ((chicken, chicken_g), (pasta, pasta_g)) if amount
+        ]
+        ids[title] = client.post(
+            "/api/recipes",
+            headers=auth_headers,
+            json={
+                "title": title,
+                "instructions": "Test",
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "servings": servings,
+                "ingredients": ingredients
+            }
+        ).json()["id"]
+    
+    titles = {recipe["title"] for recipe in client.get("/api/recipes/?min_protein=30&max_calories=600").json()}
+    assert titles == {"Chicken Plate", "Chicken Pasta"}
+    
+    titles = {recipe["title"] for recipe in client.get("/api/recipes/?min_calories=500&max_calories=700").json()}
+    assert titles == {"Chicken Pasta", "Pasta Bake"}
+    
+    titles = [recipe["title"] for recipe in client.get("/api/recipes/?sort=protein_density").json()]
+    assert titles == ["Chicken Plate", "Chicken Pasta", "Pasta Bake"]
+    
+    # Keyset pagination follows the protein density order
+    response = client.get("/api/recipes/?sort=protein_density&limit=2")
+    assert [recipe["title"] for recipe in response.json()] == ["Chicken Plate", "Chicken Pasta"]
+    page = client.get(f"/api/recipes/?sort=protein_density&limit=2&cursor={response.headers['X-Next-Cursor']}").json()
+    assert [recipe["title"] for recipe in page] == ["Pasta Bake"]
+    
+    # Changing servings moves the recipe in and out of a range
+    client.put(f"/api/recipes/{ids['Pasta Bake']}", headers=auth_headers, json={"servings": 4})
+    titles = {recipe["title"] for recipe in client.get("/api/recipes/?max_calories=400").json()}
+    assert titles == {"Chicken Plate", "Pasta Bake"}
+    
+    assert client.get("/api/recipes/?min_protein=-1").status_code == 422
+    assert client.get("/api/recipes/?sort=calories").status_code == 422
@@ -14,6 +14,11 @@ apiClient.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Echo our last write so reads right after it skip the lagging read replica
+    const lastWrite = sessionStorage.getItem('lastWrite');
+    if (lastWrite) {
+      config.headers['X-Last-Write'] = lastWrite;
+    }
     return config;
   },
   (error) => {
@@ -23,7 +28,13 @@ apiClient.interceptors.request.use(
 
 // Response interceptor: Handle errors globally
 apiClient.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const lastWrite = response.headers['x-last-write'];
+    if (lastWrite) {
+      sessionStorage.setItem('lastWrite', lastWrite);
+    }
+    return response;
+  },
   (error) => {
     // Auto-logout on 401 Unauthorized
     if (error.response?.status === 401) {